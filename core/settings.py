@@ -23,6 +23,11 @@ SECRET_KEY = config(
 DEBUG = config("DEBUG", default=False, cast=bool)
 ALLOWED_HOSTS = config("ALLOWED_HOSTS", default="localhost,127.0.0.1", cast=Csv())
 
+# Deployment mode (gunicorn.conf.py): "wsgi" (sync workers) or "asgi" (uvicorn
+# workers). ASYNC_VIEWS routes the hot public pages to inventory.async_views.
+SERVER_MODE = config("SERVER_MODE", default="wsgi")
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=SERVER_MODE == "asgi", cast=bool)
+
 
 # --- APPLICATION DEFINITION ---
 INSTALLED_APPS = [
@@ -40,14 +45,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "inventory.middleware.StaticFilesMiddleware",  # WhiteNoise, async capable
+    "inventory.middleware.ReplicaStickinessMiddleware",
+    "inventory.middleware.SessionRefreshMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "inventory.middleware.SiteVisitMiddleware",
+    "inventory.middleware.HtmlWhitespaceMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -63,6 +70,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "inventory.context_processors.notifications",
             ],
         },
     },
@@ -72,14 +80,79 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 
 # --- DATABASE ---
-DATABASES = {
-    "default": dj_database_url.config(
-        default=config("DATABASE_URL", default="sqlite:///db.sqlite3"),
-        conn_max_age=600,
-        conn_health_checks=True,
+# DATABASE_POOL_SIZE > 0 (PostgreSQL only) keeps that many connections per
+# process in an in-process pool (inventory/db/postgresql_pool) instead of one
+# persistent connection per thread. Health checks cost a round-trip per
+# request; they are off by default (a dead connection fails one request and
+# is then replaced). Threads beyond the pool size wait up to
+# DATABASE_POOL_TIMEOUT seconds for a free connection.
+DATABASE_POOL_SIZE = config("DATABASE_POOL_SIZE", default=0, cast=int)
+DATABASE_POOL_TIMEOUT = config("DATABASE_POOL_TIMEOUT", default=10, cast=float)
+DATABASE_HEALTH_CHECKS = config("DATABASE_HEALTH_CHECKS", default=False, cast=bool)
+
+
+def _database(url):
+    database = dj_database_url.parse(
+        url,
+        # Persistent connections are per thread: under ASGI each request may
+        # run on a new one, so they would leak instead of being reused.
+        conn_max_age=0 if SERVER_MODE == "asgi" else 600,
+        conn_health_checks=DATABASE_HEALTH_CHECKS,
     )
+    if DATABASE_POOL_SIZE and database["ENGINE"].endswith("postgresql"):
+        database.update(
+            ENGINE="inventory.db.postgresql_pool",
+            POOL_SIZE=DATABASE_POOL_SIZE,
+            POOL_TIMEOUT=DATABASE_POOL_TIMEOUT,
+            CONN_MAX_AGE=0,  # connections go back to the pool after each request
+        )
+    return database
+
+
+DATABASES = {
+    "default": _database(config("DATABASE_URL", default="sqlite:///db.sqlite3")),
 }
 
+# Optional read replica: the views marked read_from_replica (catalogue, VIP,
+# dashboard charts, JSON API) read from it. Clients that just wrote stick to
+# the primary for REPLICA_STICKY_SECONDS.
+_replica_url = config("DATABASE_REPLICA_URL", default="")
+if _replica_url:
+    DATABASES["replica"] = _database(_replica_url)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    DATABASE_ROUTERS = ["inventory.routers.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=10, cast=int)
+
+
+# --- CACHE ---
+# Local memory by default; set REDIS_URL to share the cache between workers.
+# Catalogue generations, bulk-action invalidation, presence and sessions all
+# rely on every worker seeing the same cache: with more than one gunicorn
+# worker (WEB_CONCURRENCY) and no Redis, system check inventory.W001 warns.
+_redis_url = config("REDIS_URL", default="")
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=1, cast=int)
+if _redis_url:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _redis_url,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# --- SESSIONS ---
+# Coalesced writes (inventory/sessions.py), read through the cache only when it
+# is shared between workers. Sliding expiry, refreshed at most every 15 min.
+SESSION_ENGINE = "inventory.sessions"
+SESSION_USE_CACHE = config("SESSION_USE_CACHE", default=bool(_redis_url), cast=bool)
+SESSION_REFRESH_INTERVAL = config("SESSION_REFRESH_INTERVAL", default=900, cast=int)
+
 
 # --- PASSWORD VALIDATION ---
 AUTH_PASSWORD_VALIDATORS = [
@@ -108,6 +181,34 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Staff exports generated in the background (kept out of MEDIA_ROOT: private)
+EXPORTS_ROOT = BASE_DIR / "exports"
+
+# Local IP range database built with `manage.py build_geoip_db` (optional)
+GEOIP_DB_PATH = config("GEOIP_DB_PATH", default="")
+
+# Visit tracking: crawlers are skipped unless TRACK_BOT_VISITS (then tagged)
+TRACK_BOT_VISITS = config("TRACK_BOT_VISITS", default=False, cast=bool)
+BOT_RATE_LIMIT = config("BOT_RATE_LIMIT", default=120, cast=int)  # requests/min/IP
+
+# Anonymous full-page cache (seconds, 0 disables it)
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=300, cast=int)
+
+# Notification digests by e-mail (`manage.py send_notification_digest`, optional)
+NOTIFICATION_EMAILS = config("NOTIFICATION_EMAILS", default=False, cast=bool)
+SITE_URL = config("SITE_URL", default="http://localhost:8000")
+EMAIL_BACKEND = config(
+    "EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend"
+)
+EMAIL_HOST = config("EMAIL_HOST", default="localhost")
+EMAIL_PORT = config("EMAIL_PORT", default=25, cast=int)
+EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config(
+    "DEFAULT_FROM_EMAIL", default="AutoVente <contact@autovente.cm>"
+)
+
 # Cloudinary configuration (for Railway/production)
 CLOUDINARY_STORAGE = {
     "CLOUD_NAME": config("CLOUDINARY_CLOUD_NAME", default=""),
@@ -0,0 +1,17 @@
+# Gunicorn settings (see Procfile). Bind address and worker count come from
+# gunicorn's own PORT / WEB_CONCURRENCY environment handling.
+#
+# SERVER_MODE=wsgi (default): classic sync workers on core.wsgi.
+# SERVER_MODE=asgi: uvicorn workers on core.asgi, with the async views of
+# inventory/async_views.py (see ASYNC_VIEWS in core/settings.py).
+# Read with python-decouple, like the settings, so a value set in .env applies
+# to both.
+from decouple import config
+
+if config("SERVER_MODE", default="wsgi") == "asgi":
+    wsgi_app = "core.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "core.wsgi:application"
+
+errorlog = "-"
@@ -1,8 +1,22 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from . import userstats
 from .models import Car, Appointment, Favorite
 
 
+class RecountUserStatsMixin:
+    """Admin deletes run without delete signals (see userstats.py): recount
+    the counters of the users concerned once the delete is committed."""
+
+    def delete_model(self, request, obj):
+        userstats.recount_on_commit([obj.user_id])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        userstats.recount_on_commit(queryset.values_list("user_id", flat=True))
+        super().delete_queryset(request, queryset)
+
+
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
     list_display = (
@@ -33,7 +47,7 @@ class CarAdmin(admin.ModelAdmin):
 
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(RecountUserStatsMixin, admin.ModelAdmin):
     list_display = ("user", "car", "phone", "email", "date_rdv", "created_at")
     list_filter = ("date_rdv", "created_at")
     search_fields = ("user__username", "car__brand", "phone", "email")
@@ -41,7 +55,7 @@ class AppointmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RecountUserStatsMixin, admin.ModelAdmin):
     list_display = ("user", "car", "created_at")
     list_filter = ("created_at",)
     search_fields = ("user__username", "car__brand")
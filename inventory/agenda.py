@@ -0,0 +1,104 @@
+"""Appointment statistics and the staff calendar.
+
+``stats()`` computes the four counters of the appointment list in one
+conditional aggregate, cached until an appointment is saved or a Car or
+User delete cascades to appointments (signals call ``invalidate_stats``)
+and at most ``STATS_TIMEOUT`` seconds, since "upcoming" and "past" move
+with the clock.
+
+``calendar()`` fetches the appointments of one week or month with a single
+range query on ``date_rdv`` (index ``idx_rdv_date_created``), projected to
+what the grid shows, and groups them by local day in Python. Requested days
+are clamped to ``FIRST_DAY`` .. ``LAST_DAY``.
+"""
+
+import calendar as _calendar
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Appointment
+
+STATS_KEY = "appointments:stats"
+STATS_TIMEOUT = 300
+# Appointments listed per day in the month grid (the rest: "+ n").
+MONTH_CELL_LIMIT = 4
+# Days the calendar can show: whole grids and their neighbours stay far from
+# date.min / date.max.
+FIRST_DAY = date(1900, 1, 1)
+LAST_DAY = date(2999, 12, 31)
+CALENDAR_FIELDS = [
+    "date_rdv",
+    "confirmed_at",
+    "user__username",
+    "car__brand",
+    "car__model",
+]
+
+
+def stats():
+    """``total_rdv``, ``upcoming_rdv``, ``past_rdv`` and ``this_week``, cached."""
+    values = cache.get(STATS_KEY)
+    if values is None:
+        now = timezone.now()
+        values = Appointment.objects.aggregate(
+            total_rdv=Count("pk"),
+            upcoming_rdv=Count("pk", filter=Q(date_rdv__gte=now)),
+            past_rdv=Count("pk", filter=Q(date_rdv__lt=now)),
+            this_week=Count("pk", filter=Q(created_at__gte=now - timedelta(days=7))),
+        )
+        cache.set(STATS_KEY, values, STATS_TIMEOUT)
+    return values
+
+
+def invalidate_stats():
+    cache.delete(STATS_KEY)
+
+
+def clamp_day(day):
+    """``day`` brought back into ``FIRST_DAY`` .. ``LAST_DAY``."""
+    return min(max(day, FIRST_DAY), LAST_DAY)
+
+
+def _bounds(view, day):
+    """First and last day shown: whole weeks (Monday first)."""
+    if view == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    weeks = _calendar.Calendar().monthdatescalendar(day.year, day.month)
+    return weeks[0][0], weeks[-1][-1]
+
+
+def calendar(view, day, limit=None):
+    """Weeks of ``[(date, appointments, hidden)]`` around ``day`` for ``view``
+    ("week" or "month"), plus the number of appointments in the range.
+
+    With ``limit``, only the first appointments of each day are listed and
+    ``hidden`` counts the others.
+    """
+    first, last = _bounds(view, day)
+    tz = timezone.get_current_timezone()
+    appointments = (
+        Appointment.objects.filter(
+            date_rdv__gte=datetime.combine(first, time.min, tz),
+            date_rdv__lt=datetime.combine(last + timedelta(days=1), time.min, tz),
+        )
+        .select_related("user", "car")
+        .only(*CALENDAR_FIELDS)
+        .order_by("date_rdv")
+    )
+    by_day = defaultdict(list)
+    count = 0
+    for appointment in appointments:
+        by_day[timezone.localtime(appointment.date_rdv, tz).date()].append(appointment)
+        count += 1
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    cells = []
+    for d in days:
+        items = by_day.get(d, [])
+        shown = items if limit is None else items[:limit]
+        cells.append((d, shown, len(items) - len(shown)))
+    return [cells[i : i + 7] for i in range(0, len(cells), 7)], count
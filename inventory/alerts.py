@@ -0,0 +1,327 @@
+"""Alerts: saved searches matching new cars, price drops on favourites.
+
+Only the new cars are evaluated, never the whole catalogue. The saved
+searches that can match them are loaded into ``SearchIndex``, an inverted
+index keyed by the discrete criteria (fuel -> transmission -> city -> text,
+"" meaning "any"), so a car only visits the few buckets it can match.
+Inside a bucket, searches are sorted on ``price_min``: a bisection keeps
+those starting below the price and the remaining bounds are checked with
+NumPy on that prefix. Matches become ``Notification`` rows in one bulk
+insert.
+
+Criteria follow ``catalogue.filter_cars``: fuel and transmission are exact,
+city and the text are case-insensitive "contains" (the text on brand, model
+or city).
+
+A price drop on an available car notifies everyone who favourited it: the
+users are read from the ``Favorite(car, user)`` index and the notifications
+inserted in batches, whatever the number of favouriters.
+"""
+
+from bisect import bisect_right
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .catalogue import _number
+from .models import Car, Favorite, Notification, SavedSearch
+from .notifications import invalidate_unread
+from .worker import defer
+
+CRITERIA = [
+    "q",
+    "fuel",
+    "transmission",
+    "city",
+    "price_min",
+    "price_max",
+    "year_min",
+    "year_max",
+]
+MAX_PRICE = Decimal("99999999.99")
+NOTIFY_BATCH = 1000
+FANOUT_CHUNK = 5000
+SEARCH_CHUNK = 20000
+CAR_FIELDS = ["id", "brand", "model", "city", "fuel", "transmission", "price", "year"]
+
+
+# --- CRITÈRES ---
+def normalise(filters):
+    """Criteria of a ``read_filters`` dict, as stored on ``SavedSearch``.
+
+    Unknown fuel/transmission values and malformed numbers are dropped, like
+    the home page ignores them; prices are clamped to the column range.
+    """
+    fuel = filters.get("fuel", "")
+    transmission = filters.get("transmission", "")
+    criteria = {
+        "q": filters.get("q", "").casefold()[:100],
+        "fuel": fuel if fuel in dict(Car.CARBURANT_CHOICES) else "",
+        "transmission": (
+            transmission if transmission in dict(Car.BOITE_CHOICES) else ""
+        ),
+        "city": filters.get("city", "").casefold()[:100],
+    }
+    for name in ("price_min", "price_max"):
+        value = _number(filters.get(name) or None, Decimal)
+        if value is not None:
+            value = max(min(value, MAX_PRICE), -MAX_PRICE).quantize(Decimal("0.01"))
+        criteria[name] = value
+    for name in ("year_min", "year_max"):
+        value = _number(filters.get(name) or None, int)
+        criteria[name] = None if value is None else max(min(value, 9999), 0)
+    return criteria
+
+
+def to_filters(search):
+    """The home page query parameters of a saved search."""
+    return {
+        name: value
+        for name in CRITERIA
+        if (value := getattr(search, name)) not in ("", None)
+    }
+
+
+def home_query(search):
+    return urlencode(to_filters(search))
+
+
+def label(criteria):
+    """Short human description, used as the default name."""
+    parts = [criteria[name] for name in ("q", "fuel", "transmission", "city")]
+    parts = [str(part).capitalize() for part in parts if part]
+    for low, high, unit in (
+        ("price_min", "price_max", " FCFA"),
+        ("year_min", "year_max", ""),
+    ):
+        low, high = criteria[low], criteria[high]
+        low = None if low is None else f"{low:,.0f}".replace(",", " ")
+        high = None if high is None else f"{high:,.0f}".replace(",", " ")
+        if low is not None and high is not None:
+            parts.append(f"{low}–{high}{unit}")
+        elif low is not None:
+            parts.append(f"≥ {low}{unit}")
+        elif high is not None:
+            parts.append(f"≤ {high}{unit}")
+    return " · ".join(parts)[:120] or "Toutes les annonces"
+
+
+def save_search(user, criteria):
+    """Store ``criteria`` for ``user`` (re-activated if already saved).
+
+    Returns ``(search, created)``.
+    """
+    search, created = SavedSearch.objects.get_or_create(
+        user=user, **criteria, defaults={"name": label(criteria)}
+    )
+    if not created and not search.is_active:
+        search.is_active = True
+        search.save(update_fields=["is_active"])
+    return search, created
+
+
+# --- INDEX ---
+def _substrings(texts, max_length):
+    """Every substring of ``texts`` up to ``max_length`` characters, plus ""."""
+    found = {""}
+    for text in texts:
+        for start in range(len(text)):
+            for end in range(start + 1, min(start + max_length, len(text)) + 1):
+                found.add(text[start:end])
+    return found
+
+
+def _present(node, candidates):
+    """Keys of ``node`` that are in ``candidates``, iterating the smaller."""
+    if len(node) < len(candidates):
+        return [key for key in node if key in candidates]
+    return [key for key in candidates if key in node]
+
+
+class _Bucket:
+    """Searches sharing the same discrete criteria, sorted on ``price_min``."""
+
+    def __init__(self):
+        self.rows = []
+
+    def freeze(self):
+        self.rows.sort(key=lambda row: row[0])
+        columns = list(zip(*self.rows))
+        self.price_min = list(columns[0])
+        self.price_max, self.year_min, self.year_max = (
+            np.asarray(column, dtype=np.float64) for column in columns[1:4]
+        )
+        self.ids, self.users = (np.asarray(c, dtype=np.int64) for c in columns[4:])
+        del self.rows
+
+    def match(self, price, year):
+        end = bisect_right(self.price_min, price)
+        if not end:
+            return ()
+        mask = (
+            (self.price_max[:end] >= price)
+            & (self.year_min[:end] <= year)
+            & (self.year_max[:end] >= year)
+        )
+        return zip(self.ids[:end][mask].tolist(), self.users[:end][mask].tolist())
+
+
+class SearchIndex:
+    """In-memory index of saved searches, queried car by car."""
+
+    def __init__(self, rows):
+        """``rows``: (id, user_id, q, fuel, transmission, city, price_min,
+        price_max, year_min, year_max) tuples, criteria normalised."""
+        self.tree = {}
+        self.max_q = self.max_city = 0
+        for search_id, user_id, q, fuel, gear, city, *bounds in rows:
+            p_min, p_max, y_min, y_max = (
+                default if value is None else float(value)
+                for value, default in zip(bounds, (-np.inf, np.inf) * 2)
+            )
+            node = self.tree.setdefault(fuel, {}).setdefault(gear, {})
+            bucket = node.setdefault(city, {}).setdefault(q, _Bucket())
+            bucket.rows.append((p_min, p_max, y_min, y_max, search_id, user_id))
+            self.max_q = max(self.max_q, len(q))
+            self.max_city = max(self.max_city, len(city))
+        for by_gear in self.tree.values():
+            for by_city in by_gear.values():
+                for by_q in by_city.values():
+                    for bucket in by_q.values():
+                        bucket.freeze()
+
+    def match(self, car):
+        """(search id, user id) of every search ``car`` satisfies."""
+        city = car.city.casefold()
+        cities = _substrings([city], self.max_city)
+        texts = _substrings(
+            [car.brand.casefold(), car.model.casefold(), city], self.max_q
+        )
+        price, year = float(car.price), car.year
+        for fuel in {car.fuel, ""}:
+            for gear in {car.transmission, ""}:
+                by_city = self.tree.get(fuel, {}).get(gear)
+                if not by_city:
+                    continue
+                for city_key in _present(by_city, cities):
+                    by_q = by_city[city_key]
+                    for q in _present(by_q, texts):
+                        yield from by_q[q].match(price, year)
+
+
+def candidate_searches(cars):
+    """Active searches whose fuel, transmission and ranges can match ``cars``.
+
+    A cheap SQL pre-filter: for a handful of cars only a few searches are
+    loaded; for large batches it degrades to all active searches.
+    """
+    prices = [car.price for car in cars]
+    years = [car.year for car in cars]
+    return (
+        SavedSearch.objects.filter(
+            Q(price_min__isnull=True) | Q(price_min__lte=max(prices)),
+            Q(price_max__isnull=True) | Q(price_max__gte=min(prices)),
+            Q(year_min__isnull=True) | Q(year_min__lte=max(years)),
+            Q(year_max__isnull=True) | Q(year_max__gte=min(years)),
+            is_active=True,
+            fuel__in={"", *(car.fuel for car in cars)},
+            transmission__in={"", *(car.transmission for car in cars)},
+        )
+        .order_by()
+        .values_list("pk", "user_id", *CRITERIA)
+        .iterator(chunk_size=SEARCH_CHUNK)
+    )
+
+
+# --- NOTIFICATIONS ---
+def find_matches(cars, index):
+    """``{(user id, car id): search id}``: one entry per user and car, even
+    when several searches of the user match.
+
+    The oldest matching search (lowest id) is kept, so a car matched again
+    later maps to the same search and hits ``uniq_notif_search_car`` instead
+    of notifying the user twice.
+    """
+    matches = {}
+    for car in cars:
+        for search_id, user_id in index.match(car):
+            key = (user_id, car.pk)
+            matches[key] = min(search_id, matches.get(key, search_id))
+    return matches
+
+
+def notify(matches):
+    """Insert the notifications of ``find_matches`` in bulk; returns the count."""
+    Notification.objects.bulk_create(
+        (
+            Notification(
+                user_id=user_id,
+                car_id=car_id,
+                saved_search_id=search_id,
+                kind="search_match",
+            )
+            for (user_id, car_id), search_id in matches.items()
+        ),
+        batch_size=NOTIFY_BATCH,
+        ignore_conflicts=True,
+    )
+    invalidate_unread(user_id for user_id, _ in matches)
+    return len(matches)
+
+
+def match_cars(car_ids):
+    """Notify the owners of the saved searches matching the given cars.
+
+    Cars that are not available are ignored. Returns the number of
+    notifications queued.
+    """
+    cars = list(
+        Car.objects.filter(pk__in=car_ids, status="Disponible").only(*CAR_FIELDS)
+    )
+    if not cars:
+        return 0
+    return notify(find_matches(cars, SearchIndex(candidate_searches(cars))))
+
+
+def queue_matches(car_ids):
+    """Match ``car_ids`` on the background worker once the transaction commits."""
+    car_ids = list(car_ids)
+    if car_ids:
+        transaction.on_commit(lambda: defer(match_cars, car_ids))
+
+
+def notify_price_drops(drops):
+    """Notify the favouriters of each ``(car id, old price, new price)``.
+
+    Cars no longer available are skipped. Returns the number of notifications.
+    """
+    created = 0
+    for car_id, old_price, new_price in drops:
+        users = (
+            Favorite.objects.filter(car_id=car_id, car__status="Disponible")
+            .values_list("user_id", flat=True)
+            .iterator(chunk_size=FANOUT_CHUNK)
+        )
+        data = {"old_price": str(old_price), "new_price": str(new_price)}
+        rows = Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=user_id, car_id=car_id, kind="price_drop", data=data
+                )
+                for user_id in users
+            ],
+            batch_size=NOTIFY_BATCH,
+        )
+        invalidate_unread(row.user_id for row in rows)
+        created += len(rows)
+    return created
+
+
+def queue_price_drops(drops):
+    """Run ``notify_price_drops`` on the background worker after commit."""
+    drops = [(car_id, old, new) for car_id, old, new in drops if new < old]
+    if drops:
+        transaction.on_commit(lambda: defer(notify_price_drops, drops))
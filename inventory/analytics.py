@@ -0,0 +1,153 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import geoip, presence
+from .hll import HyperLogLog
+from .models import DailyVisitStat, SiteVisit, VisitSketch
+
+BACKFILL_CHUNK = 5000
+
+# Register count per sketch dimension: the site-wide sketch is the one read
+# most, pages/countries are numerous and get smaller sketches.
+SKETCH_PRECISION = {"all": 11, "page": 9, "country": 9}
+
+
+def _day_start(day):
+    """Aware local midnight of ``day``: days are filtered as half-open
+    datetime ranges, which use the index on ``created_at`` (a ``__date``
+    lookup casts every row)."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup_visits(days=30):
+    """Recompute DailyVisitStat for the last ``days`` days from raw visits."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = (
+        SiteVisit.objects.filter(created_at__gte=_day_start(since), is_bot=False)
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "country")
+        .annotate(visits=Count("id"))
+    )
+    stats = [DailyVisitStat(**row) for row in rows]
+    with transaction.atomic():
+        DailyVisitStat.objects.filter(day__gte=since).delete()
+        DailyVisitStat.objects.bulk_create(stats)
+    return len(stats)
+
+
+def geoip_backfill(chunk_size=BACKFILL_CHUNK, only_unknown=True):
+    """Fill SiteVisit.country/city from the local GeoIP database.
+
+    Walks the table by primary key ranges and issues one UPDATE per distinct
+    location in each chunk.  Returns the number of visits updated.
+    """
+    if geoip.get_database() is None:
+        return 0
+    visits = SiteVisit.objects.exclude(ip_address__isnull=True)
+    if only_unknown:
+        visits = visits.filter(country="Inconnu")
+    updated = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            visits.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "ip_address")[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        by_location = {}
+        for pk, ip in chunk:
+            location = geoip.lookup(ip)
+            if location:
+                by_location.setdefault(location, []).append(pk)
+        for (country, city), pks in by_location.items():
+            updated += SiteVisit.objects.filter(pk__in=pks).update(
+                country=country or "Inconnu", city=city or "Inconnu"
+            )
+    return updated
+
+
+def build_visit_sketches(days=2):
+    """(Re)build the VisitSketch rows of the last ``days`` days from raw visits.
+
+    Past days never change, so a periodic run only needs ``days=2`` (today
+    and yesterday); use a larger value once to backfill.
+    """
+    today = timezone.localdate()
+    written = 0
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        sketches, visits = {}, {}
+        rows = (
+            SiteVisit.objects.filter(
+                created_at__gte=_day_start(day),
+                created_at__lt=_day_start(day + timedelta(days=1)),
+                is_bot=False,
+            )
+            .exclude(ip_address__isnull=True)
+            .values_list("ip_address", "page", "country")
+            .iterator(chunk_size=BACKFILL_CHUNK)
+        )
+        for ip, page, country in rows:
+            for dimension, key in (("all", ""), ("page", page), ("country", country)):
+                sketch = sketches.get((dimension, key))
+                if sketch is None:
+                    sketch = sketches[(dimension, key)] = HyperLogLog(
+                        SKETCH_PRECISION[dimension]
+                    )
+                sketch.add(ip)
+                visits[(dimension, key)] = visits.get((dimension, key), 0) + 1
+        objs = [
+            VisitSketch(
+                day=day,
+                dimension=dimension,
+                key=key,
+                registers=sketch.to_bytes(),
+                uniques=sketch.count(),
+                visits=visits[(dimension, key)],
+            )
+            for (dimension, key), sketch in sketches.items()
+        ]
+        VisitSketch.objects.bulk_create(
+            objs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["dimension", "key", "day"],
+            update_fields=["registers", "uniques", "visits", "updated_at"],
+        )
+        written += len(objs)
+    return written
+
+
+def unique_visitors(start, end, dimension="all", key=""):
+    """Approximate distinct visitors between two dates (inclusive).
+
+    Merges the stored daily sketches, plus today's live sketch from the
+    presence tracker, without reading SiteVisit.
+    """
+    rows = VisitSketch.objects.filter(
+        dimension=dimension, key=key, day__gte=start, day__lte=end
+    ).values_list("registers", flat=True)
+    sketches = [HyperLogLog.from_bytes(r) for r in rows]
+    today = timezone.localdate()
+    if dimension == "all" and start <= today <= end:
+        live = presence.day_sketch(today)
+        if live is not None:
+            sketches.append(live)
+    return HyperLogLog.merged(sketches, SKETCH_PRECISION[dimension]).count()
+
+
+def daily_uniques(days=90):
+    """``[(day, unique visitors)]`` for the trend chart, in one small query."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        VisitSketch.objects.filter(dimension="all", key="", day__gte=since)
+        .order_by("day")
+        .values_list("day", "uniques")
+    )
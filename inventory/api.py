@@ -0,0 +1,257 @@
+"""Read-only JSON catalogue API (``/api/...``).
+
+Rows are fetched with ``.values()`` projections (no model instances) and
+the serialised bodies are cached per catalogue generation, like the
+anonymous page cache, so a repeated request costs two cache reads.
+"""
+
+import base64
+import binascii
+import gzip
+import json
+from datetime import datetime
+from decimal import Decimal
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Min, Q
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.views.decorators.http import require_GET
+
+from .cache import car_last_modified, catalogue_version
+from .catalogue import filter_cars, read_filters
+from .decorators import page_cache_key, read_from_replica
+from .models import Car
+from .routers import primary_reads
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+API_FIELDS = [
+    "id",
+    "brand",
+    "model",
+    "price",
+    "year",
+    "kilometrage",
+    "fuel",
+    "transmission",
+    "city",
+    "status",
+    "description",
+    "image",
+    "created_at",
+    "updated_at",
+]
+LIST_FIELDS = [f for f in API_FIELDS if f not in ("description", "updated_at")]
+FACET_FIELDS = ["brand", "fuel", "transmission", "city"]
+FACET_LIMIT = 20
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+GZIP_MIN_SIZE = 1024
+API_MAX_AGE = 60
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+
+def dumps(data):
+    """Serialise to JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def _json_response(request, body, compressed=None, status=200):
+    if compressed is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(compressed, status=status)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(body, status=status)
+    response["Content-Type"] = "application/json"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def api_endpoint(etag_func):
+    """GET-only JSON endpoint: ETag validation, cached body, optional gzip.
+
+    ``etag_func(request, version, *args)`` gets the catalogue generation,
+    read once per request and shared with the cache key. The view returns
+    plain data (or raises ApiError); the serialised body and its gzipped
+    variant are cached under the request's page cache key.
+    """
+
+    def decorator(view):
+        @read_from_replica
+        @require_GET
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            version = catalogue_version()
+            etag = etag_func(request, version, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+
+            key = page_cache_key(request, version)
+            cached = cache.get(key)
+            if cached is None:
+                try:
+                    # Stored under this generation: read the primary.
+                    with primary_reads():
+                        body = dumps(view(request, *args, **kwargs))
+                except ApiError as exc:
+                    return _json_response(
+                        request, dumps({"error": exc.message}), status=exc.status
+                    )
+                compressed = None
+                if len(body) >= GZIP_MIN_SIZE:
+                    compressed = gzip.compress(body, compresslevel=6)
+                cached = (body, compressed)
+                cache.set(key, cached, settings.PAGE_CACHE_TIMEOUT)
+            response = _json_response(request, *cached)
+            response["ETag"] = etag
+            patch_cache_control(response, public=True, max_age=API_MAX_AGE)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# Weak ETags: the gzipped and identity bodies share them.
+def _catalogue_etag(request, version, *args, **kwargs):
+    return f'W/"api-{version}"'
+
+
+def _car_etag(request, version, pk):
+    modified = car_last_modified(pk)
+    stamp = int(modified.timestamp() * 1e6) if modified else 0
+    return f'W/"api-car-{pk}-{stamp}"'
+
+
+def _fields(request, default):
+    raw = request.GET.get("fields", "")
+    if not raw:
+        return default
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in API_FIELDS]
+    if unknown:
+        raise ApiError(400, f"Champ(s) inconnu(s) : {', '.join(unknown)}")
+    return fields
+
+
+def _project(rows, fields):
+    """Keep the requested fields; image names become URLs."""
+    data = []
+    for row in rows:
+        item = {f: row[f] for f in fields}
+        if "image" in item:
+            item["image"] = (
+                default_storage.url(item["image"]) if item["image"] else None
+            )
+        data.append(item)
+    return data
+
+
+def _encode_cursor(row):
+    raw = f"{row['created_at'].isoformat()}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ApiError(400, "Curseur invalide")
+
+
+def _public_cars(request):
+    return filter_cars(
+        Car.objects.filter(status="Disponible"), read_filters(request.GET)
+    )
+
+
+@api_endpoint(_catalogue_etag)
+def car_list(request):
+    """Available cars, newest first, with the home page filters.
+
+    Keyset pagination: ``next`` carries an opaque cursor (created_at, id), so
+    deep pages cost the same as the first one.
+    """
+    fields = _fields(request, LIST_FIELDS)
+    try:
+        limit = min(max(int(request.GET.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise ApiError(400, "limit doit être un entier")
+
+    cars = _public_cars(request).order_by("-created_at", "-id")
+    cursor = request.GET.get("cursor")
+    if cursor:
+        created, pk = _decode_cursor(cursor)
+        cars = cars.filter(Q(created_at__lt=created) | Q(created_at=created, id__lt=pk))
+
+    columns = list(dict.fromkeys(fields + ["id", "created_at"]))
+    rows = list(cars.values(*columns)[: limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params["cursor"] = _encode_cursor(rows[-1])
+        next_url = f"{request.path}?{params.urlencode()}"
+    return {"results": _project(rows, fields), "next": next_url}
+
+
+@api_endpoint(_car_etag)
+def car_detail(request, pk):
+    fields = _fields(request, API_FIELDS)
+    row = Car.objects.filter(pk=pk).exclude(status="En attente").values(*fields)
+    row = row.first()
+    if row is None:
+        raise ApiError(404, "Véhicule introuvable")
+    return _project([row], fields)[0]
+
+
+@api_endpoint(_catalogue_etag)
+def car_facets(request):
+    """Counts per brand / fuel / transmission / city and price/year ranges."""
+    cars = _public_cars(request)
+    data = cars.aggregate(
+        total=Count("id"),
+        price_min=Min("price"),
+        price_max=Max("price"),
+        year_min=Min("year"),
+        year_max=Max("year"),
+    )
+    for field in FACET_FIELDS:
+        counts = (
+            cars.values(field)
+            .annotate(count=Count("id"))
+            .order_by("-count", field)[:FACET_LIMIT]
+        )
+        data[field] = [{"value": c[field], "count": c["count"]} for c in counts]
+    return data
@@ -0,0 +1,159 @@
+"""Async variants of the hot public views, routed when ``ASYNC_VIEWS`` is on.
+
+They render the same templates with the same context as ``views.py`` but
+await the async ORM, so under the ASGI deployment a slow query parks the
+coroutine instead of blocking a worker.  Every queryset is materialised
+before ``render()``: templates must not touch the database from the event
+loop.
+"""
+
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import redirect, render
+
+from . import compare, userstats
+from .catalogue import (
+    available_cities,
+    detail_queryset,
+    listing_queryset,
+    read_filters,
+    read_sort,
+    similar_cars_queryset,
+)
+from .decorators import (
+    aget_user,
+    alogin_required,
+    anonymous_page_cache,
+    cacheable_page,
+    read_from_replica,
+)
+from .forms import MessageForm
+from .history import aprice_history
+from .models import Car, Favorite
+from .views import (
+    _car_detail_context,
+    _car_etag,
+    _car_last_modified,
+    _catalogue_etag,
+    _catalogue_last_modified,
+    _compare_context,
+    _home_context,
+)
+
+
+async def _get_car(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except Car.DoesNotExist:
+        raise Http404("Aucun véhicule ne correspond.")
+
+
+# --- ACCUEIL + FILTRES AVANCÉS ---
+@read_from_replica
+@cacheable_page(_catalogue_etag, _catalogue_last_modified)
+@anonymous_page_cache
+async def home(request):
+    user = await aget_user(request)
+    filters = read_filters(request.GET)
+    sort = read_sort(request.GET)
+    cars = listing_queryset(filters, sort)
+
+    paginator = Paginator(cars, 9)
+    paginator.count = await cars.acount()
+    page_obj = paginator.get_page(request.GET.get("page"))
+    page_obj.object_list = [car async for car in page_obj.object_list]
+
+    user_favorites = []
+    if user.is_authenticated:
+        user_favorites = [
+            car_id
+            async for car_id in Favorite.objects.filter(user=user).values_list(
+                "car_id", flat=True
+            )
+        ]
+    cities = [city async for city in available_cities()]
+
+    return render(
+        request,
+        "inventory/home.html",
+        _home_context(filters, sort, page_obj, user_favorites, cities),
+    )
+
+
+# --- DÉTAILS VOITURE ---
+@read_from_replica
+@cacheable_page(_car_etag, _car_last_modified)
+@anonymous_page_cache
+async def car_detail(request, pk):
+    user = await aget_user(request)
+    car = await _get_car(detail_queryset(user), pk=pk)
+    similar_cars = [c async for c in similar_cars_queryset(car)]
+    message_form = MessageForm() if user.is_authenticated else None
+    prices = [price for _, price in await aprice_history(car)]
+
+    return render(
+        request,
+        "inventory/car_detail.html",
+        _car_detail_context(car, similar_cars, message_form, prices),
+    )
+
+
+# --- FAVORIS ---
+@alogin_required
+async def toggle_favorite(request, car_id):
+    car = await _get_car(Car.objects.all(), id=car_id)
+    favorite, created = await Favorite.objects.aget_or_create(
+        user=request.user, car=car
+    )
+
+    if not created:
+        await favorite.adelete()
+        await sync_to_async(userstats.bump)(request.user.pk, "favorites", -1)
+        messages.info(request, f"{car.brand} retirée des favoris.")
+    else:
+        messages.success(request, f"{car.brand} ajoutée aux favoris !")
+
+    return redirect(request.META.get("HTTP_REFERER", "home"))
+
+
+@alogin_required
+async def favorite_list(request):
+    my_favorites = [
+        fav
+        async for fav in Favorite.objects.filter(user=request.user).select_related(
+            "car"
+        )
+    ]
+    return render(
+        request,
+        "inventory/favorites.html",
+        {"favorites": my_favorites, "year": datetime.now().year},
+    )
+
+
+# --- COMPARATEUR ---
+@alogin_required
+async def add_to_compare(request, car_id):
+    car = await _get_car(Car.objects.only("id"), pk=car_id)
+    if await sync_to_async(compare.add)(request.user, car):
+        messages.success(request, "Véhicule ajouté au comparateur !")
+    else:
+        messages.info(request, "Ce véhicule est déjà dans le comparateur.")
+    return redirect(request.META.get("HTTP_REFERER", "home"))
+
+
+@alogin_required
+async def remove_from_compare(request, car_id):
+    if await sync_to_async(compare.remove)(request.user, car_id):
+        messages.info(request, "Véhicule retiré du comparateur.")
+    return redirect("compare_cars")
+
+
+@alogin_required
+async def compare_cars(request):
+    cars = [car async for car in compare.compared_cars(request.user)]
+    return render(request, "inventory/compare.html", _compare_context(cars))
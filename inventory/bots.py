@@ -0,0 +1,81 @@
+import re
+import time
+from functools import lru_cache
+
+# Lower-case substrings found in the User-Agent of crawlers, link previewers,
+# monitors and HTTP libraries, matched by one combined regex.
+BOT_SIGNATURES = [
+    "crawl",
+    "spider",
+    "slurp",
+    "scrap",
+    "fetch",
+    "preview",
+    "monitor",
+    "headless",
+    "phantomjs",
+    "lighthouse",
+    "pingdom",
+    "facebookexternalhit",
+    "embedly",
+    "whatsapp",
+    "semrush",
+    "ahrefs",
+    "mj12",
+    "yandex",
+    "baiduspider",  # not "baidu": Baidu's mobile browser (baiduboxapp) is human
+    "bytespider",
+    "python-requests",
+    "python-urllib",
+    "aiohttp",
+    "httpx",
+    "curl/",
+    "wget",
+    "go-http-client",
+    "java/",
+    "okhttp",
+    "axios",
+    "node-fetch",
+    "libwww",
+    "httpclient",
+    "+http",  # crawlers link their documentation page, browsers never do
+]
+# "bot" only as a word or followed by a version or separator ("Googlebot/2.1",
+# "AdsBot-Google", "like Twitterbot)"): phone models contain it too
+# ("CUBOT X30", "CUBOT_NOTE_20").
+BOT_PATTERNS = [r"\bbot\b", r"bot[/;)\-]", r"bot$"]
+
+# Lower-casing the UA first is ~10x faster than re.IGNORECASE on alternations.
+_BOT_RE = re.compile("|".join([*map(re.escape, BOT_SIGNATURES), *BOT_PATTERNS]))
+
+
+@lru_cache(maxsize=4096)
+def is_bot_user_agent(user_agent):
+    """True for empty or known-bot User-Agent strings (verdict cached per UA)."""
+    return not user_agent or _BOT_RE.search(user_agent.lower()) is not None
+
+
+class RateTracker:
+    """Flags IPs issuing more than ``limit`` requests per ``window`` seconds.
+
+    Fixed windows kept in a plain dict: O(1) per request, pruned when it grows.
+    """
+
+    def __init__(self, limit=120, window=60, max_entries=10000):
+        self.limit = limit
+        self.window = window
+        self.max_entries = max_entries
+        self._hits = {}
+
+    def hit(self, ip, now=None):
+        """Count a request from ``ip``; True once it exceeds the rate."""
+        now = time.monotonic() if now is None else now
+        start, count = self._hits.get(ip, (now, 0))
+        if now - start >= self.window:
+            start, count = now, 0
+        count += 1
+        self._hits[ip] = (start, count)
+        if len(self._hits) > self.max_entries:
+            cutoff = now - self.window
+            self._hits = {k: v for k, v in self._hits.items() if v[0] > cutoff}
+        return count > self.limit
@@ -0,0 +1,84 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db.models import Max
+
+CATALOGUE_VERSION_KEY = "catalogue:version"
+FRESHNESS_TIMEOUT = 24 * 3600
+
+_state = threading.local()
+
+
+def catalogue_version():
+    """Generation number of the public catalogue, bumped on every Car change."""
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a cache flush never reuses an old generation.
+        cache.add(CATALOGUE_VERSION_KEY, int(time.time()), None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def _per_version(name, compute):
+    """Cache ``compute()`` for the current catalogue generation only.
+
+    ``compute`` must read the primary: a lagging replica would pin an old
+    value to the new generation.
+    """
+    key = f"catalogue:{catalogue_version()}:{name}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, FRESHNESS_TIMEOUT)
+    return value
+
+
+def catalogue_last_modified():
+    """Most recent ``Car.updated_at``, read from the DB once per generation.
+
+    Deletions do not move it forward: pages also carry the generation in
+    their ETag, which catches them.
+    """
+    from .models import Car
+
+    return _per_version(
+        "last_modified",
+        lambda: Car.objects.using("default").aggregate(m=Max("updated_at"))["m"],
+    )
+
+
+def car_last_modified(pk):
+    """``updated_at`` of one car (None if it does not exist), cached likewise."""
+    from .models import Car
+
+    car = Car.objects.using("default").filter(pk=pk)
+    return _per_version(
+        f"car:{pk}:last_modified",
+        lambda: car.values_list("updated_at", flat=True).first(),
+    )
+
+
+def invalidate_catalogue():
+    """Bump the catalogue generation (deferred while inside ``batch_invalidation``)."""
+    if getattr(_state, "depth", 0):
+        _state.pending = True
+        return
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, int(time.time()), None)
+
+
+@contextmanager
+def batch_invalidation():
+    """Coalesce every invalidation raised inside the block into a single one."""
+    _state.depth = getattr(_state, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        if not _state.depth and getattr(_state, "pending", False):
+            _state.pending = False
+            invalidate_catalogue()
@@ -0,0 +1,169 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Appointment, Car, Favorite
+
+# Query parameters understood by ``filter_cars`` (home page and JSON API).
+FILTER_PARAMS = [
+    "q",
+    "fuel",
+    "transmission",
+    "price_min",
+    "price_max",
+    "year_min",
+    "year_max",
+    "city",
+]
+# Columns shown by the car page (external_ref is not).
+DETAIL_FIELDS = [
+    "id",
+    "brand",
+    "model",
+    "price",
+    "year",
+    "kilometrage",
+    "fuel",
+    "transmission",
+    "city",
+    "status",
+    "description",
+    "image",
+    "price_stat",
+    "created_at",
+    "updated_at",
+    "view_count",
+]
+
+
+def _number(value, cast):
+    try:
+        number = cast(value)
+    except (ValueError, TypeError, InvalidOperation):
+        return None
+    if isinstance(number, Decimal) and not number.is_finite():
+        return None
+    return number
+
+
+def read_filters(params):
+    """The catalogue filters of a QueryDict, as stripped strings ("" if absent)."""
+    return {name: params.get(name, "").strip() for name in FILTER_PARAMS}
+
+
+def filter_cars(cars, filters):
+    """Apply the public search filters; malformed numbers are ignored."""
+    query = filters.get("q")
+    if query:
+        cars = cars.filter(
+            Q(brand__icontains=query)
+            | Q(model__icontains=query)
+            | Q(city__icontains=query)
+        )
+    if filters.get("fuel"):
+        cars = cars.filter(fuel=filters["fuel"])
+    if filters.get("transmission"):
+        cars = cars.filter(transmission=filters["transmission"])
+    for name, lookup, cast in (
+        ("price_min", "price__gte", Decimal),
+        ("price_max", "price__lte", Decimal),
+        ("year_min", "year__gte", int),
+        ("year_max", "year__lte", int),
+    ):
+        value = _number(filters.get(name) or None, cast)
+        if value is not None:
+            cars = cars.filter(**{lookup: value})
+    if filters.get("city"):
+        cars = cars.filter(city__icontains=filters["city"])
+    return cars
+
+
+# Columns rendered by the listing cards (home.html).
+LISTING_FIELDS = [
+    "id",
+    "brand",
+    "model",
+    "price",
+    "year",
+    "kilometrage",
+    "fuel",
+    "city",
+    "image",
+    "description",
+    "status",
+    "created_at",
+    "price_stat__q1",
+    "price_stat__q3",
+]
+
+
+# Home page sorts: ``?sort=`` value -> (label, ordering). Each ordering
+# follows a ``(status, ...)`` index of Car, so pages are read in index order.
+SORTS = {
+    "": ("Plus récents", ["-created_at"]),
+    "popular": ("Populaires", ["-popularity", "-id"]),
+    "price_asc": ("Prix croissant", ["price", "id"]),
+    "price_desc": ("Prix décroissant", ["-price", "-id"]),
+    "km": ("Kilométrage", ["kilometrage", "id"]),
+}
+
+
+def read_sort(params):
+    """The ``sort`` query parameter, "" (newest first) when unknown."""
+    sort = params.get("sort", "")
+    return sort if sort in SORTS else ""
+
+
+def listing_queryset(filters, sort=""):
+    """Available cars matching ``filters``, in ``sort`` order, for the listing."""
+    cars = (
+        Car.objects.filter(status="Disponible")
+        .select_related("price_stat")
+        .only(*LISTING_FIELDS)
+    )
+    return filter_cars(cars, filters).order_by(*SORTS[sort][1])
+
+
+def available_cities():
+    """Distinct cities of the available cars, for the filter dropdown."""
+    return (
+        Car.objects.filter(status="Disponible")
+        .values_list("city", flat=True)
+        .distinct()
+        .order_by("city")
+    )
+
+
+def similar_cars_queryset(car, limit=3):
+    return (
+        Car.objects.filter(brand=car.brand, status="Disponible")
+        .exclude(pk=car.pk)
+        .only("id", "brand", "model", "price", "image")[:limit]
+    )
+
+
+def detail_queryset(user):
+    """The car page in one query: the car and its market stats, whether
+    ``user`` favourited it (``is_favorite``) and its upcoming appointments
+    (``upcoming_appointments``)."""
+    upcoming = (
+        Appointment.objects.filter(car=OuterRef("pk"), date_rdv__gte=timezone.now())
+        .order_by()
+        .values("car")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    if user.is_authenticated:
+        favorite = Exists(Favorite.objects.filter(car=OuterRef("pk"), user=user))
+    else:
+        favorite = Value(False)
+    return (
+        Car.objects.select_related("price_stat")
+        .only(*DETAIL_FIELDS)
+        .annotate(
+            is_favorite=favorite,
+            upcoming_appointments=Coalesce(Subquery(upcoming), 0),
+        )
+    )
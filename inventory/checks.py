@@ -0,0 +1,23 @@
+"""System checks of the deployment settings (run by ``check`` and ``migrate``)."""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Several workers need a cache they all see (REDIS_URL)."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.WEB_CONCURRENCY > 1 and backend.endswith(".LocMemCache"):
+        return [
+            Warning(
+                "Plusieurs workers (WEB_CONCURRENCY > 1) avec un cache en "
+                "mémoire locale, non partagé entre les processus.",
+                hint=(
+                    "Définissez REDIS_URL : sinon les pages en cache, la présence "
+                    "et les sessions diffèrent d'un worker à l'autre."
+                ),
+                id="inventory.W001",
+            )
+        ]
+    return []
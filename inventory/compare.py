@@ -0,0 +1,114 @@
+"""Comparator: per-user compare lists and the side-by-side spec table.
+
+The list lives in the ``CompareItem`` table rather than the session, so
+adding a car writes one small row instead of re-saving the whole session,
+and the compare page loads the cars in a single query.
+"""
+
+from django.db.models import Q
+
+from .models import Car, CompareItem
+
+COMPARE_LIMIT = 4
+SUGGESTION_LIMIT = 8
+
+# Columns read by the compare page (compare.html).
+COMPARE_FIELDS = [
+    "id",
+    "brand",
+    "model",
+    "price",
+    "year",
+    "kilometrage",
+    "fuel",
+    "transmission",
+    "city",
+    "image",
+    "status",
+]
+
+# (label, attribute, unit, best value: "min" / "max" / None)
+SPECS = [
+    ("Prix", "price", "FCFA", "min"),
+    ("Année", "year", "", "max"),
+    ("Kilométrage", "kilometrage", "km", "min"),
+    ("Carburant", "fuel", "", None),
+    ("Transmission", "transmission", "", None),
+    ("Ville", "city", "", None),
+]
+
+
+def compared_cars(user):
+    """The user's compared cars, oldest addition first (one query)."""
+    return (
+        Car.objects.filter(compareitem__user=user)
+        .only(*COMPARE_FIELDS)
+        .order_by("compareitem__created_at")
+    )
+
+
+def add(user, car):
+    """Add ``car`` to the user's list, dropping the oldest beyond the limit.
+
+    Returns False when the car was already being compared. ``get_or_create``
+    absorbs the unique (user, car) race of two concurrent adds.
+    """
+    _, created = CompareItem.objects.get_or_create(user=user, car=car)
+    if not created:
+        return False
+    newest_first = CompareItem.objects.filter(user=user).order_by("-created_at", "-id")
+    overflow = list(newest_first.values_list("id", flat=True)[COMPARE_LIMIT:])
+    if overflow:
+        CompareItem.objects.filter(id__in=overflow).delete()
+    return True
+
+
+def remove(user, car_id):
+    """Remove a car from the user's list; returns False if it was not there."""
+    deleted, _ = CompareItem.objects.filter(user=user, car_id=car_id).delete()
+    return bool(deleted)
+
+
+def spec_table(cars):
+    """Side-by-side specs: one column per car, each a list of spec cells.
+
+    A cell is flagged ``differs`` when the cars disagree on that spec, and
+    ``best`` for the lowest price / mileage and the most recent year.
+    """
+    columns = [{"car": car, "specs": []} for car in cars]
+    for label, attr, unit, best in SPECS:
+        values = [getattr(car, attr) for car in cars]
+        differs = len(set(values)) > 1
+        target = None
+        if best and differs:
+            target = min(values) if best == "min" else max(values)
+        for column, value in zip(columns, values):
+            column["specs"].append(
+                {
+                    "label": label,
+                    "value": value,
+                    "unit": unit,
+                    "numeric": best is not None,
+                    "differs": differs,
+                    "best": target is not None and value == target,
+                }
+            )
+    return columns
+
+
+def suggestions(query, user, limit=SUGGESTION_LIMIT):
+    """Available cars matching ``query`` (brand / model) for the autocomplete.
+
+    Cars already in the user's list are left out. Returns ``values()`` rows.
+    """
+    words = query.split()
+    if not words:
+        return []
+    cars = Car.objects.filter(status="Disponible").exclude(compareitem__user=user)
+    for word in words:
+        cars = cars.filter(Q(brand__icontains=word) | Q(model__icontains=word))
+    return list(
+        cars.order_by("brand", "model", "-year").values(
+            "id", "brand", "model", "year", "price"
+        )[:limit]
+    )
@@ -0,0 +1,17 @@
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import unread_count
+
+
+def notifications(request):
+    """``unread_notifications`` for the navbar badge.
+
+    Lazy: the cache is only read when a template shows it, and never for
+    anonymous visitors. Async views have it preloaded by ``aget_user``.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    if hasattr(request, "unread_notifications"):
+        return {"unread_notifications": request.unread_notifications}
+    return {"unread_notifications": SimpleLazyObject(lambda: unread_count(user))}
@@ -0,0 +1,110 @@
+"""PostgreSQL backend with an in-process connection pool (psycopg2).
+
+Selected by ``DATABASE_POOL_SIZE`` in core/settings.py. Django opens a
+connection per request (``CONN_MAX_AGE = 0``); here "opening" takes an idle
+connection from the pool and "closing" hands it back, rolled back if a
+transaction was left open, so a request does not pay for a new backend
+connection and no persistent connection is tied to a thread.
+
+psycopg2's pool raises as soon as it is exhausted: a semaphore sized like
+the pool makes extra threads wait up to ``POOL_TIMEOUT`` seconds for a
+connection instead, and only then fail with ``OperationalError``.
+"""
+
+import os
+import threading
+
+import psycopg2.extensions
+import psycopg2.pool
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+if is_psycopg3:  # pragma: no cover - requirements.txt pins psycopg2
+    raise ImproperlyConfigured("postgresql_pool requires psycopg2.")
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class _Pool:
+    """``ThreadedConnectionPool`` whose ``getconn`` waits for a free slot."""
+
+    def __init__(self, size, timeout, conn_params):
+        # Opened lazily (minconn 0), but psycopg2 only keeps a returned
+        # connection while fewer than minconn are idle: keep all of them.
+        self.connections = psycopg2.pool.ThreadedConnectionPool(0, size, **conn_params)
+        self.connections.minconn = size
+        self.slots = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                f"No pooled connection available after {self.timeout} s."
+            )
+        try:
+            connection = self.connections.getconn()
+            while connection.closed:
+                self.connections.putconn(connection, close=True)
+                connection = self.connections.getconn()
+        except BaseException:
+            self.slots.release()
+            raise
+        return connection
+
+    def putconn(self, connection, close=False):
+        try:
+            self.connections.putconn(connection, close=close)
+        finally:
+            self.slots.release()
+
+
+def _get_pool(alias, settings_dict, conn_params):
+    """The pool of ``alias`` in this process (re-created after a fork)."""
+    pid = os.getpid()
+    with _pools_lock:
+        owner, pool = _pools.get(alias, (None, None))
+        if owner != pid:
+            pool = _Pool(
+                settings_dict["POOL_SIZE"],
+                settings_dict.get("POOL_TIMEOUT", 10),
+                conn_params,
+            )
+            _pools[alias] = (pid, pool)
+        return pool
+
+
+class _PooledDatabase:
+    """psycopg2 stand-in whose ``connect()`` borrows from the pool."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def connect(self, **conn_params):
+        return self._pool.getconn()
+
+    def __getattr__(self, name):
+        return getattr(base.Database, name)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        self._pool = _get_pool(self.alias, self.settings_dict, conn_params)
+        # Instance attribute: only this wrapper (one per thread) is affected.
+        self.Database = _PooledDatabase(self._pool)
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        try:
+            if connection.info.transaction_status != IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            self._pool.putconn(connection, close=True)
+        else:
+            self._pool.putconn(connection, close=bool(connection.closed))
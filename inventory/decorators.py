@@ -0,0 +1,280 @@
+import hashlib
+from calendar import timegm
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from .cache import catalogue_version
+from .notifications import unread_count
+from .routers import STICKY_COOKIE, primary_reads, replica_reads
+from .static_assets import strip_html
+
+# Query parameters that never change the rendered page.
+IGNORED_PARAMS = {"fbclid", "gclid"}
+
+
+def _load_user(request):
+    """Evaluate the lazy ``request.user`` (session + user queries), and the
+    navbar's unread notification count for a logged-in user."""
+    if request.user.is_authenticated:
+        request.unread_notifications = unread_count(request.user)
+    return request.user
+
+
+# Async views call this first: afterwards request.user, the session, the
+# message storage and the unread count are loaded and safe to use from the
+# event loop.
+aget_user = sync_to_async(_load_user)
+
+
+def alogin_required(view):
+    """``login_required`` for async views (Django 4.2's is sync-only)."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _validators(request, etag_func, last_modified_func, user_suffix, args, kwargs):
+    """``(etag, last_modified timestamp)`` as Django's ``condition`` computes them."""
+    etag = last_modified = None
+    if etag_func:
+        etag = etag_func(request, *args, **kwargs)
+        if etag and user_suffix:
+            # The navbar badge is per-user state too.
+            etag = f"{etag}-u{request.user.pk}-n{unread_count(request.user)}"
+        etag = etag and quote_etag(etag)
+    # Per-user pages are validated on the ETag alone: a Last-Modified date
+    # does not cover the per-user state.
+    if last_modified_func and not user_suffix:
+        modified = last_modified_func(request, *args, **kwargs)
+        last_modified = modified and timegm(modified.utctimetuple())
+    return etag, last_modified
+
+
+def _prepare(request, etag_func, last_modified_func, per_user, args, kwargs):
+    """Pick the caching policy and answer 304 early when validators match.
+
+    Returns ``(policy, etag, last_modified, response or None)``.
+    """
+    if len(get_messages(request)):
+        return "messages", None, None, None
+    if request.user.is_authenticated:
+        policy = "user"
+        if not per_user:
+            return policy, None, None, None
+    else:
+        policy = "public"
+    etag, last_modified = _validators(
+        request, etag_func, last_modified_func, policy == "user", args, kwargs
+    )
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return policy, etag, last_modified, response
+
+
+def _finish(request, response, policy, etag, last_modified, max_age):
+    if request.method in ("GET", "HEAD"):
+        if last_modified and not response.has_header("Last-Modified"):
+            response.headers["Last-Modified"] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault("ETag", etag)
+    if policy == "messages":
+        patch_cache_control(response, private=True, no_cache=True)
+    elif policy == "user" or request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        # Per-user content, or a CSRF token was rendered: not shareable.
+        patch_cache_control(response, private=True, max_age=0)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+def cacheable_page(etag_func=None, last_modified_func=None, max_age=60, per_user=False):
+    """HTTP conditional GET + Cache-Control for catalogue pages.
+
+    Anonymous requests are validated like Django's ``condition``: when the
+    validators still match, a 304 is returned before the view (and its
+    queries) runs, and rendered pages are marked ``public``.  Authenticated
+    pages embed per-user state (favourites, CSRF token) so they are
+    ``private`` and vary on the cookie; with ``per_user`` they are still
+    validated, on an ETag that includes the user id and unread notification
+    count.  Pending flash messages
+    always force a full render.  Works on sync and async views.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                policy, etag, modified, response = await sync_to_async(_prepare)(
+                    request, etag_func, last_modified_func, per_user, args, kwargs
+                )
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, policy, etag, modified, max_age)
+
+        else:
+
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                policy, etag, modified, response = _prepare(
+                    request, etag_func, last_modified_func, per_user, args, kwargs
+                )
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(request, response, policy, etag, modified, max_age)
+
+        return wrapper
+
+    return decorator
+
+
+def _normalised_query(request):
+    """Sorted, de-duplicated query string without empty or tracking params."""
+    items = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        if key not in IGNORED_PARAMS and not key.startswith("utm_")
+        for value in set(values)
+        if value != ""
+    )
+    return urlencode(items)
+
+
+def page_cache_key(request, version=None):
+    """Cache key of an anonymous page: generation + path + normalised query."""
+    raw = f"{request.path}?{_normalised_query(request)}"
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    if version is None:
+        version = catalogue_version()
+    return f"page:{version}:{digest}"
+
+
+def _cache_lookup(request):
+    """``(key, cached response)``; key is None when the page must not be cached."""
+    if (
+        not settings.PAGE_CACHE_TIMEOUT
+        or request.method not in ("GET", "HEAD")
+        or request.user.is_authenticated
+        or len(get_messages(request))
+    ):
+        return None, None
+    key = page_cache_key(request)
+    cached = cache.get(key)
+    if cached is None:
+        return key, None
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response["X-Page-Cache"] = "hit"
+    response.html_stripped = True
+    return key, response
+
+
+def _cache_store(request, key, response):
+    if (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    ):
+        strip_html(response)
+        cache.set(
+            key,
+            (response.content, response["Content-Type"]),
+            settings.PAGE_CACHE_TIMEOUT,
+        )
+        response["X-Page-Cache"] = "miss"
+
+
+def anonymous_page_cache(view):
+    """Serve rendered pages to anonymous visitors from the cache.
+
+    Entries are keyed on the catalogue generation, so any Car change makes
+    them unreachable (they then expire after ``PAGE_CACHE_TIMEOUT``). A page
+    that may be stored is rendered from the primary, never from a replica
+    that could still lag behind that generation. Stored pages are trimmed
+    by ``strip_html`` first, so hits are not processed again.
+    Authenticated users, requests with pending flash messages and pages that
+    rendered a CSRF token are never served from, nor stored in, the cache.
+    """
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key, response = await sync_to_async(_cache_lookup)(request)
+            if response is not None:
+                return response
+            if key is None:
+                return await view(request, *args, **kwargs)
+            with primary_reads():
+                response = await view(request, *args, **kwargs)
+            await sync_to_async(_cache_store)(request, key, response)
+            return response
+
+    else:
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, response = _cache_lookup(request)
+            if response is not None:
+                return response
+            if key is None:
+                return view(request, *args, **kwargs)
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            _cache_store(request, key, response)
+            return response
+
+    return wrapper
+
+
+def read_from_replica(view):
+    """Run a read-only view against the replica (when one is configured).
+
+    Only GET/HEAD requests are routed, and not for clients pinned to the
+    primary after a write (``ReplicaStickinessMiddleware``). Without a
+    replica router the flag is simply never read.
+    """
+
+    def use_replica(request):
+        return (
+            request.method in ("GET", "HEAD") and STICKY_COOKIE not in request.COOKIES
+        )
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not use_replica(request):
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not use_replica(request):
+                return view(request, *args, **kwargs)
+            with replica_reads():
+                return view(request, *args, **kwargs)
+
+    return wrapper
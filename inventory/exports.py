@@ -0,0 +1,192 @@
+import csv
+import io
+import os
+import time
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+# A background export whose .part file has not grown for this long is dead
+# (worker crash or process restart).
+EXPORT_STALE_SECONDS = 300
+
+# Spreadsheets evaluate cells starting with these characters as formulas.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+CAR_EXPORT_FIELDS = [
+    "external_ref",
+    "brand",
+    "model",
+    "price",
+    "year",
+    "kilometrage",
+    "fuel",
+    "transmission",
+    "city",
+    "status",
+    "description",
+    "created_at",
+]
+
+VISIT_EXPORT_FIELDS = [
+    "created_at",
+    "ip_address",
+    "country",
+    "city",
+    "page",
+    "user__username",
+    "user_agent",
+]
+
+APPOINTMENT_EXPORT_FIELDS = [
+    "created_at",
+    "date_rdv",
+    "user__username",
+    "car_id",
+    "car__brand",
+    "car__model",
+    "phone",
+    "email",
+    "message",
+]
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "jsonl.gz": ("application/gzip", ".jsonl.gz"),
+}
+
+
+def escape_cell(value):
+    """Quote text that a spreadsheet would run as a formula (CSV injection)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def unescape_cell(value):
+    """Reverse ``escape_cell`` when a CSV export is imported back."""
+    if (
+        isinstance(value, str)
+        and value[:1] == "'"
+        and value[1:].startswith(FORMULA_PREFIXES)
+    ):
+        return value[1:]
+    return value
+
+
+def iter_csv(header, rows, batch_size=EXPORT_CHUNK_SIZE):
+    """Encode rows as CSV, yielding one string per batch of rows.
+
+    Text cells are passed through ``escape_cell``.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow([escape_cell(value) for value in row])
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(header, rows, batch_size=EXPORT_CHUNK_SIZE):
+    """Encode rows as JSON lines, yielding one string per batch of rows."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(header, row))))
+        if len(lines) == batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_gzip(chunks):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(queryset, fields, fmt="csv"):
+    """Encoded chunks of a queryset export, fetched at flat memory.
+
+    Rows are fetched as tuples with ``values_list().iterator()`` so no model
+    instance is built and the driver uses a server-side cursor when it can.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    header = [f.replace("__", "_") for f in fields]
+    if fmt == "csv":
+        return iter_csv(header, rows)
+    chunks = iter_jsonl(header, rows)
+    return iter_gzip(chunks) if fmt == "jsonl.gz" else chunks
+
+
+def streaming_export(queryset, fields, filename, fmt="csv"):
+    """Stream a queryset as CSV, JSONL or gzipped JSONL."""
+    if fmt not in FORMATS:
+        fmt = "csv"
+    content_type, ext = FORMATS[fmt]
+    response = StreamingHttpResponse(
+        iter_export(queryset, fields, fmt), content_type=content_type
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}{ext}"'
+    return response
+
+
+def export_path(name):
+    return os.path.join(settings.EXPORTS_ROOT, os.path.basename(name))
+
+
+def write_export(queryset, fields, name):
+    """Write a gzipped JSONL export to ``EXPORTS_ROOT`` (used off-request).
+
+    The file only appears under its final name once complete. On error the
+    partial file is replaced by a ``.failed`` marker holding the message.
+    """
+    os.makedirs(settings.EXPORTS_ROOT, exist_ok=True)
+    path = export_path(name)
+    try:
+        with open(path + ".part", "wb") as out:
+            for chunk in iter_export(queryset, fields, "jsonl.gz"):
+                out.write(chunk)
+    except Exception as exc:
+        with open(path + ".failed", "w", encoding="utf-8") as marker:
+            marker.write(str(exc))
+        os.remove(path + ".part")
+        raise
+    os.replace(path + ".part", path)
+
+
+def export_state(name):
+    """``(state, error)``: state is ``"ready"``, ``"running"``, ``"failed"``
+    or ``"missing"``; error is the failure message.
+
+    A ``.part`` file left untouched for ``EXPORT_STALE_SECONDS`` belongs to
+    an export that died with its process: it is turned into a failure.
+    """
+    path = export_path(name)
+    if os.path.isfile(path):
+        return "ready", None
+    if not os.path.isfile(path + ".failed"):
+        try:
+            idle = time.time() - os.path.getmtime(path + ".part")
+        except OSError:
+            return "missing", None
+        if idle < EXPORT_STALE_SECONDS:
+            return "running", None
+        os.remove(path + ".part")
+        with open(path + ".failed", "w", encoding="utf-8") as marker:
+            marker.write("génération interrompue")
+    with open(path + ".failed", encoding="utf-8") as marker:
+        return "failed", marker.read()
@@ -88,3 +88,19 @@ class MessageForm(forms.ModelForm):
                 }
             ),
         }
+
+
+class CarImportForm(CarForm):
+    """Validate one row of a bulk import (same rules as CarForm, no photo)."""
+
+    class Meta(CarForm.Meta):
+        fields = ["external_ref"] + [f for f in CarForm.Meta.fields if f != "image"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["external_ref"].required = True
+
+    def validate_unique(self):
+        # Rows are upserted on external_ref: an existing reference is an update,
+        # not a duplicate.
+        pass
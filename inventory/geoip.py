@@ -0,0 +1,128 @@
+"""Offline IP geolocation from a local, memory-mapped range database.
+
+The database is built once from a CSV dump (``start_ip,end_ip,country,city``)
+by the ``build_geoip_db`` command.  On disk it holds three sorted uint32
+arrays (range start, range end, location index) followed by the location
+table; lookups binary-search the mmap'd arrays and never touch the network.
+"""
+
+import csv
+import ipaddress
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+from django.conf import settings
+
+MAGIC = b"GEOIP1\0\0"
+HEADER = struct.Struct("<8sII")  # magic, range count, location table size
+
+
+def ip_to_int(ip):
+    """IPv4 (or IPv4-mapped IPv6) address as an int, None otherwise."""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.version == 6:
+        address = address.ipv4_mapped
+        if address is None:
+            return None
+    return int(address)
+
+
+def _parse_bound(value):
+    value = value.strip()
+    return int(value) if value.isdigit() else ip_to_int(value)
+
+
+def build_database(csv_path, out_path):
+    """Compile a CSV range dump into the binary format; returns the range count."""
+    ranges = []
+    locations = {}
+    with open(csv_path, newline="", encoding="utf-8") as stream:
+        for row in csv.reader(stream):
+            if len(row) < 3:
+                continue
+            start, end = _parse_bound(row[0]), _parse_bound(row[1])
+            if start is None or end is None:
+                continue  # header line, IPv6 range...
+            location = (row[2].strip(), row[3].strip() if len(row) > 3 else "")
+            index = locations.setdefault(location, len(locations))
+            ranges.append((start, end, index))
+    ranges.sort()
+
+    starts = array("I", (r[0] for r in ranges))
+    ends = array("I", (r[1] for r in ranges))
+    indexes = array("I", (r[2] for r in ranges))
+    if sys.byteorder != "little":
+        for arr in (starts, ends, indexes):
+            arr.byteswap()
+    table = "\n".join(f"{c}\t{city}" for c, city in locations).encode("utf-8")
+
+    with open(out_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, len(ranges), len(table)))
+        for arr in (starts, ends, indexes):
+            arr.tofile(out)
+        out.write(table)
+    return len(ranges)
+
+
+class GeoIPDatabase:
+    """Read-only view over a database file built by ``build_database``."""
+
+    def __init__(self, path):
+        with open(path, "rb") as stream:
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, table_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} n'est pas une base GeoIP valide")
+        if sys.byteorder != "little":
+            raise ValueError("Base GeoIP little-endian uniquement")
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        size = 4 * count
+        self.starts = view[offset : offset + size].cast("I")
+        self.ends = view[offset + size : offset + 2 * size].cast("I")
+        self.indexes = view[offset + 2 * size : offset + 3 * size].cast("I")
+        table = bytes(view[offset + 3 * size : offset + 3 * size + table_size])
+        self.locations = [
+            tuple(line.split("\t", 1)) for line in table.decode("utf-8").split("\n")
+        ]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def lookup(self, ip):
+        """``(country, city)`` for an address, or None when not covered."""
+        value = ip_to_int(ip) if isinstance(ip, str) else ip
+        if value is None:
+            return None
+        i = bisect_right(self.starts, value) - 1
+        if i < 0 or value > self.ends[i]:
+            return None
+        return self.locations[self.indexes[i]]
+
+
+@lru_cache(maxsize=1)
+def get_database():
+    """The configured database (``GEOIP_DB_PATH``), or None when disabled."""
+    path = getattr(settings, "GEOIP_DB_PATH", "")
+    if not path:
+        return None
+    try:
+        return GeoIPDatabase(path)
+    except (OSError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def lookup(ip):
+    """Cached ``(country, city)`` lookup; None when unknown or disabled."""
+    database = get_database()
+    if database is None or not ip:
+        return None
+    return database.lookup(ip)
@@ -0,0 +1,116 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import models
+
+from .models import Car, CarChange
+
+PRICE_HISTORY_TIMEOUT = 24 * 3600
+
+# Scalar fields worth keeping a history of (description/photo are left out to
+# keep the log compact).
+TRACKED_FIELDS = [
+    "brand",
+    "model",
+    "price",
+    "year",
+    "kilometrage",
+    "fuel",
+    "transmission",
+    "city",
+    "status",
+]
+
+
+def json_value(name, value):
+    """JSON-ready form of a value of the tracked field ``name``."""
+    field = Car._meta.get_field(name)
+    if isinstance(field, models.DecimalField) and value is not None:
+        # Same representation whether the value comes from a form or the DB.
+        value = str(
+            field.to_python(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+        )
+    return value
+
+
+def snapshot(car):
+    """Current tracked values of a car, JSON-ready."""
+    return {name: json_value(name, getattr(car, name)) for name in TRACKED_FIELDS}
+
+
+def diff(before, after):
+    """Compact ``{field: [old, new]}`` of the fields that actually changed."""
+    before = before or {}
+    return {
+        name: [before.get(name), value]
+        for name, value in after.items()
+        if before.get(name) != value
+    }
+
+
+def record_changes(changes, user=None):
+    """Write ``(car_id, diff)`` pairs with a single INSERT; empty diffs are dropped."""
+    rows = [CarChange(car_id=car_id, user=user, diff=d) for car_id, d in changes if d]
+    if rows:
+        CarChange.objects.bulk_create(rows)
+    return rows
+
+
+def _price_changes(car, limit):
+    return (
+        CarChange.objects.filter(car=car, diff__has_key="price")
+        .order_by("-created_at")
+        .values_list("created_at", "diff")[:limit]
+    )
+
+
+def _history_key(car, limit):
+    # Every price change bumps updated_at, which retires the cached history.
+    return f"car:{car.pk}:prices:{limit}:{car.updated_at.timestamp()}"
+
+
+def price_history(car, limit=30):
+    """``[(datetime, Decimal)]`` of the successive prices of ``car``, oldest first.
+
+    Cached until ``car.updated_at`` moves.
+    """
+    key = _history_key(car, limit)
+    points = cache.get(key)
+    if points is None:
+        points = _price_points(car, list(_price_changes(car, limit)))
+        cache.set(key, points, PRICE_HISTORY_TIMEOUT)
+    return points
+
+
+async def aprice_history(car, limit=30):
+    """Async variant of ``price_history``."""
+    key = _history_key(car, limit)
+    points = await cache.aget(key)
+    if points is None:
+        points = _price_points(car, [c async for c in _price_changes(car, limit)])
+        await cache.aset(key, points, PRICE_HISTORY_TIMEOUT)
+    return points
+
+
+def _price_points(car, changes):
+    changes.reverse()
+    points = []
+    if changes and changes[0][1]["price"][0] is not None:
+        points.append((car.created_at, Decimal(changes[0][1]["price"][0])))
+    for created_at, d in changes:
+        points.append((created_at, Decimal(d["price"][1])))
+    return points
+
+
+def sparkline(values, width=220, height=48, pad=4):
+    """SVG polyline ``points`` attribute for a small price curve."""
+    if len(values) < 2:
+        return ""
+    low, high = min(values), max(values)
+    span = float(high - low) or 1.0
+    step = (width - 2 * pad) / (len(values) - 1)
+    points = []
+    for i, value in enumerate(values):
+        y = height - pad - float(value - low) / span * (height - 2 * pad)
+        points.append(f"{pad + i * step:.1f},{y:.1f}")
+    return " ".join(points)
@@ -0,0 +1,69 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """HyperLogLog cardinality sketch (64-bit hash, one byte per register).
+
+    With the default precision (p=11, 2 KiB) the standard error is about 2.3%.
+    Sketches merge losslessly, so counts over unions (time windows, date
+    ranges) never need the raw values again.
+    """
+
+    def __init__(self, p=11, registers=None):
+        if not 4 <= p <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = (
+            bytearray(registers) if registers is not None else bytearray(self.m)
+        )
+
+    def add(self, value):
+        """Add a value; returns True when the sketch changed."""
+        if isinstance(value, str):
+            value = value.encode()
+        h = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def update(self, other):
+        """Merge another sketch of the same precision into this one."""
+        if other.p != self.p:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimated number of distinct values."""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting
+        return round(estimate)
+
+    def __len__(self):
+        return self.count()
+
+    def to_bytes(self):
+        return bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(p=data[0], registers=data[1:])
+
+    @classmethod
+    def merged(cls, sketches, p=11):
+        """Union of several sketches (an empty sketch when there are none)."""
+        result = cls(p)
+        for sketch in sketches:
+            result.update(sketch)
+        return result
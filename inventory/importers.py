@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from . import alerts
+from .cache import invalidate_catalogue
+from .exports import unescape_cell
+from .forms import CarImportForm
+from .history import TRACKED_FIELDS, diff, json_value, record_changes, snapshot
+from .models import Car
+
+IMPORT_FIELDS = CarImportForm.Meta.fields
+UPDATE_FIELDS = [f for f in IMPORT_FIELDS if f != "external_ref"] + ["updated_at"]
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 200
+# What open_text decodes undecodable bytes to.
+INVALID_TEXT = "\ufffd"
+ENCODING_ERROR = "Encodage invalide : le fichier doit être en UTF-8."
+
+
+@dataclass
+class ImportReport:
+    """Outcome of a bulk import: counters plus the first row errors."""
+
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def processed(self):
+        return self.created + self.updated + self.failed
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, errors))
+
+
+def detect_format(filename):
+    """Guess the feed format from its extension (csv by default)."""
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def open_text(binary_file):
+    """Wrap an uploaded/binary file so it can be read line by line.
+
+    Bytes that are not UTF-8 become U+FFFD and their line is rejected by
+    ``iter_rows`` instead of aborting the whole import.
+    """
+    return io.TextIOWrapper(
+        binary_file, encoding="utf-8-sig", errors="replace", newline=""
+    )
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` without loading the whole feed."""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if INVALID_TEXT in line:
+                yield line_no, ValueError(ENCODING_ERROR)
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_no, exc
+                continue
+            yield line_no, (
+                row if isinstance(row, dict) else ValueError("Objet JSON attendu")
+            )
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if any(INVALID_TEXT in str(value) for value in row.values()):
+                yield reader.line_num, ValueError(ENCODING_ERROR)
+                continue
+            yield reader.line_num, row
+
+
+def _with_defaults(row):
+    """Fill missing optional columns with the model defaults, as CarForm would."""
+    data = {}
+    for name in IMPORT_FIELDS:
+        value = row.get(name)
+        if isinstance(value, str):
+            value = unescape_cell(value.strip())
+        if value in (None, ""):
+            model_field = Car._meta.get_field(name)
+            value = model_field.get_default() if model_field.has_default() else ""
+        data[name] = value
+    return data
+
+
+def _flush(chunk, report, dry_run, user=None):
+    """Upsert one validated chunk, keyed on external_ref."""
+    # Postgres refuses to update the same row twice in one statement: keep the
+    # last occurrence of each reference.
+    cars = list({car.external_ref: car for car in chunk}.values())
+    refs = [car.external_ref for car in cars]
+    stored = {
+        row["external_ref"]: row
+        for row in Car.objects.filter(external_ref__in=refs).values(
+            "external_ref", "pk", *TRACKED_FIELDS
+        )
+    }
+    if not dry_run:
+        Car.objects.bulk_create(
+            cars,
+            update_conflicts=True,
+            unique_fields=["external_ref"],
+            update_fields=UPDATE_FIELDS,
+        )
+        invalidate_catalogue()
+        pks = {ref: row["pk"] for ref, row in stored.items()}
+        new_refs = [ref for ref in refs if ref not in pks]
+        if new_refs:
+            pks.update(
+                Car.objects.filter(external_ref__in=new_refs).values_list(
+                    "external_ref", "pk"
+                )
+            )
+        _record_history(cars, stored, pks, user)
+        _queue_alerts(cars, stored, pks)
+    report.updated += len(stored)
+    report.created += len(cars) - len(stored)
+
+
+def _record_history(cars, stored, pks, user):
+    """bulk_create skips the views that log ``CarChange``: diff each car
+    against the row read before the upsert (everything for new cars)."""
+    changes = []
+    for car in cars:
+        row = stored.get(car.external_ref)
+        before = row and {name: json_value(name, row[name]) for name in TRACKED_FIELDS}
+        changes.append((pks[car.external_ref], diff(before, snapshot(car))))
+    record_changes(changes, user=user)
+
+
+def _queue_alerts(cars, stored, pks):
+    """bulk_create bypasses the Car signals: queue the alerts they would send
+    for cars going on sale and price drops. ``stored``: ref -> stored row."""
+    on_sale, dropped = [], []
+    for car in cars:
+        row = stored.get(car.external_ref, {})
+        pk, price = pks[car.external_ref], row.get("price")
+        if car.status == "Disponible" and row.get("status") != "Disponible":
+            on_sale.append(pk)
+        if price is not None and car.price < price:
+            dropped.append((pk, price, car.price))
+    alerts.queue_matches(on_sale)
+    alerts.queue_price_drops(dropped)
+
+
+def import_cars(stream, fmt="csv", chunk_size=CHUNK_SIZE, dry_run=False, user=None):
+    """Validate and upsert a CSV/JSONL car feed chunk by chunk.
+
+    Each row goes through ``CarImportForm`` so imports follow exactly the same
+    rules as the staff form; invalid rows are reported and skipped. Changes
+    are logged as ``CarChange`` rows attributed to ``user``.
+    """
+    report = ImportReport()
+    rows = iter_rows(stream, fmt)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        chunk = []
+        for line_no, row in batch:
+            if isinstance(row, Exception):
+                report.add_error(line_no, {"__all__": [str(row)]})
+                continue
+            form = CarImportForm(data=_with_defaults(row))
+            if form.is_valid():
+                chunk.append(form.save(commit=False))
+            else:
+                report.add_error(line_no, {k: list(v) for k, v in form.errors.items()})
+        if chunk:
+            _flush(chunk, report, dry_run, user)
+    return report
@@ -0,0 +1,51 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.bots import RateTracker, is_bot_user_agent
+
+SAMPLE_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-A546B) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)",
+    "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)",
+    "python-requests/2.31.0",
+    "curl/8.5.0",
+]
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of the bot classifier (target < 5 µs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200000)
+        parser.add_argument("--ips", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        agents = [random.choice(SAMPLE_USER_AGENTS) for _ in range(n)]
+        ips = [f"10.{i % 250}.{i // 250 % 250}.1" for i in range(options["ips"])]
+        ips = [random.choice(ips) for _ in range(n)]
+
+        is_bot_user_agent.cache_clear()
+        start = time.perf_counter()
+        for agent in SAMPLE_USER_AGENTS:
+            is_bot_user_agent(agent)
+        cold = (time.perf_counter() - start) / len(SAMPLE_USER_AGENTS)
+
+        tracker = RateTracker()
+        start = time.perf_counter()
+        for ip, agent in zip(ips, agents):
+            tracker.hit(ip) or is_bot_user_agent(agent)
+        warm = (time.perf_counter() - start) / n
+
+        self.stdout.write(f"Regex seule (UA inconnu) : {cold * 1e6:.2f} µs")
+        self.stdout.write(
+            self.style.SUCCESS(f"Par requête (cache + débit) : {warm * 1e6:.2f} µs")
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server (e.g. local gunicorn) and report requests/sec "
+        "for each concurrency level. Compare PAGE_CACHE_TIMEOUT=0 with the page "
+        "cache enabled, or SERVER_MODE=wsgi with SERVER_MODE=asgi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls", nargs="+", help="URLs to hit in turn, e.g. http://127.0.0.1:8000/"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            nargs="+",
+            default=[8],
+            help="simultaneous clients, one run per value (e.g. 50 200 1000)",
+        )
+        parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+        parser.add_argument(
+            "--warmup", type=int, default=1, help="requests per URL before timing"
+        )
+        parser.add_argument("--timeout", type=float, default=30.0, help="seconds")
+
+    async def _get(self, url, timeout):
+        """One HTTP/1.1 GET on a fresh connection: (status, X-Page-Cache)."""
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, parts.port or 80), timeout
+        )
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                "User-Agent: bench_http/1.0\r\nConnection: close\r\n\r\n".encode()
+            )
+            raw = await asyncio.wait_for(reader.read(), timeout)
+        finally:
+            writer.close()
+        head = raw.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")
+        status = int(head[0].split()[1])
+        headers = dict(line.split(": ", 1) for line in head[1:] if ": " in line)
+        return status, headers.get("X-Page-Cache", "")
+
+    async def _run(self, urls, concurrency, duration, timeout):
+        latencies, errors, cache_hits = [], 0, 0
+        deadline = time.perf_counter() + duration
+
+        async def client(offset):
+            nonlocal errors, cache_hits
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    status, cache_state = await self._get(urls[i % len(urls)], timeout)
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    status, cache_state = None, ""
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                    cache_hits += cache_state == "hit"
+                else:
+                    errors += 1
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(concurrency)))
+        return latencies, errors, cache_hits, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        urls = options["urls"]
+        timeout = options["timeout"]
+        try:
+            for url in urls:
+                for _ in range(options["warmup"]):
+                    asyncio.run(self._get(url, timeout))
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise CommandError(f"Serveur injoignable : {exc}")
+
+        for concurrency in options["concurrency"]:
+            latencies, errors, cache_hits, wall = asyncio.run(
+                self._run(urls, concurrency, options["duration"], timeout)
+            )
+            self.stdout.write(f"--- {concurrency} client(s) ---")
+            if not latencies:
+                self.stdout.write(
+                    self.style.ERROR(f"Aucune réponse 200 ({errors} erreur(s)).")
+                )
+                continue
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[int(len(latencies) * 0.95)] * 1000
+            self.stdout.write(
+                f"{len(latencies)} requêtes en {wall:.1f} s, {errors} erreur(s), "
+                f"{cache_hits} servie(s) par le cache de page"
+            )
+            self.stdout.write(f"Latence p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+            self.stdout.write(
+                self.style.SUCCESS(f"Débit : {len(latencies) / wall:.0f} req/s")
+            )
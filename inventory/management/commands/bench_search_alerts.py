@@ -0,0 +1,165 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventory.alerts import (
+    CAR_FIELDS,
+    SearchIndex,
+    candidate_searches,
+    find_matches,
+    notify,
+)
+from inventory.models import Car, SavedSearch
+
+BRANDS = {
+    "Toyota": ["Corolla", "RAV4", "Land Cruiser", "Yaris"],
+    "Honda": ["Civic", "CR-V", "Accord"],
+    "Kia": ["Picanto", "Sportage", "Rio"],
+    "BMW": ["X5", "Série 3", "X3"],
+    "Peugeot": ["208", "3008", "508"],
+    "Mercedes-Benz": ["Classe C", "GLE", "Classe E"],
+}
+CITIES = ["Yaoundé", "Douala", "Bafoussam", "Garoua", "Kribi", "Limbé"]
+FUELS = [value for value, _ in Car.CARBURANT_CHOICES]
+GEARS = [value for value, _ in Car.BOITE_CHOICES]
+
+
+def _satisfies(row, car):
+    """Reference check of one search, straight from the criteria."""
+    _, _, q, fuel, gear, city, p_min, p_max, y_min, y_max = row
+    text = f"{car.brand}\n{car.model}\n{car.city}".casefold()
+    return (
+        (not q or q in text)
+        and fuel in ("", car.fuel)
+        and gear in ("", car.transmission)
+        and (not city or city in car.city.casefold())
+        and (p_min is None or p_min <= car.price)
+        and (p_max is None or car.price <= p_max)
+        and (y_min is None or y_min <= car.year)
+        and (y_max is None or car.year <= y_max)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the saved-search matcher: new cars against saved searches, on "
+        "seeded data rolled back afterwards, checked against a nested loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--searches", type=int, default=100_000)
+        parser.add_argument("--cars", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument(
+            "--check", type=int, default=20, help="cars verified by the nested loop"
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        with transaction.atomic():
+            self._seed_searches(rng, options["searches"], options["users"])
+            cars = self._seed_cars(rng, options["cars"])
+
+            start = time.perf_counter()
+            index = SearchIndex(candidate_searches(cars))
+            loaded = time.perf_counter()
+            matches = find_matches(cars, index)
+            matched = time.perf_counter()
+            count = notify(matches)
+            inserted = time.perf_counter()
+
+            self._check(cars[: options["check"]], matches)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Chargement + index : {loaded - start:.2f} s")
+        self.stdout.write(f"Correspondances    : {matched - loaded:.2f} s")
+        self.stdout.write(f"Notifications      : {inserted - matched:.2f} s ({count})")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(cars)} véhicule(s) × {options['searches']} recherche(s) "
+                f"en {inserted - start:.2f} s"
+            )
+        )
+
+    def _seed_searches(self, rng, count, users):
+        users = User.objects.bulk_create(
+            User(username=f"bench-alert-{i}") for i in range(users)
+        )
+        users = list(User.objects.filter(username__startswith="bench-alert-"))
+
+        def price():
+            return Decimal(rng.randrange(1_000_000, 40_000_000, 500_000))
+
+        searches = []
+        for _ in range(count):
+            brand = rng.choice(list(BRANDS))
+            budget = price()
+            searches.append(
+                SavedSearch(
+                    user=rng.choice(users),
+                    q=(
+                        rng.choice([brand, rng.choice(BRANDS[brand])]).casefold()
+                        if rng.random() < 0.8
+                        else ""
+                    ),
+                    fuel=rng.choice(FUELS) if rng.random() < 0.7 else "",
+                    transmission=rng.choice(GEARS) if rng.random() < 0.4 else "",
+                    city=rng.choice(CITIES).casefold() if rng.random() < 0.6 else "",
+                    price_min=budget - 5_000_000 if rng.random() < 0.5 else None,
+                    price_max=budget if rng.random() < 0.9 else None,
+                    year_min=rng.randint(2005, 2022) if rng.random() < 0.5 else None,
+                    year_max=rng.randint(2015, 2025) if rng.random() < 0.2 else None,
+                )
+            )
+        SavedSearch.objects.bulk_create(searches, batch_size=5000)
+
+    def _seed_cars(self, rng, count):
+        if not count:
+            raise CommandError("--cars doit être positif")
+        prefix = f"bench-alert-{time.time_ns()}-"
+        Car.objects.bulk_create(
+            Car(
+                brand=(brand := rng.choice(list(BRANDS))),
+                model=rng.choice(BRANDS[brand]),
+                price=rng.randrange(1_000_000, 40_000_000, 50_000),
+                year=rng.randint(2000, 2024),
+                fuel=rng.choice(FUELS),
+                transmission=rng.choice(GEARS),
+                city=rng.choice(CITIES),
+                status="Disponible",
+                external_ref=f"{prefix}{i}",
+            )
+            for i in range(count)
+        )
+        return list(
+            Car.objects.filter(external_ref__startswith=prefix).only(*CAR_FIELDS)
+        )
+
+    def _check(self, cars, matches):
+        rows = list(candidate_searches(cars)) if cars else []
+        start = time.perf_counter()
+        for car in cars:
+            expected = {}
+            for row in rows:
+                if _satisfies(row, car):
+                    expected.setdefault(row[1], set()).add(row[0])
+            found = {
+                user_id: search_id
+                for (user_id, car_id), search_id in matches.items()
+                if car_id == car.pk
+            }
+            if set(found) != set(expected) or any(
+                search_id not in expected[user_id]
+                for user_id, search_id in found.items()
+            ):
+                raise CommandError(f"Résultats différents pour la voiture {car.pk}")
+        if cars:
+            per_car = (time.perf_counter() - start) / len(cars)
+            self.stdout.write(
+                f"Boucle imbriquée : {per_car * 1000:.1f} ms par véhicule "
+                f"(vérifiée sur {len(cars)})"
+            )
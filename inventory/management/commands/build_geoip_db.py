@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.geoip import build_database
+
+
+class Command(BaseCommand):
+    help = "Compile a CSV IP range dump (start,end,country,city) for GEOIP_DB_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("out_path")
+
+    def handle(self, *args, **options):
+        try:
+            count = build_database(options["csv_path"], options["out_path"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"{count} plage(s) écrite(s)"))
@@ -0,0 +1,27 @@
+"""Builds the daily unique-visitor sketches read by the dashboard.
+
+Schedule it from cron; the default ``--days 2`` rebuilds today and
+yesterday, the only days still receiving visits::
+
+    */15 * * * *  python manage.py build_visit_sketches
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.analytics import build_visit_sketches
+
+
+class Command(BaseCommand):
+    help = "Build the daily unique-visitor sketches (site, page, country)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Days to (re)build, today included (use 90+ to backfill)",
+        )
+
+    def handle(self, *args, **options):
+        rows = build_visit_sketches(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"{rows} sketch(es) écrit(s)"))
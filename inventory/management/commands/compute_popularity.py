@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.popularity import compute_popularity
+
+
+class Command(BaseCommand):
+    help = "Update the popularity score of the cars (views, favourites, appointments)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute every score instead of adding the events since the last run",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        cars = compute_popularity(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{cars} véhicule(s) mis à jour en {time.perf_counter() - start:.1f} s"
+            )
+        )
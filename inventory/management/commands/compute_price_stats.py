@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.pricing import compute_price_stats
+
+
+class Command(BaseCommand):
+    help = "Compute market price statistics per (brand, model, year bucket)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only recompute the models changed since the last run",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        groups = compute_price_stats(incremental=options["incremental"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{groups} groupe(s) calculé(s) en {time.perf_counter() - start:.1f} s"
+            )
+        )
@@ -0,0 +1,202 @@
+import random
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+
+from inventory.models import Appointment, Car, Message
+
+# Views that write or produce files on GET: not replayed.
+SKIPPED = {
+    "logout",
+    "toggle_favorite",
+    "add_to_compare",
+    "remove_from_compare",
+    "admin_car_toggle",
+    "admin_export_download",
+    "notification_open",
+}
+# Extra query strings exercising the filters.
+EXTRA_QUERIES = {
+    "home": [
+        "?fuel=Diesel&year_min=2015&price_max=20000000",
+        "?q=toyota&page=2",
+        "?sort=popular",
+        "?sort=price_desc&fuel=Diesel",
+        "?sort=km&page=2",
+    ],
+    "admin_appointments": ["?status=upcoming"],
+    "admin_appointments_calendar": ["?view=week"],
+    "api_car_list": ["?fuel=Essence&price_min=5000000"],
+}
+PG_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay every GET view against a seeded copy of the data (rolled back "
+        "afterwards), EXPLAIN each query and flag sequential scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed", type=int, default=2000, help="cars to add (messages x2)"
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="ignore scans of tables smaller than this",
+        )
+        parser.add_argument(
+            "--strict", action="store_true", help="exit with an error on any scan"
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(f"Base non prise en charge : {connection.vendor}")
+        with transaction.atomic():
+            staff, client_user = self._seed(options["seed"])
+            findings = self._run(staff, client_user, options["min_rows"])
+            transaction.set_rollback(True)
+
+        for url, scans in findings.items():
+            self.stdout.write(self.style.WARNING(url))
+            for table, sql in scans:
+                if options["verbosity"] < 2:
+                    sql = sql if len(sql) <= 160 else f"{sql[:157]}..."
+                self.stdout.write(f"  {table}: {sql}")
+        total = sum(len(scans) for scans in findings.values())
+        message = f"{total} parcours séquentiel(s) dans {len(findings)} vue(s)"
+        if total and options["strict"]:
+            raise CommandError(message)
+        self.stdout.write(
+            (self.style.WARNING if total else self.style.SUCCESS)(message)
+        )
+
+    def _seed(self, count):
+        rng = random.Random(42)
+        now = timezone.now()
+        staff = User.objects.create_superuser("explain-staff", password=None)
+        clients = User.objects.bulk_create(
+            User(username=f"explain-client-{i}") for i in range(20)
+        )
+        # Templates expect a photo: reuse an existing one (the file is not read).
+        sample = Car.objects.exclude(image="").exclude(image=None).first()
+        image = sample.image.name if sample else "cars/seed.jpg"
+        cars = Car.objects.bulk_create(
+            Car(
+                brand=rng.choice(["Toyota", "Honda", "Kia", "BMW", "Peugeot"]),
+                model=f"M{i % 40}",
+                price=rng.randrange(1_000_000, 40_000_000, 50_000),
+                year=rng.randint(2000, 2024),
+                kilometrage=rng.randint(0, 300_000),
+                fuel=rng.choice(["Essence", "Diesel", "Hybride", "Electrique"]),
+                transmission=rng.choice(["Manuelle", "Automatique"]),
+                city=rng.choice(["Yaoundé", "Douala", "Bafoussam"]),
+                status=rng.choice(["Disponible"] * 6 + ["Vendu"] * 3 + ["En attente"]),
+                image=image,
+            )
+            for i in range(count)
+        )
+        if cars:
+            Message.objects.bulk_create(
+                Message(
+                    sender=staff if i % 2 else client,
+                    receiver=client if i % 2 else staff,
+                    car=rng.choice(cars),
+                    content="…",
+                    is_read=i % 3 == 0,
+                )
+                for i in range(count * 2)
+                for client in [clients[i % len(clients)]]
+            )
+            Appointment.objects.bulk_create(
+                Appointment(
+                    user=clients[i % len(clients)],
+                    car=rng.choice(cars),
+                    phone="600000000",
+                    email="rdv@example.com",
+                    date_rdv=now + timedelta(hours=rng.randint(-2000, 2000)),
+                )
+                for i in range(count)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return staff, clients[0]
+
+    def _urls(self, client_user):
+        car = Car.objects.filter(status="Disponible").only("pk").first()
+        samples = {"pk": car.pk, "car_id": car.pk, "user_id": client_user.pk}
+        for pattern in get_resolver("inventory.urls").url_patterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED:
+                continue
+            converters = pattern.pattern.converters
+            if pattern.name.endswith("_export") or set(converters) - set(samples):
+                continue
+            route = str(pattern.pattern)
+            for name in converters:
+                route = re.sub(rf"<(\w+:)?{name}>", str(samples[name]), route)
+            url = f"/{route}"
+            yield pattern.name, url
+            for query in EXTRA_QUERIES.get(pattern.name, []):
+                yield pattern.name, url + query
+
+    def _explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN {sql}")
+                return PG_SEQ_SCAN.findall("\n".join(row[0] for row in cursor))
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [
+                match.group(1)
+                for row in cursor
+                if (match := SQLITE_SCAN.match(row[-1]))
+            ]
+
+    def _table_sizes(self):
+        # Sub-queries show up as pseudo tables (SQLite "SCAN subquery"): 0 rows.
+        sizes = {}
+        tables = set(connection.introspection.table_names())
+
+        def size(table):
+            if table not in tables:
+                return 0
+            if table not in sizes:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}"
+                    )
+                    sizes[table] = cursor.fetchone()[0]
+            return sizes[table]
+
+        return size
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def _run(self, staff, client_user, min_rows):
+        size = self._table_sizes()
+        browser = Client(HTTP_HOST="localhost", raise_request_exception=False)
+        browser.force_login(staff)
+        findings = defaultdict(list)
+        for name, url in self._urls(client_user):
+            with CaptureQueriesContext(connection) as queries:
+                response = browser.get(url)
+            self.stdout.write(
+                f"{response.status_code} {url} ({len(queries)} requête(s))"
+            )
+            for query in queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT"):
+                    continue
+                for table in self._explain(sql):
+                    if size(table) >= min_rows:
+                        findings[url].append((table, sql))
+        return findings
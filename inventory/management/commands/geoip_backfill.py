@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import geoip
+from inventory.analytics import BACKFILL_CHUNK, geoip_backfill, rollup_visits
+
+
+class Command(BaseCommand):
+    help = "Resolve country/city of logged visits from the local GeoIP database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK)
+        parser.add_argument(
+            "--all", action="store_true", help="Also re-resolve known visits"
+        )
+        parser.add_argument(
+            "--rollup-days",
+            type=int,
+            default=30,
+            help="Days of country rollups to rebuild afterwards (0 to skip)",
+        )
+
+    def handle(self, *args, **options):
+        if geoip.get_database() is None:
+            raise CommandError("GEOIP_DB_PATH n'est pas configuré ou illisible.")
+        updated = geoip_backfill(
+            chunk_size=options["chunk_size"], only_unknown=not options["all"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"{updated} visite(s) localisée(s)"))
+        if options["rollup_days"]:
+            rollup_visits(options["rollup_days"])
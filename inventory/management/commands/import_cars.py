@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import worker
+from inventory.importers import CHUNK_SIZE, detect_format, import_cars, open_text
+
+
+class Command(BaseCommand):
+    help = "Import (upsert on external_ref) cars from CSV or JSONL feeds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="CSV/JSONL files to import")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Validate without writing"
+        )
+
+    def handle(self, *args, **options):
+        for path in options["paths"]:
+            fmt = options["format"] or detect_format(path)
+            try:
+                with open(path, "rb") as binary, open_text(binary) as stream:
+                    report = import_cars(
+                        stream,
+                        fmt=fmt,
+                        chunk_size=options["chunk_size"],
+                        dry_run=options["dry_run"],
+                    )
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+            for line, errors in report.errors:
+                details = "; ".join(
+                    f"{name}: {' '.join(msgs)}" for name, msgs in errors.items()
+                )
+                self.stderr.write(f"{path}:{line}: {details}")
+            if report.failed > len(report.errors):
+                self.stderr.write(
+                    f"{path}: {report.failed - len(report.errors)} autre(s) erreur(s)"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{path}: {report.created} créé(s), {report.updated} mis à jour, "
+                    f"{report.failed} rejeté(s)"
+                )
+            )
+        # Alerts and price drops were queued on the background worker: send
+        # them before the command returns.
+        worker.drain()
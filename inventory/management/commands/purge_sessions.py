@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from inventory.sessions import PURGE_BATCH, purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches (safe to run while serving)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PURGE_BATCH)
+        parser.add_argument(
+            "--pause", type=float, default=0.05, help="seconds between batches"
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(options["batch_size"], options["pause"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} session(s) expirée(s) supprimée(s)")
+        )
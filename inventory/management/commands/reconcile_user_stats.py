@@ -0,0 +1,25 @@
+"""Recomputes the per-user counters (UserStats) from the source tables.
+
+Required from cron: deletes made outside the views and the admin (shell,
+queryset ``delete()``, bulk operations) do not update the counters::
+
+    0 4 * * *  python manage.py reconcile_user_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.userstats import RECONCILE_BATCH, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user counters (favourites, messages, appointments, "
+        "visits) from the source tables, e.g. after bulk imports or deletes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH)
+
+    def handle(self, *args, **options):
+        changed = reconcile(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{changed} compteur(s) corrigé(s)"))
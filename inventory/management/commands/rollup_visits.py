@@ -0,0 +1,24 @@
+"""Rebuilds the dashboard's per-day / per-country rollups.
+
+Schedule it from cron; only today (and yesterday, around midnight) change,
+so frequent runs can be short, plus a nightly full pass after
+``geoip_backfill``::
+
+    */15 * * * *  python manage.py rollup_visits --days 2
+    30 3 * * *    python manage.py rollup_visits
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.analytics import rollup_visits
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-day / per-country visit rollups used by the dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **options):
+        rows = rollup_visits(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"{rows} ligne(s) de statistiques"))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.notifications import DIGEST_BATCH, send_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "E-mail each user a digest of their new notifications (price drops, "
+        "saved-search matches). Only when NOTIFICATION_EMAILS is enabled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DIGEST_BATCH)
+
+    def handle(self, *args, **options):
+        if not settings.NOTIFICATION_EMAILS:
+            self.stdout.write(
+                self.style.WARNING("NOTIFICATION_EMAILS désactivé : aucun envoi.")
+            )
+            return
+        sent = send_digests(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{sent} e-mail(s) envoyé(s)"))
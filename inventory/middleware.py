@@ -1,30 +1,178 @@
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
 from django.utils import timezone
 from datetime import timedelta
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import geoip, presence, routers, viewcounter
+from .bots import RateTracker, is_bot_user_agent
 from .models import SiteVisit
+from .static_assets import strip_html
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, made async capable.
+
+    WhiteNoise 6 middleware is sync only: under ASGI Django would then run the
+    whole stack below it, async views included, through ``async_to_sync`` in a
+    worker thread. Only the file serving itself is delegated to a thread here.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class SessionRefreshMiddleware(SessionMiddleware):
+    """Sliding session expiry, without a write on every request.
+
+    An unchanged session is saved again (pushing back its expiry and cookie)
+    only once ``refresh_due()`` says so; see inventory/sessions.py.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, "session", None)
+        if (
+            session is not None
+            and session.accessed
+            and not session.modified
+            and session.session_key
+            and hasattr(session, "refresh_due")
+            and response.status_code != 500
+            and session.refresh_due()
+        ):
+            session.modified = True
+        return super().process_response(request, response)
+
+
+class ReplicaStickinessMiddleware:
+    """Read-your-writes: after a write, pin the client to the primary.
+
+    A short-lived cookie makes ``read_from_replica`` views skip the replica
+    until replication has most likely caught up. Disabled without a replica.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if routers.REPLICA_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routers.track_writes() as writes:
+            response = self.get_response(request)
+        return self._pin(response, writes)
+
+    async def __acall__(self, request):
+        with routers.track_writes() as writes:
+            response = await self.get_response(request)
+        return self._pin(response, writes)
+
+    def _pin(self, response, writes):
+        if writes["wrote"]:
+            response.set_cookie(
+                routers.STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
 
 
 class SiteVisitMiddleware:
-    """Log each page visit — throttled to 1 per IP per 5 minutes for performance."""
+    """Log each page visit — throttled to 1 per IP per 5 minutes for performance.
+
+    Crawlers (known User-Agent or abnormal request rate) are skipped, or logged
+    with ``is_bot=True`` when ``TRACK_BOT_VISITS`` is enabled.
+    Logged visits of a car page also feed ``viewcounter``.
 
-    EXCLUDED_PATHS = ["/static/", "/media/", "/favicon.ico", "/admin/"]
+    Sync and async capable: under ASGI the presence update (cache I/O) and
+    the insert run in a background task once the response is ready, so they
+    never delay the page nor block the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    EXCLUDED_PATHS = ["/static/", "/media/", "/favicon.ico", "/admin/", "/api/"]
 
     def __init__(self, get_response):
         self.get_response = get_response
         self._recent_ips = {}
+        self._rates = RateTracker(
+            limit=getattr(settings, "BOT_RATE_LIMIT", 120), window=60
+        )
+        self.track_bots = getattr(settings, "TRACK_BOT_VISITS", False)
+        self._tasks = set()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         response = self.get_response(request)
+        visitor, visit = self._visit(request, response)
+        self._track(request, visitor, visit)
+        return response
 
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        visitor, visit = self._visit(request, response)
+        if visitor is not None or visit is not None:
+            # Presence and the visit log both do I/O: off the event loop.
+            track = sync_to_async(self._track)(request, visitor, visit)
+            task = asyncio.ensure_future(track)
+            # Keep a reference until done (the loop only holds weak ones).
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return response
+
+    def _visit(self, request, response):
+        """``(visitor, visit)``: the IP to mark online (None for bots) and the
+        SiteVisit fields to log (None when the request is not logged).
+
+        CPU only, no I/O: safe on the event loop.
+        """
         path = request.path
         if any(path.startswith(p) for p in self.EXCLUDED_PATHS):
-            return response
+            return None, None
 
         if response.status_code != 200:
-            return response
+            return None, None
 
         # Skip AJAX requests
         if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-            return response
+            return None, None
 
         try:
             x_forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
@@ -33,6 +181,11 @@ class SiteVisitMiddleware:
                 if x_forwarded
                 else request.META.get("REMOTE_ADDR")
             )
+            user_agent = request.META.get("HTTP_USER_AGENT", "")
+            is_bot = self._rates.hit(ip) or is_bot_user_agent(user_agent)
+            visitor = None if is_bot else ip
+            if is_bot and not self.track_bots:
+                return None, None
 
             now = timezone.now()
             cache_key = f"{ip}:{path}"
@@ -40,7 +193,7 @@ class SiteVisitMiddleware:
 
             # Throttle to 1 visit per IP+path every 5 minutes
             if last_visit and (now - last_visit) < timedelta(seconds=300):
-                return response
+                return visitor, None
 
             self._recent_ips[cache_key] = now
 
@@ -51,13 +204,54 @@ class SiteVisitMiddleware:
                     k: v for k, v in self._recent_ips.items() if v > cutoff
                 }
 
-            SiteVisit.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                ip_address=ip,
-                page=path[:500],
-                user_agent=request.META.get("HTTP_USER_AGENT", "")[:500],
-            )
+            country, city = geoip.lookup(ip) or ("Inconnu", "Inconnu")
+            return visitor, {
+                "ip_address": ip,
+                "country": country or "Inconnu",
+                "city": city or "Inconnu",
+                "page": path[:500],
+                "user_agent": user_agent[:500],
+                "is_bot": is_bot,
+            }
+        except Exception:
+            return None, None
+
+    def _track(self, request, visitor, visit):
+        if visitor is not None:
+            presence.touch(visitor)
+        if visit is not None:
+            self._record(request, visit)
+
+    def _record(self, request, visit):
+        match = request.resolver_match
+        if match and match.url_name == "car_detail" and not visit["is_bot"]:
+            viewcounter.record(match.kwargs["pk"])
+        try:
+            user = request.user if request.user.is_authenticated else None
+            SiteVisit.objects.create(user=user, **visit)
         except Exception:
             pass
 
-        return response
+
+class HtmlWhitespaceMiddleware:
+    """Strip template indentation and blank lines from HTML responses.
+
+    See ``static_assets.strip_html``; page-cache hits were stripped before
+    being stored and are passed through as is.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return strip_html(self.get_response(request))
+
+    async def __acall__(self, request):
+        return strip_html(await self.get_response(request))
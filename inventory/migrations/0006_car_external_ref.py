@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0005_sitevisit_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="car",
+            name="external_ref",
+            field=models.CharField(
+                blank=True,
+                max_length=64,
+                null=True,
+                unique=True,
+                verbose_name="Référence externe",
+            ),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0008_carchange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("last_run_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PriceStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("brand", models.CharField(max_length=100)),
+                ("model", models.CharField(max_length=100)),
+                ("year_from", models.IntegerField()),
+                ("year_to", models.IntegerField()),
+                ("count", models.PositiveIntegerField()),
+                ("median", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("q1", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("q3", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("price_per_km", models.FloatField(default=0)),
+                ("intercept", models.FloatField(default=0)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="car",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddConstraint(
+            model_name="pricestat",
+            constraint=models.UniqueConstraint(
+                fields=("brand", "model", "year_from"), name="uniq_pricestat_group"
+            ),
+        ),
+        migrations.AddField(
+            model_name="car",
+            name="price_stat",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="cars",
+                to="inventory.pricestat",
+            ),
+        ),
+    ]
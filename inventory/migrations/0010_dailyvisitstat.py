@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0009_price_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyVisitStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("country", models.CharField(max_length=100)),
+                ("visits", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-day"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyvisitstat",
+            constraint=models.UniqueConstraint(
+                fields=("day", "country"), name="uniq_visitstat_day_country"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0010_dailyvisitstat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitevisit",
+            name="is_bot",
+            field=models.BooleanField(default=False),
+        ),
+    ]
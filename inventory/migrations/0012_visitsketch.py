@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0011_sitevisit_is_bot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VisitSketch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("all", "Site"),
+                            ("page", "Page"),
+                            ("country", "Pays"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("key", models.CharField(blank=True, max_length=500)),
+                ("registers", models.BinaryField()),
+                ("uniques", models.PositiveIntegerField(default=0)),
+                ("visits", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-day"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="visitsketch",
+            constraint=models.UniqueConstraint(
+                fields=("dimension", "key", "day"), name="uniq_sketch_dim_key_day"
+            ),
+        ),
+    ]
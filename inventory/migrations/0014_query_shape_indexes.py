@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0013_compareitem"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["-created_at"], name="idx_rdv_created"),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["date_rdv"], name="idx_rdv_date"),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(fields=["-created_at"], name="idx_car_created"),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                condition=models.Q(("status", "Disponible")),
+                fields=["-created_at"],
+                name="idx_car_avail_created",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                condition=models.Q(("status", "Disponible")),
+                fields=["fuel", "price"],
+                name="idx_car_avail_fuel_price",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                condition=models.Q(("status", "Disponible")),
+                fields=["year", "price"],
+                name="idx_car_avail_year_price",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                condition=models.Q(("status", "Disponible")),
+                fields=["brand"],
+                name="idx_car_avail_brand",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["sender", "receiver", "created_at"], name="idx_msg_conversation"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(fields=["created_at"], name="idx_msg_created"),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+COUNTERS = {
+    "favorites": ("Favorite", "user"),
+    "messages_sent": ("Message", "sender"),
+    "appointments": ("Appointment", "user"),
+    "visits": ("SiteVisit", "user"),
+}
+
+
+def backfill(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    UserStats = apps.get_model("inventory", "UserStats")
+    counts = {}
+    for counter, (model_name, field) in COUNTERS.items():
+        model = apps.get_model("inventory", model_name)
+        rows = (
+            model.objects.filter(**{f"{field}__isnull": False})
+            .values_list(field)
+            .annotate(n=Count("pk"))
+            .order_by()
+        )
+        counts[counter] = dict(rows)
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=user_id,
+                **{counter: counts[counter].get(user_id, 0) for counter in COUNTERS},
+            )
+            for user_id in User.objects.values_list("pk", flat=True).iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("inventory", "0014_query_shape_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("favorites", models.PositiveIntegerField(default=0)),
+                ("messages_sent", models.PositiveIntegerField(default=0)),
+                ("appointments", models.PositiveIntegerField(default=0)),
+                ("visits", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
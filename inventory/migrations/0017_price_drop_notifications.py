@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0016_savedsearch_notification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="data",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="emailed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="favorite",
+            name="car",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="inventory.car",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("search_match", "Nouvelle annonce pour une recherche"),
+                    ("price_drop", "Baisse de prix"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(fields=["car", "user"], name="idx_fav_car_user"),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("emailed_at__isnull", True)),
+                fields=["user"],
+                name="idx_notif_unsent",
+            ),
+        ),
+    ]
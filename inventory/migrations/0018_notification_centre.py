@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0017_price_drop_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="confirmed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Confirmé le"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("search_match", "Nouvelle annonce pour une recherche"),
+                    ("price_drop", "Baisse de prix"),
+                    ("reply", "Nouvelle réponse"),
+                    ("appointment", "Rendez-vous confirmé"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "is_read", "-created_at"], name="idx_notif_user_unread"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0018_notification_centre"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="appointment",
+            name="idx_rdv_date",
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["date_rdv", "created_at"], name="idx_rdv_date_created"
+            ),
+        ),
+    ]
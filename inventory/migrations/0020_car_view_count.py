@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0019_appointment_covering_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="car",
+            name="view_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
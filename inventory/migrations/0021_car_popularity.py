@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0020_car_view_count"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="car",
+            name="idx_status_price",
+        ),
+        migrations.AddField(
+            model_name="car",
+            name="popularity",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                fields=["status", "price", "id"], name="idx_status_price"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                fields=["status", "-popularity", "-id"], name="idx_status_popularity"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                fields=["status", "kilometrage", "id"], name="idx_status_km"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(fields=["created_at"], name="idx_fav_created"),
+        ),
+    ]
@@ -1,5 +1,59 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from django.urls import reverse
+
+
+class PriceStat(models.Model):
+    """Market price statistics per (brand, model, year bucket).
+
+    Filled by the ``compute_price_stats`` command; cars point to their group
+    through ``Car.price_stat`` so listings get the market badge with one join.
+    """
+
+    YEAR_BUCKET = 3
+
+    brand = models.CharField(max_length=100)
+    model = models.CharField(max_length=100)
+    year_from = models.IntegerField()
+    year_to = models.IntegerField()
+    count = models.PositiveIntegerField()
+    median = models.DecimalField(max_digits=12, decimal_places=2)
+    q1 = models.DecimalField(max_digits=12, decimal_places=2)
+    q3 = models.DecimalField(max_digits=12, decimal_places=2)
+    price_per_km = models.FloatField(default=0)
+    intercept = models.FloatField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["brand", "model", "year_from"], name="uniq_pricestat_group"
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.brand} {self.model} {self.year_from}-{self.year_to}: {self.median}"
+        )
+
+    def estimate(self, kilometrage):
+        """Market value for a given mileage (regression, median as fallback)."""
+        if self.price_per_km < 0:
+            value = self.intercept + self.price_per_km * kilometrage
+            if value > 0:
+                return round(value, -3)
+        return self.median
+
+
+class JobCheckpoint(models.Model):
+    """Last successful run of a periodic job, for incremental processing."""
+
+    name = models.CharField(max_length=50, unique=True)
+    last_run_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_run_at:%d/%m %H:%M}"
 
 
 class Car(models.Model):
@@ -53,18 +107,90 @@ class Car(models.Model):
     image = models.ImageField(
         upload_to="cars/", blank=True, null=True, verbose_name="Photo principale"
     )
+    external_ref = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Référence externe",
+    )
+    price_stat = models.ForeignKey(
+        PriceStat,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="cars",
+    )
+    # Flushed in batches by viewcounter.py, not on every page view.
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Forward-decayed score written by popularity.py (only compared, never shown).
+    popularity = models.FloatField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["status", "price"], name="idx_status_price"),
+            # Home page sorts (catalogue.SORTS) read the available cars in
+            # index order, the id breaking ties.
+            models.Index(fields=["status", "price", "id"], name="idx_status_price"),
+            models.Index(
+                fields=["status", "-popularity", "-id"], name="idx_status_popularity"
+            ),
+            models.Index(fields=["status", "kilometrage", "id"], name="idx_status_km"),
             models.Index(fields=["status", "-created_at"], name="idx_status_created"),
+            models.Index(fields=["-created_at"], name="idx_car_created"),
+            # Partial indexes: the public catalogue only reads available cars.
+            models.Index(
+                fields=["-created_at"],
+                condition=Q(status="Disponible"),
+                name="idx_car_avail_created",
+            ),
+            models.Index(
+                fields=["fuel", "price"],
+                condition=Q(status="Disponible"),
+                name="idx_car_avail_fuel_price",
+            ),
+            models.Index(
+                fields=["year", "price"],
+                condition=Q(status="Disponible"),
+                name="idx_car_avail_year_price",
+            ),
+            models.Index(
+                fields=["brand"],
+                condition=Q(status="Disponible"),
+                name="idx_car_avail_brand",
+            ),
         ]
 
     def __str__(self):
         return f"{self.brand} {self.model} ({self.year}) - {self.price} FCFA"
 
+    # Stored values kept by from_db, so signals can tell "became available"
+    # or "price dropped" without a SELECT (None when the field was deferred).
+    TRACKED_FIELDS = ("status", "price")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        car = super().from_db(db, field_names, values)
+        car._loaded_values = {
+            name: car.__dict__.get(name) for name in cls.TRACKED_FIELDS
+        }
+        return car
+
+    @property
+    def market_position(self):
+        """ "below" / "fair" / "above" compared to the market quartiles, or None."""
+        stat = self.price_stat
+        if stat is None:
+            return None
+        if self.price < stat.q1:
+            return "below"
+        if self.price > stat.q3:
+            return "above"
+        return "fair"
+
 
 class Appointment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -73,10 +199,20 @@ class Appointment(models.Model):
     email = models.EmailField(verbose_name="Email")
     date_rdv = models.DateTimeField(verbose_name="Date et Heure")
     message = models.TextField(blank=True, verbose_name="Message")
+    confirmed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Confirmé le"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-date_rdv"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="idx_rdv_created"),
+            # Calendar ranges; also covers the stats aggregate (agenda.py).
+            models.Index(
+                fields=["date_rdv", "created_at"], name="idx_rdv_date_created"
+            ),
+        ]
 
     def __str__(self):
         return f"RDV de {self.user.username} pour {self.car.brand}"
@@ -84,16 +220,40 @@ class Appointment(models.Model):
 
 class Favorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("user", "car")
+        indexes = [
+            # Replaces the car_id index: price-drop fan-out reads the users of
+            # a car from the index alone.
+            models.Index(fields=["car", "user"], name="idx_fav_car_user"),
+            # Incremental popularity runs read the favourites of a time window.
+            models.Index(fields=["created_at"], name="idx_fav_created"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} ♥ {self.car.brand} {self.car.model}"
 
 
+class CompareItem(models.Model):
+    """A car in a user's comparator (see inventory/compare.py for the limit)."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="compare_items"
+    )
+    car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        unique_together = ("user", "car")
+
+    def __str__(self):
+        return f"{self.user.username} ⇄ {self.car.brand} {self.car.model}"
+
+
 class Message(models.Model):
     sender = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="sent_messages"
@@ -112,6 +272,10 @@ class Message(models.Model):
         ordering = ["created_at"]
         indexes = [
             models.Index(fields=["receiver", "is_read"], name="idx_msg_receiver_read"),
+            models.Index(
+                fields=["sender", "receiver", "created_at"], name="idx_msg_conversation"
+            ),
+            models.Index(fields=["created_at"], name="idx_msg_created"),
         ]
 
     def __str__(self):
@@ -125,6 +289,7 @@ class SiteVisit(models.Model):
     city = models.CharField(max_length=100, blank=True, default="Inconnu")
     page = models.CharField(max_length=500, blank=True)
     user_agent = models.TextField(blank=True)
+    is_bot = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -135,3 +300,229 @@ class SiteVisit(models.Model):
 
     def __str__(self):
         return f"{self.ip_address} — {self.page} — {self.created_at:%d/%m %H:%M}"
+
+
+class CarChange(models.Model):
+    """Append-only log of Car edits, as ``{field: [old, new]}`` of changed fields."""
+
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="changes")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    diff = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["car", "created_at"], name="idx_change_car_created"),
+            models.Index(fields=["created_at"], name="idx_change_created"),
+        ]
+
+    def __str__(self):
+        return f"{self.car_id} — {', '.join(self.diff)} — {self.created_at:%d/%m %H:%M}"
+
+
+class BulkAction(models.Model):
+    """Audit row written once per staff bulk action on cars."""
+
+    ACTION_CHOICES = [
+        ("status", "Changement de statut"),
+        ("price", "Ajustement de prix"),
+        ("delete", "Suppression"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    car_ids = models.JSONField(default=list)
+    affected = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_action_display()} — {self.affected} véhicule(s)"
+
+
+class DailyVisitStat(models.Model):
+    """Visits per day and country, rolled up from SiteVisit for the dashboard."""
+
+    day = models.DateField()
+    country = models.CharField(max_length=100)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "country"], name="uniq_visitstat_day_country"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.country}: {self.visits}"
+
+
+class VisitSketch(models.Model):
+    """HyperLogLog sketch of the distinct visitor IPs of one day.
+
+    One row per day for the whole site, plus one per page and per country;
+    sketches merge to count unique visitors over any date range.
+    """
+
+    DIMENSION_CHOICES = [
+        ("all", "Site"),
+        ("page", "Page"),
+        ("country", "Pays"),
+    ]
+
+    day = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=500, blank=True)
+    registers = models.BinaryField()
+    uniques = models.PositiveIntegerField(default=0)
+    visits = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "key", "day"], name="uniq_sketch_dim_key_day"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}:{self.key} ≈ {self.uniques}"
+
+
+class UserStats(models.Model):
+    """Per-user activity counters, kept up to date by signals (see userstats.py).
+
+    Lets the admin user list show counts with a one-to-one join instead of
+    aggregating favourites and messages on every page.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    favorites = models.PositiveIntegerField(default=0)
+    messages_sent = models.PositiveIntegerField(default=0)
+    appointments = models.PositiveIntegerField(default=0)
+    visits = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.favorites} favori(s), {self.messages_sent} message(s)"
+
+
+class SavedSearch(models.Model):
+    """Home-page filters a buyer wants to be alerted about (see alerts.py).
+
+    Criteria are stored normalised: blank / NULL means "any", text criteria
+    are case-folded.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="saved_searches"
+    )
+    name = models.CharField(max_length=120, blank=True)
+    q = models.CharField(max_length=100, blank=True)
+    fuel = models.CharField(max_length=20, blank=True)
+    transmission = models.CharField(max_length=20, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    price_min = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    price_max = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    year_min = models.IntegerField(null=True, blank=True)
+    year_max = models.IntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.user.username} : {self.name or 'recherche'}"
+
+
+class Notification(models.Model):
+    """In-site notification; search matches are created by alerts.py."""
+
+    KIND_CHOICES = [
+        ("search_match", "Nouvelle annonce pour une recherche"),
+        ("price_drop", "Baisse de prix"),
+        ("reply", "Nouvelle réponse"),
+        ("appointment", "Rendez-vous confirmé"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="notifications"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, null=True, blank=True)
+    saved_search = models.ForeignKey(
+        SavedSearch, on_delete=models.CASCADE, null=True, blank=True
+    )
+    # Kind-specific details (e.g. old and new price), JSON-serialisable.
+    data = models.JSONField(default=dict, blank=True)
+    is_read = models.BooleanField(default=False)
+    emailed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Unread count and the latest entries of the notification centre.
+            models.Index(
+                fields=["user", "is_read", "-created_at"], name="idx_notif_user_unread"
+            ),
+            # Digest: only the few rows not yet e-mailed are indexed.
+            models.Index(
+                fields=["user"],
+                condition=Q(emailed_at__isnull=True),
+                name="idx_notif_unsent",
+            ),
+        ]
+        constraints = [
+            # A car that goes back on sale does not alert the same search twice.
+            models.UniqueConstraint(
+                fields=["saved_search", "car"], name="uniq_notif_search_car"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} : {self.get_kind_display()}"
+
+    @property
+    def text(self):
+        """One-line description (reads ``car``: select it with the row)."""
+        car = f"{self.car.brand} {self.car.model}" if self.car_id else ""
+        if self.kind == "price_drop":
+            old, new = (
+                f"{float(self.data[key]):,.0f}".replace(",", " ")
+                for key in ("old_price", "new_price")
+            )
+            return f"{car} : {old} → {new} FCFA"
+        if self.kind == "reply":
+            return f"{self.data.get('sender', 'AutoVente')} vous a répondu"
+        if self.kind == "appointment":
+            return f"Rendez-vous du {self.data.get('date', '')} confirmé ({car})"
+        return f"Nouvelle annonce : {car}"
+
+    @property
+    def link(self):
+        if self.kind == "reply":
+            # A client writing to staff: open the thread on the admin side.
+            name = (
+                "admin_conversation"
+                if self.data.get("to_staff")
+                else "conversation_detail"
+            )
+            return reverse(name, args=[self.data["sender_id"]])
+        if self.car_id:
+            return reverse("car_detail", args=[self.car_id])
+        return reverse("notification_list")
@@ -0,0 +1,125 @@
+"""In-site notifications: unread count, notification centre, e-mail digests.
+
+The unread count shown on every page comes from the cache (one indexed
+COUNT on a miss); every write path (``notify``, ``mark_read``, the bulk
+inserts of alerts.py) drops the cached value of the users it touched.
+Without a shared cache (REDIS_URL) other workers may show a stale count
+for up to ``UNREAD_TIMEOUT`` seconds.
+
+``send_digests`` (command ``send_notification_digest``, run periodically)
+sends each user one message listing the notifications not yet e-mailed,
+``batch_size`` users per SMTP connection, then stamps them ``emailed_at``
+so the next run only sees new ones.
+"""
+
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Notification
+
+DIGEST_BATCH = 200
+DIGEST_MAX_ITEMS = 20
+DROPDOWN_LIMIT = 8
+UNREAD_TIMEOUT = 60
+
+
+# --- COMPTEUR NON LUS ---
+def _unread_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user):
+    """Number of unread notifications of ``user``, cached."""
+    return cache.get_or_set(
+        _unread_key(user.pk),
+        lambda: Notification.objects.filter(user=user, is_read=False).count(),
+        UNREAD_TIMEOUT,
+    )
+
+
+def invalidate_unread(user_ids):
+    cache.delete_many([_unread_key(user_id) for user_id in set(user_ids)])
+
+
+# --- CENTRE DE NOTIFICATIONS ---
+def notify(user, kind, car=None, **data):
+    """Create one notification (bulk producers live in alerts.py)."""
+    notification = Notification.objects.create(user=user, kind=kind, car=car, data=data)
+    invalidate_unread([user.pk])
+    return notification
+
+
+def latest(user, limit=DROPDOWN_LIMIT):
+    return list(
+        Notification.objects.filter(user=user)
+        .select_related("car")
+        .only(
+            "kind", "data", "is_read", "created_at", "car", "car__brand", "car__model"
+        )
+        .order_by("-created_at")[:limit]
+    )
+
+
+def mark_read(user, ids=None):
+    """Mark ``ids`` (all when None) as read with a single UPDATE; returns the count."""
+    unread = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    updated = unread.update(is_read=True)
+    if updated:
+        invalidate_unread([user.pk])
+    return updated
+
+
+# --- E-MAILS ---
+def _digest(user, notifications):
+    body = render_to_string(
+        "inventory/emails/digest.txt",
+        {
+            "user": user,
+            "notifications": notifications[:DIGEST_MAX_ITEMS],
+            "site_url": settings.SITE_URL.rstrip("/"),
+        },
+    )
+    if len(notifications) > DIGEST_MAX_ITEMS:
+        body += f"\n(+ {len(notifications) - DIGEST_MAX_ITEMS} autre(s) sur le site)\n"
+    subject = f"AutoVente : {len(notifications)} nouveauté(s) pour vous"
+    return EmailMessage(subject, body, to=[user.email])
+
+
+def send_digests(batch_size=DIGEST_BATCH):
+    """E-mail the pending notifications; returns the number of e-mails sent.
+
+    Users without an address are skipped, their notifications stamped too.
+    """
+    pending = Notification.objects.filter(emailed_at__isnull=True)
+    sent = 0
+    while True:
+        user_ids = list(
+            pending.order_by().values_list("user_id", flat=True).distinct()[:batch_size]
+        )
+        if not user_ids:
+            return sent
+        rows = list(
+            pending.filter(user_id__in=user_ids)
+            .select_related("user", "car", "saved_search")
+            .order_by("user_id", "-created_at")
+        )
+        messages = [
+            _digest(user, list(items))
+            for user, items in groupby(rows, key=lambda row: row.user)
+            if user.email and user.is_active
+        ]
+        if messages:
+            with get_connection() as connection:
+                sent += connection.send_messages(messages) or 0
+        # Only what was loaded: rows created during the SMTP send wait for
+        # the next run.
+        Notification.objects.filter(pk__in=[row.pk for row in rows]).update(
+            emailed_at=timezone.now()
+        )
@@ -0,0 +1,124 @@
+"""Per-car popularity score (``Car.popularity``) for the "Populaires" sort.
+
+Views (the visit log of ``/voiture/<pk>/``, bots excluded), favourites and
+appointments each add ``weight * 2 ** ((t - EPOCH) / HALF_LIFE)``: rather
+than shrinking every stored score as time passes, newer events weigh more
+("forward decay"). All scores share the same decay factor, so they rank
+cars exactly like decayed ones, and a run only adds the events created
+since the last checkpoint, touching the cars that received some.
+
+Removed favourites and appointments are only forgotten by a full run.
+Float64 overflows about 1000 half-lives after the epoch, so the epoch moves
+forward every ``ERA``: the first run of a new era rescales the stored
+scores once, by the same factor for every car.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import invalidate_catalogue
+from .models import Appointment, Car, Favorite, JobCheckpoint, SiteVisit
+
+CHECKPOINT = "popularity"
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(days=7)
+ERA = HALF_LIFE * 64
+VIEW_WEIGHT = 1.0
+FAVORITE_WEIGHT = 5.0
+APPOINTMENT_WEIGHT = 10.0
+FETCH_CHUNK = 20000
+WRITE_BATCH = 2000
+
+CAR_PAGE = re.compile(r"^/voiture/(\d+)/$")
+
+
+def _events(since, until):
+    """``(car ids, timestamps, weights)`` arrays of the events in the window."""
+    window = Q(created_at__lt=until)
+    if since is not None:
+        window &= Q(created_at__gte=since)
+    car_ids, stamps, weights = [], [], []
+
+    def add(rows, weight):
+        for car_id, created_at in rows:
+            car_ids.append(car_id)
+            stamps.append(created_at.timestamp())
+            weights.append(weight)
+
+    visits = (
+        SiteVisit.objects.filter(window, page__startswith="/voiture/", is_bot=False)
+        .values_list("page", "created_at")
+        .iterator(chunk_size=FETCH_CHUNK)
+    )
+    add(
+        ((int(match[1]), at) for page, at in visits if (match := CAR_PAGE.match(page))),
+        VIEW_WEIGHT,
+    )
+    for model, weight in (
+        (Favorite, FAVORITE_WEIGHT),
+        (Appointment, APPOINTMENT_WEIGHT),
+    ):
+        rows = model.objects.filter(window).values_list("car_id", "created_at")
+        add(rows.iterator(chunk_size=FETCH_CHUNK), weight)
+    return (
+        np.asarray(car_ids, dtype=np.int64),
+        np.asarray(stamps, dtype=np.float64),
+        np.asarray(weights, dtype=np.float64),
+    )
+
+
+def epoch_of(moment):
+    """Start of the era containing ``moment``, which the scores are relative to."""
+    return EPOCH + ERA * ((moment - EPOCH) // ERA)
+
+
+def scores(car_ids, stamps, weights, epoch):
+    """``{car id: summed forward-decayed weight}`` of a batch of events."""
+    if not len(car_ids):
+        return {}
+    elapsed = (stamps - epoch.timestamp()) / HALF_LIFE.total_seconds()
+    ids, inverse = np.unique(car_ids, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights * np.exp2(elapsed))
+    return dict(zip(ids.tolist(), totals.tolist()))
+
+
+def compute_popularity(full=False):
+    """Add the events since the last run (all of them when ``full``) to
+    ``Car.popularity``; returns the number of cars updated."""
+    started = timezone.now()
+    epoch = epoch_of(started)
+    checkpoint = JobCheckpoint.objects.filter(name=CHECKPOINT).first()
+    since = None if full or checkpoint is None else checkpoint.last_run_at
+    totals = scores(*_events(since, started), epoch)
+    car_ids = list(totals)
+
+    with transaction.atomic():
+        if since is None:
+            Car.objects.exclude(popularity=0).update(popularity=0)
+        elif epoch_of(since) != epoch:
+            # Rebase the stored scores onto the new epoch; the order is kept.
+            factor = 2.0 ** -((epoch - epoch_of(since)) / HALF_LIFE)
+            Car.objects.exclude(popularity=0).update(
+                popularity=F("popularity") * factor
+            )
+        updated = 0
+        for i in range(0, len(car_ids), WRITE_BATCH):
+            cars = list(
+                Car.objects.filter(pk__in=car_ids[i : i + WRITE_BATCH]).only(
+                    "id", "popularity"
+                )
+            )
+            for car in cars:
+                car.popularity += totals[car.pk]
+            updated += Car.objects.bulk_update(cars, ["popularity"])
+        JobCheckpoint.objects.update_or_create(
+            name=CHECKPOINT, defaults={"last_run_at": started}
+        )
+    if updated or since is None:
+        invalidate_catalogue()
+    return updated
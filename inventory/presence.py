@@ -0,0 +1,83 @@
+"""Live "online visitors" counter: per-minute HyperLogLog sketches in the cache.
+
+Every worker merges its visitors into the same cache entries, so the count
+is only site-wide with a shared cache (REDIS_URL, required by the settings
+as soon as WEB_CONCURRENCY > 1); with LocMemCache it is per process.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .hll import HyperLogLog
+
+BUCKET_SECONDS = 60
+ONLINE_MINUTES = 5
+HISTORY_MINUTES = 30
+PRECISION = 11
+
+# Visitors already recorded in the current minute by this process: lets the
+# middleware skip the cache round-trip for repeat requests.
+_seen = {"minute": None, "day": None, "visitors": set()}
+
+
+def _key(minute):
+    return f"presence:{minute}"
+
+
+def _day_key(day):
+    return f"presence:day:{day.isoformat()}"
+
+
+def _add(key, visitor, timeout):
+    raw = cache.get(key)
+    sketch = HyperLogLog.from_bytes(raw) if raw else HyperLogLog(PRECISION)
+    if sketch.add(visitor) or raw is None:
+        # Last writer wins between workers: a lost register update only makes
+        # the count slightly low, which is acceptable for live counters.
+        cache.set(key, sketch.to_bytes(), timeout)
+
+
+def touch(visitor, now=None):
+    """Record ``visitor`` (an IP) in the current minute and day sketches."""
+    minute = int((time.time() if now is None else now) // BUCKET_SECONDS)
+    if _seen["minute"] != minute:
+        _seen["minute"], _seen["visitors"] = minute, set()
+        _seen["day"] = timezone.localdate()
+    if visitor in _seen["visitors"]:
+        return
+    _seen["visitors"].add(visitor)
+
+    _add(_key(minute), visitor, (HISTORY_MINUTES + 2) * BUCKET_SECONDS)
+    _add(_day_key(_seen["day"]), visitor, 2 * 24 * 3600)
+
+
+def _buckets(minutes, now=None):
+    current = int((time.time() if now is None else now) // BUCKET_SECONDS)
+    keys = [_key(m) for m in range(current - minutes + 1, current + 1)]
+    found = cache.get_many(keys)
+    return [
+        (key, HyperLogLog.from_bytes(found[key]) if key in found else None)
+        for key in keys
+    ]
+
+
+def online_count(minutes=ONLINE_MINUTES, now=None):
+    """Approximate distinct visitors over the last ``minutes`` minutes."""
+    sketches = [s for _, s in _buckets(minutes, now) if s is not None]
+    return HyperLogLog.merged(sketches, PRECISION).count()
+
+
+def per_minute(minutes=HISTORY_MINUTES, now=None):
+    """``[(bucket_start_timestamp, visitors)]`` for the last ``minutes`` minutes."""
+    return [
+        (int(key.split(":")[1]) * BUCKET_SECONDS, s.count() if s else 0)
+        for key, s in _buckets(minutes, now)
+    ]
+
+
+def day_sketch(day):
+    """Live sketch of the visitors of ``day`` (kept two days), or None."""
+    raw = cache.get(_day_key(day))
+    return HyperLogLog.from_bytes(raw) if raw else None
@@ -0,0 +1,159 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .cache import invalidate_catalogue
+from .models import Car, JobCheckpoint, PriceStat
+
+MIN_COUNT = 3
+WRITE_BATCH = 2000
+FETCH_CHUNK = 20000
+MAX_INCREMENTAL_PAIRS = 300
+CHECKPOINT = "price_stats"
+
+
+def _load(queryset):
+    """Fetch (brand, model, year, price, km) columns into NumPy arrays."""
+    keys, years, prices, kms = [], [], [], []
+    rows = queryset.values_list(
+        "brand", "model", "year", "price", "kilometrage"
+    ).iterator(chunk_size=FETCH_CHUNK)
+    for brand, model, year, price, km in rows:
+        keys.append((brand, model))
+        years.append(year)
+        prices.append(price)
+        kms.append(km)
+    return (
+        keys,
+        np.asarray(years, dtype=np.int64),
+        np.asarray(prices, dtype=np.float64),
+        np.asarray(kms, dtype=np.float64),
+    )
+
+
+def group_stats(keys, years, prices, kms, bucket=PriceStat.YEAR_BUCKET):
+    """Median, quartiles and price-per-km regression per (brand, model, bucket).
+
+    Fully vectorised: rows are sorted once by (group, price) and every statistic
+    is read from group boundaries, so the cost is one sort of the whole set.
+    """
+    if not keys:
+        return []
+    labels = {}
+    pair = np.fromiter(
+        (labels.setdefault(k, len(labels)) for k in keys), np.int64, len(keys)
+    )
+    pairs = list(labels)
+    year_from = years // bucket * bucket
+
+    order = np.lexsort((prices, year_from, pair))
+    pair, year_from = pair[order], year_from[order]
+    prices, kms = prices[order], kms[order]
+
+    boundary = np.ones(len(pair), dtype=bool)
+    boundary[1:] = (pair[1:] != pair[:-1]) | (year_from[1:] != year_from[:-1])
+    starts = np.flatnonzero(boundary)
+    counts = np.diff(np.append(starts, len(pair)))
+
+    def quantile(q):
+        # Linear interpolation inside each (price-sorted) group.
+        pos = starts + q * (counts - 1)
+        low = np.floor(pos).astype(np.int64)
+        high = np.ceil(pos).astype(np.int64)
+        return prices[low] + (prices[high] - prices[low]) * (pos - low)
+
+    median, q1, q3 = quantile(0.5), quantile(0.25), quantile(0.75)
+
+    # Least squares price = intercept + slope * km, on centred values.
+    mean_km = np.add.reduceat(kms, starts) / counts
+    mean_price = np.add.reduceat(prices, starts) / counts
+    dx = kms - np.repeat(mean_km, counts)
+    dy = prices - np.repeat(mean_price, counts)
+    sxx = np.add.reduceat(dx * dx, starts)
+    sxy = np.add.reduceat(dx * dy, starts)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    intercept = mean_price - slope * mean_km
+
+    stats = []
+    for i in np.flatnonzero(counts >= MIN_COUNT):
+        brand, model = pairs[pair[starts[i]]]
+        first_year = int(year_from[starts[i]])
+        stats.append(
+            PriceStat(
+                brand=brand,
+                model=model,
+                year_from=first_year,
+                year_to=first_year + bucket - 1,
+                count=int(counts[i]),
+                median=round(float(median[i]), 2),
+                q1=round(float(q1[i]), 2),
+                q3=round(float(q3[i]), 2),
+                price_per_km=float(slope[i]),
+                intercept=float(intercept[i]),
+            )
+        )
+    return stats
+
+
+def _link_cars(cars):
+    """Point each car to its statistics group with a single UPDATE."""
+    group = PriceStat.objects.filter(
+        brand=OuterRef("brand"),
+        model=OuterRef("model"),
+        year_from__lte=OuterRef("year"),
+        year_to__gte=OuterRef("year"),
+    ).values("pk")[:1]
+    return cars.update(price_stat=Subquery(group))
+
+
+def compute_price_stats(incremental=False):
+    """Rebuild PriceStat (all groups, or only those touched since the last run).
+
+    Returns the number of groups written.
+    """
+    started = timezone.now()
+    checkpoint = JobCheckpoint.objects.filter(name=CHECKPOINT).first()
+    cars = Car.objects.all()
+    stale = PriceStat.objects.filter(computed_at__lt=started)
+    if incremental and checkpoint:
+        touched = list(
+            Car.objects.filter(updated_at__gte=checkpoint.last_run_at)
+            .order_by()
+            .values_list("brand", "model")
+            .distinct()[: MAX_INCREMENTAL_PAIRS + 1]
+        )
+        # Too many groups touched: a full run is cheaper than a huge OR.
+        if len(touched) <= MAX_INCREMENTAL_PAIRS:
+            scope = Q(pk__in=[])
+            for brand, model in touched:
+                scope |= Q(brand=brand, model=model)
+            cars = cars.filter(scope)
+            stale = stale.filter(scope)
+
+    stats = group_stats(*_load(cars))
+    with transaction.atomic():
+        for i in range(0, len(stats), WRITE_BATCH):
+            PriceStat.objects.bulk_create(
+                stats[i : i + WRITE_BATCH],
+                update_conflicts=True,
+                unique_fields=["brand", "model", "year_from"],
+                update_fields=[
+                    "year_to",
+                    "count",
+                    "median",
+                    "q1",
+                    "q3",
+                    "price_per_km",
+                    "intercept",
+                    "computed_at",
+                ],
+            )
+        # Groups that no longer have enough listings (cars are unlinked).
+        stale.delete()
+        _link_cars(cars)
+        JobCheckpoint.objects.update_or_create(
+            name=CHECKPOINT, defaults={"last_run_at": started}
+        )
+    invalidate_catalogue()
+    return len(stats)
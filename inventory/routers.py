@@ -0,0 +1,78 @@
+"""Read-replica routing (``DATABASE_ROUTERS``, set when a replica is configured).
+
+Only views wrapped in ``decorators.read_from_replica`` read from the
+``replica`` alias; everything else, and every write, uses ``default``.
+Whatever is cached per catalogue generation (pages, freshness validators)
+is read from the primary: a lagging replica would store stale data under
+the new generation.
+After a write, ``ReplicaStickinessMiddleware`` pins the client to the
+primary for ``REPLICA_STICKY_SECONDS`` so it reads its own writes.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+REPLICA_ALIAS = "replica"
+STICKY_COOKIE = "db_primary"
+
+# Writes that do not pin the client to the primary (visit logging and its
+# counters, sessions).
+UNTRACKED_WRITES = {"inventory.sitevisit", "inventory.userstats", "sessions.session"}
+# Always read from the primary: a session missing on a lagging replica would
+# log the user out.
+PRIMARY_READS = {"sessions.session"}
+
+_use_replica = ContextVar("use_replica", default=False)
+_writes = ContextVar("writes", default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Route the reads made inside the block to the replica."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Route the reads made inside the block to the primary, even in a
+    ``replica_reads`` block: for results stored in shared caches."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def track_writes():
+    """Yield a dict whose ``"wrote"`` flag is set by tracked writes."""
+    state = {"wrote": False}
+    token = _writes.set(state)
+    try:
+        yield state
+    finally:
+        _writes.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.label_lower not in PRIMARY_READS:
+            return REPLICA_ALIAS
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        state = _writes.get()
+        if state is not None and model._meta.label_lower not in UNTRACKED_WRITES:
+            state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,96 @@
+"""Session engine: cached_db with coalesced writes (``SESSION_ENGINE``).
+
+Sessions are read from the cache (the database only on a miss), and a save
+that would store exactly what was loaded is skipped. The cache is only used
+when it is shared between workers (``SESSION_USE_CACHE``): with per-process
+locmem caches a logout on one worker would leave the session alive, cached,
+on the others.
+
+The sliding expiry (``SessionRefreshMiddleware``) re-saves an unchanged
+session at most once per ``SESSION_REFRESH_INTERVAL`` seconds instead of on
+every request.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db, db
+from django.utils import timezone
+
+# Unix time of the last write, kept in the session data itself.
+REFRESHED_KEY = "_refreshed"
+PURGE_BATCH = 1000
+
+
+class CoalescedWritesMixin:
+    """Skip saves that would not change the stored session."""
+
+    def load(self):
+        data = super().load()
+        self._loaded_digest = self._digest(data)
+        return data
+
+    def _digest(self, data):
+        data = {k: v for k, v in data.items() if k != REFRESHED_KEY}
+        return hashlib.md5(
+            self.serializer().dumps(data), usedforsecurity=False
+        ).hexdigest()
+
+    def refresh_due(self):
+        """True when the stored expiry was last pushed back too long ago."""
+        refreshed = self._session.get(REFRESHED_KEY, 0)
+        return time.time() - refreshed >= settings.SESSION_REFRESH_INTERVAL
+
+    def _unchanged(self):
+        digest = getattr(self, "_loaded_digest", None)
+        return digest is not None and digest == self._digest(self._session)
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self.session_key is not None
+            and self._unchanged()
+            and not self.refresh_due()
+        ):
+            return
+        self._session[REFRESHED_KEY] = int(time.time())
+        super().save(must_create=must_create)
+        self._loaded_digest = self._digest(self._session)
+
+
+class DbSessionStore(CoalescedWritesMixin, db.SessionStore):
+    pass
+
+
+class CachedDbSessionStore(CoalescedWritesMixin, cached_db.SessionStore):
+    pass
+
+
+SessionStore = (
+    CachedDbSessionStore
+    if getattr(settings, "SESSION_USE_CACHE", True)
+    else DbSessionStore
+)
+
+
+def purge_expired(batch_size=PURGE_BATCH, pause=0.0):
+    """Delete expired sessions ``batch_size`` rows at a time.
+
+    Each batch is a short primary-key delete, so the table is never locked
+    for long; ``pause`` seconds are slept between batches. Returns the count.
+    """
+    model = SessionStore.get_model_class()
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(
+            model.objects.filter(expire_date__lt=now).values_list(
+                "session_key", flat=True
+            )[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += model.objects.filter(session_key__in=keys).delete()[0]
+        if pause:
+            time.sleep(pause)
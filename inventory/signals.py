@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import agenda, alerts, userstats
+from .cache import invalidate_catalogue
+from .models import Appointment, Car, Favorite, Message, UserStats
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def car_changed(sender, **kwargs):
+    invalidate_catalogue()
+
+
+# --- ALERTES (recherches enregistrées, baisses de prix) ---
+@receiver(post_save, sender=Car)
+def car_watched(sender, instance, created, raw=False, **kwargs):
+    """Alert saved searches when a car goes on sale, favouriters when its
+    price drops; both compared against the values loaded by ``from_db``."""
+    if raw:
+        return
+    loaded = {} if created else getattr(instance, "_loaded_values", {})
+    current = {name: instance.__dict__.get(name) for name in Car.TRACKED_FIELDS}
+    instance._loaded_values = current
+    if current["status"] != "Disponible":
+        return
+    if loaded.get("status") != "Disponible":
+        alerts.queue_matches([instance.pk])
+    old_price, price = loaded.get("price"), current["price"]
+    if old_price is not None and price is not None and price < old_price:
+        alerts.queue_price_drops([(instance.pk, old_price, price)])
+
+
+# --- STATISTIQUES RENDEZ-VOUS ---
+# No post_delete receiver: it would turn the appointment cascades of Car and
+# User deletes into one query per row (see cascade_deleting below).
+@receiver(post_save, sender=Appointment)
+def appointment_changed(sender, **kwargs):
+    agenda.invalidate_stats()
+
+
+# --- COMPTEURS UTILISATEUR (UserStats) ---
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_delete, sender=Car)
+@receiver(pre_delete, sender=User)
+def cascade_deleting(sender, instance, **kwargs):
+    """Recount, after commit, the users whose favourites, appointments or
+    messages the cascade deletes (it runs without per-row signals)."""
+    if sender is Car:
+        users = Favorite.objects.filter(car=instance).values_list("user_id")
+        users = users.order_by().union(
+            Appointment.objects.filter(car=instance).values_list("user_id").order_by()
+        )
+    else:
+        users = Message.objects.filter(receiver=instance).values_list("sender_id")
+    userstats.recount_on_commit(user_id for user_id, in users)
+    transaction.on_commit(agenda.invalidate_stats)
+
+
+def _counted(counter):
+    model, field = userstats.COUNTERS[counter]
+    attname = model._meta.get_field(field).attname
+
+    def created(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            userstats.bump(getattr(instance, attname), counter)
+
+    post_save.connect(created, sender=model, weak=False)
+
+
+for _counter in userstats.COUNTERS:
+    _counted(_counter)
@@ -0,0 +1,64 @@
+"""Helpers to inline small static files (critical CSS, tiny scripts) and
+to trim rendered HTML.
+
+Third-party assets (Bootstrap, Bootstrap Icons, Chart.js) stay on the
+jsDelivr CDN; only the site's own files go through WhiteNoise.
+"""
+
+import re
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON = re.compile(r":\s+")
+_JS_COMMENT_LINE = re.compile(r"^\s*//.*$", re.M)
+_HTML_INDENT = re.compile(rb"\n\s+")
+
+
+def minify_css(text):
+    """Conservative CSS minifier (comments and whitespace only)."""
+    text = _CSS_SPACE.sub(" ", _CSS_COMMENT.sub("", text))
+    text = _CSS_COLON.sub(":", _CSS_PUNCT.sub(r"\1", text))
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """Drop full-line comments, indentation and blank lines."""
+    lines = (line.strip() for line in _JS_COMMENT_LINE.sub("", text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+@lru_cache(maxsize=None)
+def inline_source(path):
+    """Minified content of a static CSS/JS file, read once per process."""
+    found = finders.find(path)
+    if not found:
+        raise ValueError(f"Fichier statique introuvable : {path}")
+    with open(found, encoding="utf-8") as stream:
+        text = stream.read()
+    return minify_css(text) if path.endswith(".css") else minify_js(text)
+
+
+def strip_html(response):
+    """Remove template indentation and blank lines from an HTML response.
+
+    Line breaks are kept (inline scripts stay valid); pages containing
+    ``<pre>`` or ``<textarea>`` are left untouched. Marks the response so it
+    is processed only once.
+    """
+    if (
+        getattr(response, "html_stripped", False)
+        or response.streaming
+        or "text/html" not in response.get("Content-Type", "")
+    ):
+        return response
+    response.html_stripped = True
+    if b"<pre" in response.content or b"<textarea" in response.content:
+        return response
+    response.content = _HTML_INDENT.sub(b"\n", response.content)
+    if response.has_header("Content-Length"):
+        response["Content-Length"] = str(len(response.content))
+    return response
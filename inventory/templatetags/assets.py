@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from inventory.static_assets import inline_source
+
+register = template.Library()
+
+
+@register.simple_tag
+def inline_static(path):
+    """``{% inline_static "css/critical.css" %}``: minified file content."""
+    return mark_safe(inline_source(path))
@@ -1,3 +1,1220 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import numpy as np
+import psycopg2.extensions
+import psycopg2.pool
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.deletion import Collector
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import include, path
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import (
+    agenda,
+    analytics,
+    async_views,
+    checks,
+    compare,
+    geoip,
+    notifications,
+    popularity,
+    presence,
+    sessions,
+    static_assets,
+    userstats,
+    viewcounter,
+)
+from .alerts import (
+    MAX_PRICE,
+    SearchIndex,
+    candidate_searches,
+    find_matches,
+    normalise,
+    save_search,
+)
+from .bots import is_bot_user_agent
+from .catalogue import listing_queryset, read_filters, read_sort
+from .compare import COMPARE_LIMIT
+from .db.postgresql_pool.base import _Pool
+from .decorators import anonymous_page_cache, read_from_replica
+from .exports import (
+    EXPORT_STALE_SECONDS,
+    export_path,
+    export_state,
+    write_export,
+)
+from .hll import HyperLogLog
+from .importers import import_cars
+from .management.commands.explain_queries import Command as ExplainCommand
+from .middleware import ReplicaStickinessMiddleware, SiteVisitMiddleware
+from .models import (
+    Appointment,
+    Car,
+    CarChange,
+    CompareItem,
+    DailyVisitStat,
+    Favorite,
+    Message,
+    Notification,
+    PriceStat,
+    SiteVisit,
+    UserStats,
+    VisitSketch,
+)
+from .notifications import notify, send_digests
+from .pricing import MAX_INCREMENTAL_PAIRS, compute_price_stats
+from .routers import (
+    REPLICA_ALIAS,
+    STICKY_COOKIE,
+    ReplicaRouter,
+    primary_reads,
+    replica_reads,
+)
+from .userstats import reconcile, recount
+
+# Plain static storage (no collectstatic manifest), no HTTPS redirect, and
+# background tasks run inline so their effects can be asserted.
+TEST_SETTINGS = {
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+    },
+    "SECURE_SSL_REDIRECT": False,
+    "BACKGROUND_TASKS_SYNC": True,
+}
+
+
+def make_car(**fields):
+    values = {
+        "brand": "Toyota",
+        "model": "Corolla",
+        "price": 5_000_000,
+        "year": 2018,
+        "city": "Douala",
+        "status": "Disponible",
+    }
+    values.update(fields)
+    return Car.objects.create(**values)
+
+
+@override_settings(**TEST_SETTINGS)
+class BaseTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+class ConversationTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.buyer = User.objects.create_user("buyer", password="pw")
+        self.staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.car = make_car()
+        Message.objects.create(
+            sender=self.staff, receiver=self.buyer, car=self.car, content="Bonjour"
+        )
+
+    def test_buyer_reply_notifies_staff(self):
+        self.client.force_login(self.buyer)
+        response = self.client.post(
+            f"/mes-messages/{self.staff.pk}/", {"content": "Toujours dispo ?"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Message.objects.filter(sender=self.buyer).count(), 1)
+        notification = Notification.objects.get(user=self.staff, kind="reply")
+        self.assertEqual(notification.car, self.car)
+        self.assertEqual(notification.link, f"/panel/messages/{self.buyer.pk}/")
+
+    def test_staff_reply_notifies_client(self):
+        self.client.force_login(self.staff)
+        self.client.post(f"/panel/messages/{self.buyer.pk}/", {"content": "Oui"})
+        notification = Notification.objects.get(user=self.buyer, kind="reply")
+        self.assertEqual(notification.link, f"/mes-messages/{self.staff.pk}/")
+
+
+class SafeRedirectTests(BaseTestCase):
+    def test_mark_read_ignores_foreign_referer(self):
+        user = User.objects.create_user("u", password="pw")
+        self.client.force_login(user)
+        response = self.client.post(
+            "/notifications/lues/", HTTP_REFERER="https://evil.example/phish"
+        )
+        self.assertEqual(response["Location"], "/notifications/")
+
+    def test_mark_read_follows_local_referer(self):
+        user = User.objects.create_user("u", password="pw")
+        self.client.force_login(user)
+        response = self.client.post(
+            "/notifications/lues/", HTTP_REFERER="http://testserver/mes-favoris/"
+        )
+        self.assertEqual(response["Location"], "http://testserver/mes-favoris/")
+
+
+class PriceStatsTests(BaseTestCase):
+    def test_incremental_counts_pairs_not_rows(self):
+        for _ in range(MAX_INCREMENTAL_PAIRS + 5):
+            make_car()
+        for price in (1_000_000, 2_000_000, 3_000_000):
+            make_car(brand="Honda", model="Civic", price=price)
+        compute_price_stats()
+        honda = PriceStat.objects.get(brand="Honda")
+
+        Car.objects.filter(brand="Toyota").update(updated_at=timezone.now())
+        compute_price_stats(incremental=True)
+
+        # Only the Toyota group was recomputed: no fallback to a full run.
+        honda_after = PriceStat.objects.get(brand="Honda")
+        self.assertEqual(honda_after.computed_at, honda.computed_at)
+
+    def test_incremental_drops_groups_below_min_count(self):
+        cars = [make_car(price=p) for p in (4_000_000, 5_000_000, 6_000_000)]
+        compute_price_stats()
+        self.assertIsNotNone(Car.objects.get(pk=cars[0].pk).price_stat)
+
+        cars[0].year = 2010
+        cars[0].save()
+        compute_price_stats(incremental=True)
+
+        self.assertFalse(
+            PriceStat.objects.filter(year_from__lte=2018, year_to__gte=2018).exists()
+        )
+        self.assertIsNone(Car.objects.get(pk=cars[1].pk).price_stat)
+
+
+class _FakeConnection:
+    closed = 0
+
+    def close(self):
+        self.closed = 1
+
+    info = mock.Mock(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        # No PostgreSQL server here: psycopg2's pool hands out fake connections.
+        patcher = mock.patch("psycopg2.connect", lambda **kwargs: _FakeConnection())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_waits_for_a_free_connection(self):
+        pool = _Pool(1, 5, {})
+        first = pool.getconn()
+        threading.Timer(0.1, pool.putconn, [first]).start()
+        # Blocks until the first one is handed back, then reuses it.
+        self.assertIs(pool.getconn(), first)
+        self.assertFalse(first.closed)
+
+    def test_times_out_when_exhausted(self):
+        pool = _Pool(1, 0.05, {})
+        pool.getconn()
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn()
+
+    def test_skips_connections_closed_while_idle(self):
+        pool = _Pool(1, 5, {})
+        stale = pool.getconn()
+        pool.putconn(stale)
+        stale.close()  # e.g. the server restarted
+        fresh = pool.getconn()
+        self.assertIsNot(fresh, stale)
+        self.assertFalse(fresh.closed)
+
+    def test_failed_connect_releases_its_slot(self):
+        pool = _Pool(1, 0.05, {})
+        with mock.patch("psycopg2.connect", side_effect=psycopg2.OperationalError):
+            with self.assertRaises(psycopg2.OperationalError):
+                pool.getconn()
+        # Without the release this would time out.
+        self.assertFalse(pool.getconn().closed)
+
+    def test_discarded_connection_frees_its_slot(self):
+        pool = _Pool(1, 0.05, {})
+        broken = pool.getconn()
+        pool.putconn(broken, close=True)
+        self.assertTrue(broken.closed)
+        self.assertIsNot(pool.getconn(), broken)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def _anonymous_get(self, path="/", **cookies):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        request.COOKIES.update(cookies)
+        return request
+
+    def test_reads_follow_the_active_block(self):
+        self.assertEqual(self.router.db_for_read(Car), "default")
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Car), REPLICA_ALIAS)
+            self.assertEqual(self.router.db_for_read(Session), "default")
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Car), "default")
+            self.assertEqual(self.router.db_for_read(Car), REPLICA_ALIAS)
+
+    def test_pinned_client_skips_the_replica(self):
+        seen = []
+
+        @read_from_replica
+        def view(request):
+            seen.append(self.router.db_for_read(Car))
+            return HttpResponse()
+
+        view(self._anonymous_get())
+        view(self._anonymous_get(**{STICKY_COOKIE: "1"}))
+        self.assertEqual(seen, [REPLICA_ALIAS, "default"])
+
+    @override_settings(PAGE_CACHE_TIMEOUT=60)
+    def test_page_cache_is_filled_from_the_primary(self):
+        cache.clear()
+        seen = []
+
+        @read_from_replica
+        @anonymous_page_cache
+        def view(request):
+            seen.append(self.router.db_for_read(Car))
+            return HttpResponse("page")
+
+        first = view(self._anonymous_get("/replica-test/"))
+        second = view(self._anonymous_get("/replica-test/"))
+        self.assertEqual(seen, ["default"])
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        self.assertEqual(second["X-Page-Cache"], "hit")
+
+    def test_writes_pin_the_client(self):
+        def writing(model):
+            def get_response(request):
+                self.router.db_for_write(model)
+                return HttpResponse()
+
+            return get_response
+
+        # The middleware only checks that a replica alias is configured.
+        replica = {REPLICA_ALIAS: settings.DATABASES["default"]}
+        with mock.patch.dict(settings.DATABASES, replica):
+            pinned = ReplicaStickinessMiddleware(writing(Car))(
+                RequestFactory().get("/")
+            )
+            untracked = ReplicaStickinessMiddleware(writing(SiteVisit))(
+                RequestFactory().post("/")
+            )
+        self.assertIn(STICKY_COOKIE, pinned.cookies)
+        self.assertNotIn(STICKY_COOKIE, untracked.cookies)
+
+    def test_pinned_client_reads_its_own_writes(self):
+        seen = []
+
+        @read_from_replica
+        def view(request):
+            if request.method == "POST":
+                self.router.db_for_write(Car)
+            seen.append(self.router.db_for_read(Car))
+            return HttpResponse()
+
+        replica = {REPLICA_ALIAS: settings.DATABASES["default"]}
+        with mock.patch.dict(settings.DATABASES, replica):
+            handler = ReplicaStickinessMiddleware(view)
+            handler(self._anonymous_get())
+            posted = handler(RequestFactory().post("/"))
+            cookie = posted.cookies[STICKY_COOKIE]
+            handler(self._anonymous_get(**{STICKY_COOKIE: cookie.value}))
+        self.assertEqual(seen, [REPLICA_ALIAS, "default", "default"])
+        self.assertEqual(cookie["max-age"], settings.REPLICA_STICKY_SECONDS)
+
+    def test_async_writes_pin_the_client(self):
+        async def get_response(request):
+            self.router.db_for_write(Car)
+            return HttpResponse()
+
+        replica = {REPLICA_ALIAS: settings.DATABASES["default"]}
+        with mock.patch.dict(settings.DATABASES, replica):
+            middleware = ReplicaStickinessMiddleware(get_response)
+            response = asyncio.run(middleware(RequestFactory().post("/")))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_stickiness_is_off_without_a_replica(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaStickinessMiddleware(HttpResponse)
+
+
+class UserStatsTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("buyer", password="pw")
+        self.car = make_car()
+
+    def stats(self):
+        return UserStats.objects.get(user=self.user)
+
+    def test_signals_count_creations_and_deletions(self):
+        favorite = Favorite.objects.create(user=self.user, car=self.car)
+        Message.objects.create(
+            sender=self.user, receiver=self.user, car=self.car, content="Bonjour"
+        )
+        self.assertEqual((self.stats().favorites, self.stats().messages_sent), (1, 1))
+        self.client.force_login(self.user)
+        self.client.get(f"/favorite/{self.car.pk}/")
+        self.assertEqual(self.stats().favorites, 0)
+        self.assertFalse(Favorite.objects.filter(pk=favorite.pk).exists())
+
+    def test_car_delete_recounts_once_without_row_signals(self):
+        other = make_car()
+        for car in (self.car, other):
+            Favorite.objects.create(user=self.user, car=car)
+            Appointment.objects.create(
+                user=self.user,
+                car=car,
+                phone="1",
+                email="a@b.c",
+                date_rdv=timezone.now(),
+            )
+        self.assertEqual(self.stats().appointments, 2)
+        with mock.patch.object(userstats, "recount", wraps=recount) as spy:
+            with self.captureOnCommitCallbacks(execute=True):
+                with userstats.batch_recount():
+                    Car.objects.filter(pk__in=[self.car.pk, other.pk]).delete()
+        spy.assert_called_once_with({self.user.pk})
+        for model in (Favorite, Appointment, Message):
+            collector = Collector(using="default")
+            self.assertTrue(collector.can_fast_delete(model.objects.all()))
+        self.assertEqual((self.stats().favorites, self.stats().appointments), (0, 0))
+
+    def test_user_delete_recounts_senders(self):
+        other = User.objects.create_user("other", password="pw")
+        Message.objects.create(
+            sender=self.user, receiver=other, car=self.car, content="Bonjour"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.stats().messages_sent, 0)
+
+    def test_admin_deletes_recount(self):
+        admin_user = User.objects.create_superuser("admin", password="pw")
+        favorites = [
+            Favorite.objects.create(user=self.user, car=car)
+            for car in (self.car, make_car(), make_car())
+        ]
+        self.client.force_login(admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                f"/admin/inventory/favorite/{favorites[0].pk}/delete/",
+                {"post": "yes"},
+            )
+        self.assertEqual(self.stats().favorites, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/admin/inventory/favorite/",
+                {
+                    "action": "delete_selected",
+                    "_selected_action": [f.pk for f in favorites[1:]],
+                    "post": "yes",
+                },
+            )
+        self.assertFalse(Favorite.objects.exists())
+        self.assertEqual(self.stats().favorites, 0)
+
+    def test_reconcile_repairs_bulk_changes(self):
+        Favorite.objects.bulk_create([Favorite(user=self.user, car=self.car)])
+        self.assertEqual(self.stats().favorites, 0)
+        self.assertEqual(reconcile(), 1)
+        self.assertEqual(self.stats().favorites, 1)
+
+
+class AlertTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("buyer", password="pw")
+
+    def test_new_car_matches_saved_search(self):
+        save_search(self.user, normalise({"q": "toyota", "price_max": "6000000"}))
+        save_search(self.user, normalise({"q": "honda"}))
+        with self.captureOnCommitCallbacks(execute=True):
+            car = make_car()
+            make_car(price=9_000_000)
+        notification = Notification.objects.get(user=self.user)
+        self.assertEqual((notification.kind, notification.car), ("search_match", car))
+
+    def test_price_drop_notifies_favouriters(self):
+        car = make_car()
+        Favorite.objects.create(user=self.user, car=car)
+        car = Car.objects.get(pk=car.pk)
+        car.price = 4_500_000
+        with self.captureOnCommitCallbacks(execute=True):
+            car.save()
+        notification = Notification.objects.get(user=self.user, kind="price_drop")
+        self.assertEqual(Decimal(notification.data["new_price"]), 4_500_000)
+
+    def test_match_keeps_the_oldest_search(self):
+        first, _ = save_search(self.user, normalise({"q": "toyota"}))
+        second, _ = save_search(self.user, normalise({"city": "douala"}))
+        car = make_car()
+        # Bucket iteration order must not decide which search is kept.
+        rows = list(candidate_searches([car]))
+        for ordered in (rows, rows[::-1]):
+            matches = find_matches([car], SearchIndex(ordered))
+            self.assertEqual(matches, {(self.user.pk, car.pk): first.pk})
+        self.assertLess(first.pk, second.pk)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class CatalogueCacheTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.car = make_car()
+        self.client.defaults["HTTP_USER_AGENT"] = "Mozilla/5.0"
+
+    def test_conditional_get_answers_304(self):
+        first = self.client.get(f"/voiture/{self.car.pk}/")
+        self.assertEqual(first.status_code, 200)
+        again = self.client.get(
+            f"/voiture/{self.car.pk}/", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(again.status_code, 304)
+
+        Car.objects.get(pk=self.car.pk).save()
+        changed = self.client.get(
+            f"/voiture/{self.car.pk}/", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(changed.status_code, 200)
+
+    def test_anonymous_pages_are_cached_per_generation(self):
+        self.assertEqual(self.client.get("/")["X-Page-Cache"], "miss")
+        self.assertEqual(self.client.get("/")["X-Page-Cache"], "hit")
+        make_car(brand="Honda")
+        response = self.client.get("/")
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Honda")
+
+    def test_cached_pages_are_stored_trimmed(self):
+        miss = self.client.get("/")
+        self.assertNotIn(b"\n ", miss.content)
+        with mock.patch.object(static_assets, "_HTML_INDENT") as indent:
+            hit = self.client.get("/")
+        indent.sub.assert_not_called()
+        self.assertEqual(hit.content, miss.content)
+
+    def test_per_user_validators_follow_the_unread_badge(self):
+        user = User.objects.create_user("buyer", password="pw")
+        self.client.force_login(user)
+        first = self.client.get("/vip/")
+        self.assertNotIn("Last-Modified", first)
+        again = self.client.get("/vip/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        notifications.notify(user, "reply")
+        changed = self.client.get("/vip/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+        # A date alone cannot validate it.
+        dated = self.client.get("/vip/", HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(dated.status_code, 200)
+
+
+class ExportTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        exports_root = tempfile.TemporaryDirectory()
+        self.addCleanup(exports_root.cleanup)
+        settings_override = override_settings(EXPORTS_ROOT=exports_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def visit(self, page, at):
+        visit = SiteVisit.objects.create(page=page)
+        SiteVisit.objects.filter(pk=visit.pk).update(created_at=at)
+
+    def export(self, **params):
+        response = self.client.get("/panel/activite/export/", params)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        SiteVisit.objects.create(page='=HYPERLINK("https://evil.example")')
+        self.assertIn("'=HYPERLINK", self.export())
+
+    def test_date_range_is_half_open(self):
+        end = datetime(2026, 3, 10, tzinfo=ZoneInfo(settings.TIME_ZONE))
+        self.visit("/last-second/", end + timedelta(days=1, microseconds=-1))
+        self.visit("/next-day/", end + timedelta(days=1))
+        content = self.export(start="2026-03-10", end="2026-03-10")
+        self.assertIn("/last-second/", content)
+        self.assertNotIn("/next-day/", content)
+
+    def test_failed_export_is_reported(self):
+        broken = mock.Mock()
+        broken.values_list.side_effect = RuntimeError("base indisponible")
+        with self.assertRaises(RuntimeError):
+            write_export(broken, ["page"], "visites.jsonl.gz")
+        self.assertEqual(
+            export_state("visites.jsonl.gz"), ("failed", "base indisponible")
+        )
+        response = self.client.get("/panel/exports/visites.jsonl.gz/", follow=True)
+        self.assertContains(response, "base indisponible")
+
+    def test_abandoned_export_is_reported(self):
+        part = export_path("visites.jsonl.gz") + ".part"
+        open(part, "wb").close()
+        self.assertEqual(export_state("visites.jsonl.gz"), ("running", None))
+        stale = time.time() - EXPORT_STALE_SECONDS
+        os.utime(part, (stale, stale))
+        self.assertEqual(export_state("visites.jsonl.gz")[0], "failed")
+        self.assertFalse(os.path.exists(part))
+
+
+class ImportHistoryTests(BaseTestCase):
+    HEADER = "external_ref,brand,model,price,year,city,status\n"
+
+    def test_import_logs_changes(self):
+        car = make_car(external_ref="A1")
+        feed = (
+            self.HEADER
+            + "A1,Toyota,Corolla,4500000,2018,Douala,Disponible\n"
+            + "B2,Honda,Civic,3000000,2016,Yaoundé,Disponible\n"
+        )
+        report = import_cars(io.StringIO(feed))
+        self.assertEqual((report.updated, report.created), (1, 1))
+        change = CarChange.objects.get(car=car)
+        self.assertEqual(change.diff, {"price": ["5000000.00", "4500000.00"]})
+        created = CarChange.objects.get(car__external_ref="B2")
+        self.assertEqual(created.diff["price"], [None, "3000000.00"])
+
+    def test_unchanged_rows_log_nothing(self):
+        make_car(external_ref="A1")
+        feed = self.HEADER + "A1,Toyota,Corolla,5000000,2018,Douala,Disponible\n"
+        import_cars(io.StringIO(feed))
+        self.assertFalse(CarChange.objects.exists())
+
+
+class BulkPriceTests(BaseTestCase):
+    def test_price_increase_is_clamped_to_the_column(self):
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        car = make_car(price=20_000_000)
+        self.client.post(
+            "/panel/voitures/actions/",
+            {"ids": [car.pk], "action": "price", "percent": "500"},
+        )
+        car.refresh_from_db()
+        self.assertEqual(car.price, MAX_PRICE)
+
+
+class CompareTests(BaseTestCase):
+    def test_add_keeps_the_newest_cars(self):
+        user = User.objects.create_user("buyer", password="pw")
+        cars = [make_car() for _ in range(COMPARE_LIMIT + 1)]
+        for car in cars:
+            self.assertTrue(compare.add(user, car))
+        self.assertFalse(compare.add(user, cars[-1]))
+        self.assertEqual(list(compare.compared_cars(user)), cars[1:])
+
+    def test_concurrent_add_is_not_an_error(self):
+        user = User.objects.create_user("buyer", password="pw")
+        car = make_car()
+        raced = []
+
+        def other_request(execute, sql, params, many, context):
+            # Another request adds the same car right after our first lookup.
+            result = execute(sql, params, many, context)
+            if not raced and sql.startswith("SELECT") and "compareitem" in sql:
+                raced.append(CompareItem.objects.create(user=user, car=car))
+            return result
+
+        with connection.execute_wrapper(other_request):
+            self.assertFalse(compare.add(user, car))
+        self.assertEqual(CompareItem.objects.filter(user=user).count(), 1)
+
+
+class ImportEncodingTests(BaseTestCase):
+    def test_non_utf8_line_is_reported(self):
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        feed = (
+            ImportHistoryTests.HEADER
+            + "A1,Toyota,Corolla,4500000,2018,Douala,Disponible\n"
+            + "B2,Renault,Mégane,3000000,2016,Yaoundé,Disponible\n"
+        ).encode("latin-1")
+        upload = SimpleUploadedFile("voitures.csv", feed, content_type="text/csv")
+        response = self.client.post("/panel/voitures/import/", {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        report = response.context["report"]
+        self.assertEqual((report.created, report.failed), (1, 1))
+        self.assertEqual(report.errors[0][0], 3)
+
+
+class CalendarTests(BaseTestCase):
+    def test_extreme_dates_are_clamped(self):
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        for params in (
+            {"date": "9999-12-31"},
+            {"date": "9999-12-31", "view": "week"},
+            {"date": "0001-01-01", "view": "week"},
+        ):
+            response = self.client.get("/panel/rendez-vous/calendrier/", params)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(response.context["day"], (agenda.FIRST_DAY, agenda.LAST_DAY))
+
+
+class DigestTests(BaseTestCase):
+    def test_replies_are_emailed(self):
+        user = User.objects.create_user("buyer", email="b@example.com", password="pw")
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        notify(user, "reply", sender=staff.username, sender_id=staff.pk)
+        notify(user, "price_drop", car=make_car(), old_price="5000000", new_price="1")
+        self.assertEqual(send_digests(), 1)
+        body = mail.outbox[0].body
+        self.assertIn("staff vous a répondu", body)
+        self.assertIn(f"/mes-messages/{staff.pk}/", body)
+        self.assertIn("Baisse de prix", body)
+        self.assertFalse(Notification.objects.filter(emailed_at__isnull=True).exists())
+
+    def test_notifications_created_during_the_send_are_not_lost(self):
+        user = User.objects.create_user("buyer", email="b@example.com", password="pw")
+        notify(user, "price_drop", car=make_car(), old_price="5000000", new_price="1")
+        real_connection = notifications.get_connection
+
+        def connection_with_a_new_notification():
+            connection = real_connection()
+            send = connection.send_messages
+
+            def send_messages(messages):
+                if not Notification.objects.filter(kind="reply").exists():
+                    notify(user, "reply", sender="staff", sender_id=user.pk)
+                return send(messages)
+
+            connection.send_messages = send_messages
+            return connection
+
+        with mock.patch.object(
+            notifications, "get_connection", connection_with_a_new_notification
+        ):
+            # The reply arrives mid-send: it goes out in a second e-mail
+            # rather than being stamped unsent.
+            self.assertEqual(send_digests(), 2)
+        self.assertIn("vous a répondu", mail.outbox[1].body)
+
+
+class BotFilterTests(SimpleTestCase):
+    def test_baidu_browser_is_not_a_bot(self):
+        browser = (
+            "Mozilla/5.0 (Linux; Android 12; SM-A125F) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/97.0 Mobile Safari/537.36 baiduboxapp/13.10"
+        )
+        self.assertFalse(is_bot_user_agent(browser))
+        self.assertTrue(
+            is_bot_user_agent(
+                "Mozilla/5.0 (compatible; Baiduspider/2.0; "
+                "+http://www.baidu.com/search/spider.html)"
+            )
+        )
+
+    def test_bot_token_needs_a_word_or_version(self):
+        crawlers = [
+            "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+            "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)",
+            "AdsBot-Google (+http://www.google.com/adsbot.html)",
+            "Twitterbot/1.0",
+            "TelegramBot (like TwitterBot)",
+            "Slackbot 1.0 (+https://api.slack.com/robots)",
+            "Mozilla/5.0 (compatible; PetalBot;+https://webmaster.petalsearch.com)",
+            "Mozilla/5.0 AppleWebKit/537.36 (compatible; GPTBot/1.0)",
+            "some-bot",
+        ]
+        humans = [
+            "Mozilla/5.0 (Linux; Android 11; CUBOT_X30) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/108.0 Mobile Safari/537.36",
+            "Mozilla/5.0 (Linux; Android 10; CUBOT X30 Build/QP1A.190711.020) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0 Mobile Safari/537.36",
+            "Mozilla/5.0 (Linux; Android 12; CUBOT KINGKONG 7) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/112.0 Mobile Safari/537.36",
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+        ]
+        for user_agent in crawlers:
+            self.assertTrue(is_bot_user_agent(user_agent), user_agent)
+        for user_agent in humans:
+            self.assertFalse(is_bot_user_agent(user_agent), user_agent)
+
+
+class SiteVisitMiddlewareTests(BaseTestCase):
+    async def test_async_presence_stays_off_the_event_loop(self):
+        on_loop = []
+
+        def touch(visitor):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                on_loop.append(False)
+            else:
+                on_loop.append(True)
+
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = SiteVisitMiddleware(get_response)
+        request = RequestFactory().get(
+            "/", HTTP_USER_AGENT="Mozilla/5.0", REMOTE_ADDR="10.0.0.1"
+        )
+        request.user = AnonymousUser()
+        with mock.patch.object(presence, "touch", touch):
+            await middleware(request)
+            await asyncio.gather(*middleware._tasks)
+        self.assertEqual(on_loop, [False])
+
+
+@override_settings(**{**TEST_SETTINGS, "BACKGROUND_TASKS_SYNC": False})
+class ImportCommandTests(TransactionTestCase):
+    def test_command_sends_alerts_before_exiting(self):
+        user = User.objects.create_user("buyer", password="pw")
+        save_search(user, normalise({"fuel": "Diesel"}))
+        fan = User.objects.create_user("fan", password="pw")
+        Favorite.objects.create(user=fan, car=make_car(external_ref="A1"))
+        feed = (
+            ImportHistoryTests.HEADER.replace("status", "status,fuel")
+            + "A1,Toyota,Corolla,4000000,2018,Douala,Disponible,Essence\n"
+            + "B2,Toyota,Hilux,9000000,2019,Douala,Disponible,Diesel\n"
+            + "C3,Isuzu,D-Max,8000000,2017,Douala,Disponible,Diesel\n"
+        )
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write(feed)
+        self.addCleanup(os.remove, file.name)
+
+        call_command("import_cars", file.name, stdout=io.StringIO())
+
+        self.assertEqual(
+            Notification.objects.filter(user=user, kind="search_match").count(), 2
+        )
+        self.assertTrue(
+            Notification.objects.filter(user=fan, kind="price_drop").exists()
+        )
+
+
+class ApiTests(BaseTestCase):
+    def test_fields_are_projected(self):
+        car = make_car()
+        response = self.client.get(f"/api/cars/{car.pk}/?fields=brand,price")
+        self.assertEqual(response.json(), {"brand": "Toyota", "price": "5000000.00"})
+        unknown = self.client.get("/api/cars/?fields=brand,owner")
+        self.assertEqual(unknown.status_code, 400)
+
+    def test_cursor_walks_every_car_once(self):
+        created = timezone.now()
+        cars = [make_car(model=f"Corolla {i}") for i in range(5)]
+        # Equal timestamps: the id breaks the tie.
+        Car.objects.update(created_at=created)
+        seen, url = [], "/api/cars/?limit=2&fields=id"
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page["results"]), 2)
+            seen += [row["id"] for row in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, [car.pk for car in reversed(cars)])
+
+    def test_etag_answers_304_until_the_catalogue_changes(self):
+        make_car()
+        first = self.client.get("/api/cars/")
+        again = self.client.get("/api/cars/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        make_car(brand="Honda")
+        changed = self.client.get("/api/cars/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.json()["results"]), 2)
+
+    def test_large_bodies_are_gzipped_on_request(self):
+        for i in range(20):
+            make_car(model=f"Corolla {i}")
+        plain = self.client.get("/api/cars/")
+        self.assertNotIn("Content-Encoding", plain)
+        packed = self.client.get("/api/cars/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(packed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+        self.assertIn("Accept-Encoding", packed["Vary"])
+
+
+# The async public views in front of the regular URLconf, as ASYNC_VIEWS routes
+# them (inventory/urls.py picks its views once, at import).
+urlpatterns = [
+    path("", async_views.home, name="home"),
+    path("voiture/<int:pk>/", async_views.car_detail, name="car_detail"),
+    path("favorite/<int:car_id>/", async_views.toggle_favorite, name="toggle_favorite"),
+    path("mes-favoris/", async_views.favorite_list, name="favorite_list"),
+    path("comparer/", async_views.compare_cars, name="compare_cars"),
+    path(
+        "comparer/ajouter/<int:car_id>/",
+        async_views.add_to_compare,
+        name="add_to_compare",
+    ),
+    path("", include("core.urls")),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, PAGE_CACHE_TIMEOUT=60)
+class AsyncViewTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.car = make_car()
+        self.user = User.objects.create_user("buyer", password="pw")
+        self.async_client.defaults["HTTP_USER_AGENT"] = "Mozilla/5.0"
+
+    async def test_public_pages_render(self):
+        home = await self.async_client.get("/")
+        self.assertIs(home.resolver_match.func, async_views.home)
+        self.assertContains(home, "Corolla")
+        again = await self.async_client.get("/")
+        self.assertEqual(again["X-Page-Cache"], "hit")
+        detail = await self.async_client.get(f"/voiture/{self.car.pk}/")
+        self.assertContains(detail, "Corolla")
+        missing = await self.async_client.get("/voiture/0/")
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_favorites_need_a_login(self):
+        response = await self.async_client.get(f"/favorite/{self.car.pk}/")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response["Location"])
+        self.assertFalse(await Favorite.objects.aexists())
+
+    async def test_favorites_and_compare(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        await self.async_client.get(f"/favorite/{self.car.pk}/")
+        self.assertContains(await self.async_client.get("/mes-favoris/"), "Corolla")
+        await self.async_client.get(f"/favorite/{self.car.pk}/")
+        self.assertFalse(await Favorite.objects.aexists())
+        stats = await UserStats.objects.aget(user=self.user)
+        self.assertEqual(stats.favorites, 0)
+        await self.async_client.get(f"/comparer/ajouter/{self.car.pk}/")
+        self.assertContains(await self.async_client.get("/comparer/"), "Corolla")
+
+
+DB_SESSION_SAVE = "django.contrib.sessions.backends.db.SessionStore.save"
+
+
+@override_settings(SESSION_REFRESH_INTERVAL=300)
+class SessionTests(BaseTestCase):
+    def stored(self):
+        store = sessions.DbSessionStore()
+        store["cart"] = [1]
+        store.save()
+        return sessions.DbSessionStore(store.session_key)
+
+    def test_unchanged_session_is_not_written(self):
+        store = self.stored()
+        self.assertEqual(store["cart"], [1])
+        with self.assertNumQueries(0):
+            store.save()
+        store["cart"] = [1, 2]
+        with mock.patch(DB_SESSION_SAVE) as save:
+            store.save()
+        save.assert_called_once()
+
+    def test_expiry_is_pushed_back_once_per_interval(self):
+        store = self.stored()
+        self.assertEqual(store["cart"], [1])
+        later = time.time() + 301
+        with mock.patch(DB_SESSION_SAVE) as save:
+            with mock.patch("time.time", return_value=later):
+                store.save()
+        save.assert_called_once()
+
+    def test_purge_expired_deletes_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f"key{i}",
+                session_data="",
+                expire_date=now + timedelta(days=1 if i < 2 else -1),
+            )
+            for i in range(7)
+        )
+        # Three select + delete batches, then the empty select.
+        with self.assertNumQueries(7):
+            self.assertEqual(sessions.purge_expired(batch_size=2), 5)
+        self.assertEqual(
+            set(Session.objects.values_list("session_key", flat=True)),
+            {"key0", "key1"},
+        )
+
+
+class QueryBudgetTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.car = make_car()
+        make_car(model="Yaris")
+        viewcounter._pending.clear()
+        self.addCleanup(viewcounter._pending.clear)
+        self.client.defaults["HTTP_USER_AGENT"] = "Mozilla/5.0"
+
+    def test_car_detail_query_budget(self):
+        # Validator, car with its relations, similar cars, price history and
+        # the visit log; the repeat is answered from the page cache.
+        with self.assertNumQueries(5):
+            self.client.get(f"/voiture/{self.car.pk}/")
+        with self.assertNumQueries(0):
+            self.client.get(f"/voiture/{self.car.pk}/")
+        # Signed in: session and user instead of the cached validator and
+        # throttled visit, plus the unread notification count.
+        self.client.force_login(User.objects.create_user("buyer", password="pw"))
+        with self.assertNumQueries(5):
+            self.client.get(f"/voiture/{self.car.pk}/")
+
+    def test_views_are_flushed_in_one_update_per_count(self):
+        other = make_car(model="Hilux")
+        for car_id in (self.car.pk, other.pk, other.pk):
+            viewcounter.record(car_id)
+        self.assertEqual(viewcounter.total(other), 2)
+        with self.assertNumQueries(2):
+            self.assertEqual(viewcounter.flush(), 2)
+        other.refresh_from_db()
+        self.assertEqual((other.view_count, viewcounter.total(other)), (2, 2))
+
+    def test_a_due_flush_is_handed_to_the_worker(self):
+        last_flush = time.monotonic() - viewcounter.FLUSH_SECONDS
+        with mock.patch.object(viewcounter, "_last_flush", last_flush):
+            viewcounter.record(self.car.pk)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.view_count, 1)
+
+
+class PopularityTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("buyer", password="pw")
+        # Older, so it would come second in the default (newest first) sort.
+        self.liked = make_car(model="Hilux")
+        self.viewed = make_car(model="Yaris")
+
+    def view(self, car, times=1):
+        SiteVisit.objects.bulk_create(
+            SiteVisit(page=f"/voiture/{car.pk}/") for _ in range(times)
+        )
+
+    def test_newer_events_weigh_more(self):
+        week = popularity.HALF_LIFE.total_seconds()
+        start = popularity.EPOCH.timestamp()
+        totals = popularity.scores(
+            np.array([1, 2, 2]),
+            np.array([start + week, start, start]),
+            np.array([1.0, 1.0, 0.5]),
+            popularity.EPOCH,
+        )
+        self.assertEqual(totals, {1: 2.0, 2: 1.5})
+
+    def test_popular_sort_ranks_favourites_above_views(self):
+        self.view(self.viewed, times=3)
+        SiteVisit.objects.create(page=f"/voiture/{self.liked.pk}/", is_bot=True)
+        Favorite.objects.create(user=self.user, car=self.liked)
+        self.assertEqual(popularity.compute_popularity(), 2)
+        ranked = listing_queryset(read_filters({}), read_sort({"sort": "popular"}))
+        self.assertEqual(list(ranked), [self.liked, self.viewed])
+        self.assertEqual(read_sort({"sort": "-popularity"}), "")
+
+        response = self.client.get("/?sort=popular", HTTP_USER_AGENT="Mozilla/5.0")
+        self.assertEqual(list(response.context["cars"]), [self.liked, self.viewed])
+
+    def test_incremental_runs_only_add_new_events(self):
+        self.view(self.viewed)
+        popularity.compute_popularity()
+        self.assertEqual(popularity.compute_popularity(), 0)
+        self.view(self.viewed)
+        self.assertEqual(popularity.compute_popularity(), 1)
+        incremental = Car.objects.get(pk=self.viewed.pk).popularity
+        popularity.compute_popularity(full=True)
+        full = Car.objects.get(pk=self.viewed.pk).popularity
+        self.assertAlmostEqual(incremental, full)
+
+    def test_scores_are_rebased_in_a_new_era(self):
+        self.view(self.viewed)
+        popularity.compute_popularity()
+        self.view(self.viewed)
+        later = timezone.now() + popularity.ERA
+        with mock.patch.object(popularity.timezone, "now", return_value=later):
+            popularity.compute_popularity()
+            rebased = Car.objects.get(pk=self.viewed.pk).popularity
+            popularity.compute_popularity(full=True)
+        full = Car.objects.get(pk=self.viewed.pk).popularity
+        self.assertAlmostEqual(rebased, full)
+        # Relative to the new era: events an era old weigh little.
+        self.assertLess(full, 2.0)
+
+
+class GeoIPTests(SimpleTestCase):
+    CSV = (
+        "start_ip,end_ip,country,city\n"
+        "10.0.0.0,10.0.0.255,Cameroun,Douala\n"
+        "167772672,167772927,Cameroun,Yaoundé\n"  # 10.0.2.0 - 10.0.2.255
+        "1.0.0.0,1.0.0.9,Australie,\n"
+        "2001:db8::,2001:db8::ffff,France,Paris\n"
+    )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = os.path.join(directory.name, "ranges.csv")
+        with open(source, "w", encoding="utf-8") as stream:
+            stream.write(self.CSV)
+        self.path = os.path.join(directory.name, "geoip.bin")
+        self.assertEqual(geoip.build_database(source, self.path), 3)
+
+    def test_lookup_round_trip(self):
+        database = geoip.GeoIPDatabase(self.path)
+        self.assertEqual(len(database), 3)
+        self.assertEqual(database.lookup("10.0.0.0"), ("Cameroun", "Douala"))
+        self.assertEqual(database.lookup("10.0.0.255"), ("Cameroun", "Douala"))
+        self.assertEqual(database.lookup("10.0.2.7"), ("Cameroun", "Yaoundé"))
+        self.assertEqual(database.lookup("::ffff:1.0.0.9"), ("Australie", ""))
+        for ip in ("10.0.1.1", "0.0.0.1", "200.0.0.1", "2001:db8::1", "inconnue"):
+            self.assertIsNone(database.lookup(ip), ip)
+
+    def test_cached_lookup_uses_the_configured_file(self):
+        geoip.get_database.cache_clear()
+        geoip.lookup.cache_clear()
+        self.addCleanup(geoip.get_database.cache_clear)
+        self.addCleanup(geoip.lookup.cache_clear)
+        with override_settings(GEOIP_DB_PATH=self.path):
+            self.assertEqual(geoip.lookup("10.0.0.1"), ("Cameroun", "Douala"))
+        geoip.get_database.cache_clear()
+        with override_settings(GEOIP_DB_PATH=self.path + ".absent"):
+            self.assertIsNone(geoip.lookup("10.0.2.1"))
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def sketch(self, values, p=11):
+        sketch = HyperLogLog(p)
+        for value in values:
+            sketch.add(f"10.0.{value // 256}.{value % 256}")
+        return sketch
+
+    def test_estimates_within_the_standard_error(self):
+        for n in (100, 1000, 20000):
+            # Three standard errors (2.3% at p=11).
+            self.assertAlmostEqual(self.sketch(range(n)).count(), n, delta=n * 0.07)
+        self.assertEqual(HyperLogLog().count(), 0)
+        self.assertFalse(self.sketch([1]).add("10.0.0.1"))
+
+    def test_merge_equals_the_sketch_of_the_union(self):
+        left, right = self.sketch(range(0, 6000)), self.sketch(range(4000, 10000))
+        union = HyperLogLog.merged([left, right])
+        self.assertEqual(union.registers, self.sketch(range(10000)).registers)
+        self.assertAlmostEqual(union.count(), 10000, delta=700)
+
+        stored = HyperLogLog.from_bytes(left.to_bytes())
+        self.assertEqual((stored.p, stored.registers), (11, left.registers))
+        with self.assertRaises(ValueError):
+            left.update(HyperLogLog(9))
+
+
+class VisitRollupTests(BaseTestCase):
+    def visit(self, at, **fields):
+        visit = SiteVisit.objects.create(ip_address="10.0.0.1", **fields)
+        SiteVisit.objects.filter(pk=visit.pk).update(created_at=at)
+
+    def test_rollup_counts_whole_local_days(self):
+        today = timezone.localdate()
+        midnight = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        first = midnight - timedelta(days=1)
+        self.visit(first, country="Cameroun")
+        self.visit(midnight, country="Cameroun")
+        self.visit(midnight, country="France")
+        self.visit(midnight, country="France", is_bot=True)
+        self.visit(first - timedelta(microseconds=1), country="Cameroun")
+
+        self.assertEqual(analytics.rollup_visits(days=2), 3)
+        self.assertEqual(
+            set(DailyVisitStat.objects.values_list("day", "country", "visits")),
+            {
+                (today - timedelta(days=1), "Cameroun", 1),
+                (today, "Cameroun", 1),
+                (today, "France", 1),
+            },
+        )
+
+    def test_sketches_cover_whole_local_days(self):
+        today = timezone.localdate()
+        midnight = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        self.visit(midnight, page="/")
+        self.visit(midnight - timedelta(microseconds=1), page="/")
+        self.visit(midnight - timedelta(days=1), page="/vip/")
+        SiteVisit.objects.create(ip_address="10.0.0.2", page="/")
+
+        # all, page and country sketches: "/" today, "/" and "/vip/" yesterday.
+        self.assertEqual(analytics.build_visit_sketches(days=2), 7)
+        today_all = VisitSketch.objects.get(day=today, dimension="all")
+        self.assertEqual((today_all.visits, today_all.uniques), (2, 2))
+        yesterday = VisitSketch.objects.get(
+            day=today - timedelta(days=1), dimension="all"
+        )
+        self.assertEqual(yesterday.visits, 2)
+        with mock.patch.object(presence, "day_sketch", return_value=None):
+            self.assertEqual(
+                analytics.unique_visitors(today - timedelta(days=1), today), 2
+            )
+
+
+class ExplainQueriesTests(BaseTestCase):
+    def test_explain_flags_full_scans_only(self):
+        explain = ExplainCommand()._explain
+        table = Car._meta.db_table
+        self.assertEqual(
+            explain(f"SELECT id FROM {table} WHERE description = 'Diesel'"),
+            [table],
+        )
+        self.assertEqual(explain(f"SELECT id FROM {table} WHERE id = 1"), [])
+
+    def test_replay_reports_scans_and_rolls_back(self):
+        out = io.StringIO()
+        call_command("explain_queries", seed=20, min_rows=1, stdout=out)
+        self.assertRegex(out.getvalue(), r"\n[1-9]\d* parcours séquentiel")
+        self.assertIn("200 /voiture/", out.getvalue())
+        self.assertFalse(Car.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "explain_queries", seed=20, min_rows=1, strict=True, stdout=out
+            )
+        out = io.StringIO()
+        call_command("explain_queries", seed=20, min_rows=10**6, stdout=out)
+        self.assertIn("0 parcours séquentiel(s) dans 0 vue(s)", out.getvalue())
+
+
+class DeploymentCheckTests(SimpleTestCase):
+    REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+
+    def test_several_workers_without_redis_warn(self):
+        with override_settings(WEB_CONCURRENCY=3):
+            self.assertEqual(
+                [w.id for w in checks.shared_cache_check(None)], ["inventory.W001"]
+            )
+        with override_settings(WEB_CONCURRENCY=3, CACHES=self.REDIS):
+            self.assertEqual(checks.shared_cache_check(None), [])
+        with override_settings(WEB_CONCURRENCY=1):
+            self.assertEqual(checks.shared_cache_check(None), [])
@@ -1,10 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+
+# Hot public pages: async variants under the ASGI deployment (ASYNC_VIEWS).
+if settings.ASYNC_VIEWS:
+    from . import async_views as public_views
+else:
+    public_views = views
 
 urlpatterns = [
     # --- Public ---
-    path("", views.home, name="home"),
-    path("voiture/<int:pk>/", views.car_detail, name="car_detail"),
+    path("", public_views.home, name="home"),
+    path("voiture/<int:pk>/", public_views.car_detail, name="car_detail"),
     path("login/", views.login_view, name="login"),
     path("register/", views.register_view, name="register"),
     path("logout/", views.logout_view, name="logout"),
@@ -12,16 +19,52 @@ urlpatterns = [
     path(
         "rendez-vous/<int:car_id>/", views.appointment_create, name="appointment_create"
     ),
-    path("favorite/<int:car_id>/", views.toggle_favorite, name="toggle_favorite"),
-    path("mes-favoris/", views.favorite_list, name="favorite_list"),
+    path(
+        "favorite/<int:car_id>/", public_views.toggle_favorite, name="toggle_favorite"
+    ),
+    path("mes-favoris/", public_views.favorite_list, name="favorite_list"),
+    # --- API JSON (lecture seule) ---
+    path("api/cars/", api.car_list, name="api_car_list"),
+    path("api/cars/facets/", api.car_facets, name="api_car_facets"),
+    path("api/cars/<int:pk>/", api.car_detail, name="api_car_detail"),
     # --- Comparateur ---
-    path("comparer/", views.compare_cars, name="compare_cars"),
-    path("comparer/ajouter/<int:car_id>/", views.add_to_compare, name="add_to_compare"),
+    path("comparer/", public_views.compare_cars, name="compare_cars"),
+    path(
+        "comparer/ajouter/<int:car_id>/",
+        public_views.add_to_compare,
+        name="add_to_compare",
+    ),
     path(
         "comparer/retirer/<int:car_id>/",
-        views.remove_from_compare,
+        public_views.remove_from_compare,
         name="remove_from_compare",
     ),
+    path(
+        "comparer/suggestions/",
+        views.compare_suggestions,
+        name="compare_suggestions",
+    ),
+    # --- Recherches enregistrées ---
+    path("mes-alertes/", views.saved_searches, name="saved_searches"),
+    path("mes-alertes/creer/", views.save_search, name="save_search"),
+    path(
+        "mes-alertes/<int:pk>/supprimer/",
+        views.delete_saved_search,
+        name="delete_saved_search",
+    ),
+    # --- Notifications ---
+    path("notifications/", views.notification_list, name="notification_list"),
+    path(
+        "notifications/dernieres/",
+        views.notification_dropdown,
+        name="notification_dropdown",
+    ),
+    path("notifications/<int:pk>/", views.notification_open, name="notification_open"),
+    path(
+        "notifications/lues/",
+        views.notifications_mark_read,
+        name="notifications_mark_read",
+    ),
     # --- Messagerie client ---
     path("message/<int:car_id>/", views.send_message, name="send_message"),
     path("mes-messages/", views.my_messages, name="my_messages"),
@@ -32,8 +75,12 @@ urlpatterns = [
     ),
     # --- Panel Admin ---
     path("panel/", views.admin_dashboard, name="admin_dashboard"),
+    path("panel/en-ligne/", views.admin_online, name="admin_online"),
     path("panel/voitures/", views.admin_cars, name="admin_cars"),
     path("panel/voitures/ajouter/", views.admin_car_create, name="admin_car_create"),
+    path("panel/voitures/import/", views.admin_car_import, name="admin_car_import"),
+    path("panel/voitures/export/", views.admin_cars_export, name="admin_cars_export"),
+    path("panel/voitures/actions/", views.admin_cars_bulk, name="admin_cars_bulk"),
     path(
         "panel/voitures/<int:pk>/modifier/", views.admin_car_edit, name="admin_car_edit"
     ),
@@ -56,4 +103,29 @@ urlpatterns = [
     path("panel/utilisateurs/", views.admin_users, name="admin_users"),
     path("panel/activite/", views.admin_activity, name="admin_activity"),
     path("panel/rendez-vous/", views.admin_appointments, name="admin_appointments"),
+    path(
+        "panel/rendez-vous/calendrier/",
+        views.admin_appointments_calendar,
+        name="admin_appointments_calendar",
+    ),
+    path(
+        "panel/rendez-vous/<int:pk>/confirmer/",
+        views.admin_appointment_confirm,
+        name="admin_appointment_confirm",
+    ),
+    path(
+        "panel/activite/export/",
+        views.admin_activity_export,
+        name="admin_activity_export",
+    ),
+    path(
+        "panel/rendez-vous/export/",
+        views.admin_appointments_export,
+        name="admin_appointments_export",
+    ),
+    path(
+        "panel/exports/<str:name>/",
+        views.admin_export_download,
+        name="admin_export_download",
+    ),
 ]
@@ -0,0 +1,138 @@
+"""Denormalised per-user counters (``UserStats``).
+
+Signals bump a counter with a single ``UPDATE ... SET n = n + 1`` when a
+favourite, message, appointment or logged visit is created. Deletions have
+no receivers on those models, so the cascades of a Car or User delete stay
+fast (one DELETE per table, no per-row signal): ``pre_delete`` on Car and
+User collects the users whose counters the cascade changes and ``recount()``
+runs once after commit, merged for a whole ``batch_recount()`` block. Views
+deleting one row decrement with ``bump()`` and the admin recounts the users
+of the rows it deletes. Other deletes (shell, queryset ``delete()``) and
+bulk operations bypass all of this: ``reconcile()`` (command
+``reconcile_user_stats``) recomputes every counter from the source tables
+and must be scheduled, e.g. nightly.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Appointment, Favorite, Message, SiteVisit, UserStats
+
+# counter -> (model, foreign key to the user)
+COUNTERS = {
+    "favorites": (Favorite, "user"),
+    "messages_sent": (Message, "sender"),
+    "appointments": (Appointment, "user"),
+    "visits": (SiteVisit, "user"),
+}
+RECONCILE_BATCH = 500
+
+_state = threading.local()
+
+
+def bump(user_id, counter, delta=1):
+    """Add ``delta`` to one counter of a user (never below zero)."""
+    if user_id is None:
+        return
+    changes = {counter: Greatest(F(counter) + delta, 0), "updated_at": timezone.now()}
+    updated = UserStats.objects.filter(user_id=user_id).update(**changes)
+    # No row: first activity of this user, then create it. Not for decrements,
+    # which also fire while the user (and its row) is being deleted.
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def _counts(user_ids=None):
+    """``{counter: {user id: n}}``, one GROUP BY per source table."""
+    counts = {}
+    for counter, (model, field) in COUNTERS.items():
+        rows = model.objects.filter(**{f"{field}__isnull": False})
+        if user_ids is not None:
+            rows = rows.filter(**{f"{field}__in": user_ids})
+        counts[counter] = dict(
+            rows.values_list(field).annotate(n=Count("pk")).order_by()
+        )
+    return counts
+
+
+def recount(user_ids):
+    """Recompute the counters of ``user_ids``; returns the number of rows."""
+    user_ids = list(
+        User.objects.filter(pk__in=set(user_ids)).values_list("pk", flat=True)
+    )
+    if not user_ids:
+        return 0
+    counts = _counts(user_ids)
+    now = timezone.now()
+    UserStats.objects.bulk_create(
+        [
+            UserStats(
+                user_id=user_id,
+                updated_at=now,
+                **{counter: counts[counter].get(user_id, 0) for counter in COUNTERS},
+            )
+            for user_id in user_ids
+        ],
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=[*COUNTERS, "updated_at"],
+    )
+    return len(user_ids)
+
+
+def recount_on_commit(user_ids):
+    """Run ``recount`` after commit (once per ``batch_recount`` block)."""
+    user_ids = set(user_ids)
+    if getattr(_state, "depth", 0):
+        _state.pending |= user_ids
+    elif user_ids:
+        transaction.on_commit(lambda: recount(user_ids))
+
+
+@contextmanager
+def batch_recount():
+    """Coalesce every recount requested inside the block into a single one."""
+    if not getattr(_state, "depth", 0):
+        _state.pending = set()
+    _state.depth = getattr(_state, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        if not _state.depth:
+            recount_on_commit(_state.pending)
+
+
+def reconcile(batch_size=RECONCILE_BATCH):
+    """Recompute all counters; returns the number of users whose row changed.
+
+    Each counter is a separate GROUP BY on its own table, so counts are not
+    multiplied by joins.
+    """
+    counts = _counts()
+    current = {
+        row["user_id"]: row
+        for row in UserStats.objects.values("user_id", *COUNTERS).iterator()
+    }
+    now = timezone.now()
+    changed = []
+    for user_id in User.objects.values_list("pk", flat=True).iterator():
+        values = {counter: counts[counter].get(user_id, 0) for counter in COUNTERS}
+        row = current.get(user_id)
+        if row is None or any(row[c] != v for c, v in values.items()):
+            changed.append(UserStats(user_id=user_id, updated_at=now, **values))
+    UserStats.objects.bulk_create(
+        changed,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=[*COUNTERS, "updated_at"],
+    )
+    return len(changed)
@@ -0,0 +1,62 @@
+"""Per-car view counter (``Car.view_count``), aggregated in memory.
+
+``SiteVisitMiddleware`` records the logged visits of ``/voiture/<pk>/``
+(bots excluded, one per IP and page every 5 minutes) here instead of
+writing per hit. Every ``FLUSH_SECONDS`` the process hands the pending
+counts to the background worker, which applies them with one
+``UPDATE ... SET view_count = view_count + n`` per distinct ``n``.
+
+Counts are per process and lost if it dies before the next flush: the
+counter is approximate, like the visit log it comes from.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db.models import F
+
+from .models import Car
+from .worker import defer
+
+FLUSH_SECONDS = 30
+
+_pending = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record(car_id):
+    """Count one view of ``car_id``; schedules a flush when one is due."""
+    global _last_flush
+    with _lock:
+        _pending[car_id] += 1
+        due = time.monotonic() - _last_flush >= FLUSH_SECONDS
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        defer(flush)
+
+
+def pending(car_id):
+    """Views of ``car_id`` recorded by this process and not flushed yet."""
+    return _pending.get(car_id, 0)
+
+
+def total(car):
+    """Views of ``car``: the stored counter plus this process' pending ones."""
+    return car.view_count + pending(car.pk)
+
+
+def flush():
+    """Write the pending counts; returns the number of cars updated."""
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+    by_count = defaultdict(list)
+    for car_id, count in counts.items():
+        by_count[count].append(car_id)
+    return sum(
+        Car.objects.filter(pk__in=car_ids).update(view_count=F("view_count") + count)
+        for count, car_ids in by_count.items()
+    )
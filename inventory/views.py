@@ -5,72 +5,121 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum
-from django.db.models.functions import TruncDate, TruncMonth
-from django.http import JsonResponse
-from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import F, Q, Count, Sum, Value
+from django.db.models.functions import Least, Round, TruncDate, TruncMonth
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.utils.html import format_html
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
 from django.utils import timezone
-from .models import Car, Favorite, Appointment, Message, SiteVisit
+from .cache import (
+    batch_invalidation,
+    car_last_modified,
+    catalogue_last_modified,
+    catalogue_version,
+    invalidate_catalogue,
+)
+from .catalogue import (
+    SORTS,
+    available_cities,
+    detail_queryset,
+    listing_queryset,
+    read_filters,
+    read_sort,
+    similar_cars_queryset,
+)
+from .decorators import anonymous_page_cache, cacheable_page, read_from_replica
+from .models import (
+    Car,
+    Favorite,
+    Appointment,
+    Message,
+    Notification,
+    SiteVisit,
+    BulkAction,
+    DailyVisitStat,
+)
 from .forms import InscriptionForm, AppointmentForm, CarForm, MessageForm
-
+from .history import (
+    diff,
+    json_value,
+    price_history,
+    record_changes,
+    snapshot,
+    sparkline,
+)
+from .exports import (
+    APPOINTMENT_EXPORT_FIELDS,
+    CAR_EXPORT_FIELDS,
+    VISIT_EXPORT_FIELDS,
+    export_path,
+    export_state,
+    streaming_export,
+    write_export,
+)
+from .worker import defer
+from . import (
+    agenda,
+    alerts,
+    analytics,
+    compare,
+    notifications,
+    presence,
+    userstats,
+    viewcounter,
+)
+from .importers import detect_format, import_cars, open_text
 
 # ═══════════════════════════════════════════
 # PAGES PUBLIQUES
 # ═══════════════════════════════════════════
 
 
+# --- FRAÎCHEUR HTTP (ETag / Last-Modified) ---
+def _catalogue_etag(request, *args, **kwargs):
+    return f"catalogue-{catalogue_version()}"
+
+
+def _catalogue_last_modified(request, *args, **kwargs):
+    return catalogue_last_modified()
+
+
+def _car_etag(request, pk):
+    # The page also lists similar cars and market stats: include the generation.
+    return f"car-{pk}-{catalogue_version()}"
+
+
+def _car_last_modified(request, pk):
+    return car_last_modified(pk)
+
+
+# --- RETOUR ---
+def _back(request, fallback):
+    """The referring page when it is on this site, else the ``fallback`` URL name."""
+    referer = request.META.get("HTTP_REFERER")
+    if referer and url_has_allowed_host_and_scheme(
+        referer, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return referer
+    return fallback
+
+
 # --- ACCUEIL + FILTRES AVANCÉS ---
+@read_from_replica
+@cacheable_page(_catalogue_etag, _catalogue_last_modified)
+@anonymous_page_cache
 def home(request):
-    cars = Car.objects.filter(status="Disponible").only(
-        "id",
-        "brand",
-        "model",
-        "price",
-        "year",
-        "kilometrage",
-        "fuel",
-        "city",
-        "image",
-        "description",
-        "status",
-        "created_at",
-    )
-
-    # Recherche texte
-    query = request.GET.get("q", "")
-    if query:
-        cars = cars.filter(
-            Q(brand__icontains=query)
-            | Q(model__icontains=query)
-            | Q(city__icontains=query)
-        )
-
-    # Filtres avancés
-    fuel = request.GET.get("fuel", "")
-    transmission = request.GET.get("transmission", "")
-    price_min = request.GET.get("price_min", "")
-    price_max = request.GET.get("price_max", "")
-    year_min = request.GET.get("year_min", "")
-    year_max = request.GET.get("year_max", "")
-    city = request.GET.get("city", "")
-
-    if fuel:
-        cars = cars.filter(fuel=fuel)
-    if transmission:
-        cars = cars.filter(transmission=transmission)
-    if price_min:
-        cars = cars.filter(price__gte=price_min)
-    if price_max:
-        cars = cars.filter(price__lte=price_max)
-    if year_min:
-        cars = cars.filter(year__gte=year_min)
-    if year_max:
-        cars = cars.filter(year__lte=year_max)
-    if city:
-        cars = cars.filter(city__icontains=city)
-
-    cars = cars.order_by("-created_at")
+    # Recherche texte + filtres avancés
+    filters = read_filters(request.GET)
+    sort = read_sort(request.GET)
+    cars = listing_queryset(filters, sort)
 
     # Pagination
     paginator = Paginator(cars, 9)
@@ -84,38 +133,37 @@ def home(request):
             Favorite.objects.filter(user=request.user).values_list("car_id", flat=True)
         )
 
-    # Données pour les filtres
-    available_cities = (
-        Car.objects.filter(status="Disponible")
-        .values_list("city", flat=True)
-        .distinct()
-        .order_by("city")
-    )
-
     return render(
         request,
         "inventory/home.html",
-        {
-            "cars": page_obj,
-            "page_obj": page_obj,
-            "year": datetime.now().year,
-            "query": query,
-            "user_favorites": user_favorites,
-            "fuel": fuel,
-            "transmission": transmission,
-            "price_min": price_min,
-            "price_max": price_max,
-            "year_min": year_min,
-            "year_max": year_max,
-            "selected_city": city,
-            "available_cities": available_cities,
-            "fuel_choices": Car.CARBURANT_CHOICES,
-            "transmission_choices": Car.BOITE_CHOICES,
-            "total_results": paginator.count,
-        },
+        _home_context(filters, sort, page_obj, user_favorites, available_cities()),
     )
 
 
+def _home_context(filters, sort, page_obj, user_favorites, cities):
+    """Template context of ``home`` (shared with the async view)."""
+    return {
+        "cars": page_obj,
+        "page_obj": page_obj,
+        "year": datetime.now().year,
+        "query": filters["q"],
+        "user_favorites": user_favorites,
+        "fuel": filters["fuel"],
+        "transmission": filters["transmission"],
+        "price_min": filters["price_min"],
+        "price_max": filters["price_max"],
+        "year_min": filters["year_min"],
+        "year_max": filters["year_max"],
+        "selected_city": filters["city"],
+        "available_cities": cities,
+        "fuel_choices": Car.CARBURANT_CHOICES,
+        "transmission_choices": Car.BOITE_CHOICES,
+        "total_results": page_obj.paginator.count,
+        "sort": sort,
+        "sort_choices": [(key, label) for key, (label, _) in SORTS.items()],
+    }
+
+
 # --- GESTION DES FAVORIS ---
 @login_required
 def toggle_favorite(request, car_id):
@@ -124,6 +172,7 @@ def toggle_favorite(request, car_id):
 
     if not created:
         favorite.delete()
+        userstats.bump(request.user.pk, "favorites", -1)
         messages.info(request, f"{car.brand} retirée des favoris.")
     else:
         messages.success(request, f"{car.brand} ajoutée aux favoris !")
@@ -143,29 +192,41 @@ def favorite_list(request):
 
 
 # --- DÉTAILS VOITURE ---
+@read_from_replica
+@cacheable_page(_car_etag, _car_last_modified)
+@anonymous_page_cache
 def car_detail(request, pk):
-    car = get_object_or_404(Car, pk=pk)
-    similar_cars = (
-        Car.objects.filter(brand=car.brand, status="Disponible")
-        .exclude(pk=pk)
-        .only("id", "brand", "model", "price", "image")[:3]
-    )
+    # Car, favourite state and appointments in one query, similar cars in a
+    # second; the price history is cached (history.py).
+    car = get_object_or_404(detail_queryset(request.user), pk=pk)
+    similar_cars = list(similar_cars_queryset(car))
 
     # Message form for authenticated users
     message_form = MessageForm() if request.user.is_authenticated else None
 
+    # Price history sparkline
+    prices = [price for _, price in price_history(car)]
+
     return render(
         request,
         "inventory/car_detail.html",
-        {
-            "car": car,
-            "similar_cars": similar_cars,
-            "year": datetime.now().year,
-            "message_form": message_form,
-        },
+        _car_detail_context(car, similar_cars, message_form, prices),
     )
 
 
+def _car_detail_context(car, similar_cars, message_form, prices):
+    """Template context of ``car_detail`` (shared with the async view)."""
+    return {
+        "car": car,
+        "similar_cars": similar_cars,
+        "year": datetime.now().year,
+        "message_form": message_form,
+        "price_points": sparkline(prices),
+        "price_first": prices[0] if prices else None,
+        "view_count": viewcounter.total(car),
+    }
+
+
 # --- INSCRIPTION ---
 def register_view(request):
     if request.method == "POST":
@@ -228,7 +289,9 @@ def appointment_create(request, car_id):
 
 
 # --- SECTION VIP ---
+@read_from_replica
 @login_required
+@cacheable_page(_catalogue_etag, _catalogue_last_modified, per_user=True)
 def vip_cars(request):
     cars_vip = Car.objects.filter(price__gte=20000000, status="Disponible").order_by(
         "-price"
@@ -243,12 +306,8 @@ def vip_cars(request):
 # --- COMPARATEUR DE VÉHICULES ---
 @login_required
 def add_to_compare(request, car_id):
-    compare_list = request.session.get("compare_list", [])
-    if car_id not in compare_list:
-        if len(compare_list) >= 2:
-            compare_list.pop(0)
-        compare_list.append(car_id)
-        request.session["compare_list"] = compare_list
+    car = get_object_or_404(Car.objects.only("id"), pk=car_id)
+    if compare.add(request.user, car):
         messages.success(request, "Véhicule ajouté au comparateur !")
     else:
         messages.info(request, "Ce véhicule est déjà dans le comparateur.")
@@ -257,24 +316,145 @@ def add_to_compare(request, car_id):
 
 @login_required
 def remove_from_compare(request, car_id):
-    compare_list = request.session.get("compare_list", [])
-    if car_id in compare_list:
-        compare_list.remove(car_id)
-        request.session["compare_list"] = compare_list
+    if compare.remove(request.user, car_id):
         messages.info(request, "Véhicule retiré du comparateur.")
     return redirect("compare_cars")
 
 
+def _compare_context(cars):
+    return {
+        "columns": compare.spec_table(cars),
+        "compare_limit": compare.COMPARE_LIMIT,
+        "year": datetime.now().year,
+    }
+
+
 @login_required
 def compare_cars(request):
-    compare_list = request.session.get("compare_list", [])
-    cars = Car.objects.filter(id__in=compare_list)
-    all_cars = Car.objects.filter(status="Disponible").order_by("brand", "model")
+    cars = list(compare.compared_cars(request.user))
+    return render(request, "inventory/compare.html", _compare_context(cars))
+
+
+@login_required
+def compare_suggestions(request):
+    """Autocomplete for the comparator's "add a car" field (JSON)."""
+    rows = compare.suggestions(request.GET.get("q", "")[:100], request.user)
+    return JsonResponse(
+        {
+            "results": [
+                {
+                    "id": row["id"],
+                    "label": f"{row['brand']} {row['model']} ({row['year']})",
+                    "price": row["price"],
+                    "url": reverse("add_to_compare", args=[row["id"]]),
+                }
+                for row in rows
+            ]
+        }
+    )
+
+
+# --- RECHERCHES ENREGISTRÉES (alertes) ---
+@login_required
+@require_POST
+def save_search(request):
+    """Save the home page filters posted by the "Créer une alerte" button."""
+    criteria = alerts.normalise(read_filters(request.POST))
+    if not any(value not in ("", None) for value in criteria.values()):
+        messages.warning(
+            request, "Choisissez au moins un critère avant de créer une alerte."
+        )
+    elif alerts.save_search(request.user, criteria)[1]:
+        messages.success(
+            request, "Alerte créée : vous serez prévenu des nouvelles annonces."
+        )
+    else:
+        messages.info(request, "Cette recherche est déjà enregistrée.")
+    return redirect(_back(request, "home"))
+
+
+@login_required
+def saved_searches(request):
+    searches = [
+        (search, alerts.home_query(search))
+        for search in request.user.saved_searches.filter(is_active=True)
+    ]
+    return render(
+        request,
+        "inventory/saved_searches.html",
+        {"searches": searches, "year": datetime.now().year},
+    )
+
+
+@login_required
+@require_POST
+def delete_saved_search(request, pk):
+    request.user.saved_searches.filter(pk=pk).delete()
+    messages.info(request, "Alerte supprimée.")
+    return redirect("saved_searches")
+
+
+# --- NOTIFICATIONS ---
+@login_required
+def notification_list(request):
+    paginator = Paginator(
+        Notification.objects.filter(user=request.user)
+        .select_related("car")
+        .order_by("-created_at"),
+        20,
+    )
+    page_obj = paginator.get_page(request.GET.get("page"))
     return render(
         request,
-        "inventory/compare.html",
-        {"cars": cars, "all_cars": all_cars, "year": datetime.now().year},
+        "inventory/notifications.html",
+        {"notifications": page_obj, "page_obj": page_obj},
+    )
+
+
+@login_required
+def notification_dropdown(request):
+    """Latest notifications and the unread count, for the navbar (JSON)."""
+    return JsonResponse(
+        {
+            "unread": notifications.unread_count(request.user),
+            "results": [
+                {
+                    "id": n.pk,
+                    "kind": n.kind,
+                    "text": n.text,
+                    "url": reverse("notification_open", args=[n.pk]),
+                    "is_read": n.is_read,
+                    "created_at": n.created_at.isoformat(),
+                }
+                for n in notifications.latest(request.user)
+            ],
+        }
+    )
+
+
+@login_required
+def notification_open(request, pk):
+    """Mark one notification as read and go to what it is about."""
+    notification = get_object_or_404(
+        Notification.objects.select_related("car"), pk=pk, user=request.user
     )
+    notifications.mark_read(request.user, [pk])
+    return redirect(notification.link)
+
+
+@login_required
+@require_POST
+def notifications_mark_read(request):
+    """Mark the posted ``ids`` (all when absent) as read, in one UPDATE."""
+    ids = None
+    if "ids" in request.POST:
+        ids = [int(i) for i in request.POST.getlist("ids") if i.isdigit()]
+    updated = notifications.mark_read(request.user, ids)
+    if request.headers.get("Accept") == "application/json":
+        return JsonResponse(
+            {"updated": updated, "unread": notifications.unread_count(request.user)}
+        )
+    return redirect(_back(request, "notification_list"))
 
 
 # --- MESSAGERIE CLIENT ---
@@ -355,6 +535,14 @@ def conversation_detail(request, user_id):
             if last_car_msg:
                 msg.car = last_car_msg.car
             msg.save()
+            notifications.notify(
+                partner,
+                "reply",
+                car=msg.car,
+                sender_id=request.user.pk,
+                sender=request.user.username,
+                to_staff=partner.is_staff,
+            )
             messages.success(request, "Message envoyé !")
             return redirect("conversation_detail", user_id=user_id)
     else:
@@ -377,6 +565,7 @@ def conversation_detail(request, user_id):
 # ═══════════════════════════════════════════
 
 
+@read_from_replica
 @staff_member_required
 def admin_dashboard(request):
     """Main admin dashboard with stats and chart data."""
@@ -396,8 +585,16 @@ def admin_dashboard(request):
     unread_messages = Message.objects.filter(
         receiver__is_staff=True, is_read=False
     ).count()
-    total_visits = SiteVisit.objects.filter(created_at__gte=last_30).count()
-    today_visits = SiteVisit.objects.filter(created_at__date=now.date()).count()
+    total_visits = SiteVisit.objects.filter(
+        created_at__gte=last_30, is_bot=False
+    ).count()
+    # Range on created_at (indexed) rather than __date, which wraps the column
+    today_start = timezone.localtime(now).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    today_visits = SiteVisit.objects.filter(
+        created_at__gte=today_start, is_bot=False
+    ).count()
 
     # Revenue estimate (sold cars)
     revenue = (
@@ -413,7 +610,7 @@ def admin_dashboard(request):
 
     # Chart: Visits per day (last 7 days)
     visits_per_day = (
-        SiteVisit.objects.filter(created_at__gte=last_7)
+        SiteVisit.objects.filter(created_at__gte=last_7, is_bot=False)
         .annotate(day=TruncDate("created_at"))
         .values("day")
         .annotate(count=Count("id"))
@@ -422,6 +619,31 @@ def admin_dashboard(request):
     visit_labels = [v["day"].strftime("%d/%m") for v in visits_per_day]
     visit_data = [v["count"] for v in visits_per_day]
 
+    # Chart: Visits by country (last 30 days, from the daily rollups)
+    visits_by_country = list(
+        DailyVisitStat.objects.filter(day__gte=last_30.date())
+        .values("country")
+        .annotate(total=Sum("visits"))
+        .order_by("-total")[:8]
+    )
+    country_chart = {
+        "labels": [row["country"] for row in visits_by_country],
+        "data": [row["total"] for row in visits_by_country],
+    }
+
+    # Chart: Unique visitors per day (last 90 days, from the HLL sketches)
+    uniques = analytics.daily_uniques(90)
+    uniques_chart = {
+        "labels": [day.strftime("%d/%m") for day, _ in uniques],
+        "data": [count for _, count in uniques],
+    }
+    uniques_90 = cache.get("dashboard:uniques_90")
+    if uniques_90 is None:
+        uniques_90 = analytics.unique_visitors(
+            now.date() - timedelta(days=89), now.date()
+        )
+        cache.set("dashboard:uniques_90", uniques_90, 300)
+
     # Chart: Appointments per month (last 6 months)
     six_months_ago = now - timedelta(days=180)
     rdv_per_month = (
@@ -441,14 +663,8 @@ def admin_dashboard(request):
         "-created_at"
     )[:5]
 
-    # Online users (visited in last 5 minutes)
-    five_min_ago = now - timedelta(minutes=5)
-    online_count = (
-        SiteVisit.objects.filter(created_at__gte=five_min_ago)
-        .values("ip_address")
-        .distinct()
-        .count()
-    )
+    # Online users (visited in last 5 minutes, from the presence sketches)
+    online_count = presence.online_count()
 
     return render(
         request,
@@ -473,6 +689,9 @@ def admin_dashboard(request):
             "visit_data": visit_data,
             "rdv_labels": rdv_labels,
             "rdv_data": rdv_data,
+            "country_chart": country_chart,
+            "uniques_chart": uniques_chart,
+            "uniques_90": uniques_90,
             # Recent
             "recent_cars": recent_cars,
             "recent_rdvs": recent_rdvs,
@@ -481,9 +700,8 @@ def admin_dashboard(request):
     )
 
 
-@staff_member_required
-def admin_cars(request):
-    """Car management with search and filter."""
+def _admin_cars_queryset(request):
+    """Staff car list filtered by the ``q`` / ``status`` query parameters."""
     cars = Car.objects.all()
     q = request.GET.get("q", "")
     status_filter = request.GET.get("status", "")
@@ -495,7 +713,28 @@ def admin_cars(request):
     if status_filter:
         cars = cars.filter(status=status_filter)
 
-    cars = cars.order_by("-created_at")
+    return cars.order_by("-created_at"), q, status_filter
+
+
+@staff_member_required
+def admin_online(request):
+    """Live visitor counts for the dashboard to poll (JSON)."""
+    minutes = [
+        {
+            "time": timezone.localtime(
+                datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+            ).strftime("%H:%M"),
+            "visitors": count,
+        }
+        for ts, count in presence.per_minute()
+    ]
+    return JsonResponse({"online": presence.online_count(), "minutes": minutes})
+
+
+@staff_member_required
+def admin_cars(request):
+    """Car management with search and filter."""
+    cars, q, status_filter = _admin_cars_queryset(request)
     paginator = Paginator(cars, 15)
     page_obj = paginator.get_page(request.GET.get("page"))
 
@@ -512,13 +751,49 @@ def admin_cars(request):
     )
 
 
+@staff_member_required
+def admin_cars_export(request):
+    """Stream the filtered car list as CSV or JSONL (re-importable)."""
+    cars, _, _ = _admin_cars_queryset(request)
+    fmt = "jsonl" if request.GET.get("format") == "jsonl" else "csv"
+    filename = f"vehicules-{timezone.now():%Y%m%d-%H%M}"
+    return streaming_export(cars, CAR_EXPORT_FIELDS, filename, fmt)
+
+
+@staff_member_required
+def admin_car_import(request):
+    """Bulk upsert of cars from an uploaded CSV/JSONL feed."""
+    report = None
+    if request.method == "POST" and request.FILES.get("file"):
+        upload = request.FILES["file"]
+        fmt = request.POST.get("format") or detect_format(upload.name)
+        report = import_cars(
+            open_text(upload.file),
+            fmt=fmt,
+            dry_run=bool(request.POST.get("dry_run")),
+            user=request.user,
+        )
+        if report.failed:
+            messages.warning(
+                request, f"{report.failed} ligne(s) rejetée(s) sur {report.processed}."
+            )
+        else:
+            messages.success(request, f"{report.processed} ligne(s) importée(s).")
+    return render(
+        request,
+        "inventory/admin/admin_car_import.html",
+        {"report": report},
+    )
+
+
 @staff_member_required
 def admin_car_create(request):
     """Create a new car."""
     if request.method == "POST":
         form = CarForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            car = form.save()
+            record_changes([(car.pk, diff(None, snapshot(car)))], user=request.user)
             messages.success(request, "Véhicule ajouté avec succès !")
             return redirect("admin_cars")
     else:
@@ -535,9 +810,11 @@ def admin_car_edit(request, pk):
     """Edit an existing car."""
     car = get_object_or_404(Car, pk=pk)
     if request.method == "POST":
+        before = snapshot(car)
         form = CarForm(request.POST, request.FILES, instance=car)
         if form.is_valid():
             form.save()
+            record_changes([(car.pk, diff(before, snapshot(car)))], user=request.user)
             messages.success(request, "Véhicule modifié avec succès !")
             return redirect("admin_cars")
     else:
@@ -568,17 +845,101 @@ def admin_car_delete(request, pk):
 def admin_car_toggle(request, pk):
     """Toggle car status between Disponible/Vendu."""
     car = get_object_or_404(Car, pk=pk)
+    old_status = car.status
     if car.status == "Disponible":
         car.status = "Vendu"
     elif car.status == "Vendu":
         car.status = "Disponible"
     elif car.status == "En attente":
         car.status = "Disponible"
-    car.save()
+    car.save(update_fields=["status", "updated_at"])
+    record_changes([(car.pk, {"status": [old_status, car.status]})], user=request.user)
     messages.success(request, f"{car.brand} {car.model} → {car.status}")
     return redirect("admin_cars")
 
 
+@staff_member_required
+@require_POST
+def admin_cars_bulk(request):
+    """Apply one status/price/delete action to a selection of cars."""
+    ids = [int(i) for i in request.POST.getlist("ids") if i.isdigit()]
+    action = request.POST.get("action", "")
+    if not ids:
+        messages.warning(request, "Aucun véhicule sélectionné.")
+        return redirect(request.META.get("HTTP_REFERER", "admin_cars"))
+
+    cars = Car.objects.filter(pk__in=ids)
+    params = {}
+    with batch_invalidation(), userstats.batch_recount(), transaction.atomic():
+        if action == "status":
+            status = request.POST.get("status", "")
+            if status not in dict(Car.STATUT_CHOICES):
+                messages.error(request, "Statut invalide.")
+                return redirect("admin_cars")
+            params["status"] = status
+            before = dict(cars.values_list("pk", "status"))
+            affected = cars.update(status=status, updated_at=timezone.now())
+            changes = [
+                (pk, {"status": [old, status]})
+                for pk, old in before.items()
+                if old != status
+            ]
+            if status == "Disponible":
+                alerts.queue_matches(pk for pk, _ in changes)
+            label = f"→ {status}"
+        elif action == "price":
+            try:
+                percent = Decimal(request.POST.get("percent", ""))
+            except InvalidOperation:
+                percent = None
+            if percent is None or not -90 <= percent <= 500:
+                messages.error(request, "Pourcentage invalide.")
+                return redirect("admin_cars")
+            params["percent"] = str(percent)
+            factor = 1 + percent / 100
+            before = dict(cars.values_list("pk", "price"))
+            # Clamped to the column range (max_digits=10): +500 % of a
+            # 20 M price would not fit.
+            new_price = Least(Round(F("price") * factor, 2), Value(alerts.MAX_PRICE))
+            affected = cars.update(price=new_price, updated_at=timezone.now())
+            after = dict(cars.values_list("pk", "price"))
+            changes = [
+                (
+                    pk,
+                    diff(
+                        {"price": json_value("price", before[pk])},
+                        {"price": json_value("price", price)},
+                    ),
+                )
+                for pk, price in after.items()
+            ]
+            alerts.queue_price_drops(
+                (pk, before[pk], price) for pk, price in after.items()
+            )
+            label = f"prix {percent:+}%"
+        elif action == "delete":
+            affected = cars.delete()[1].get(Car._meta.label, 0)
+            changes = []
+            label = "supprimé(s)"
+        else:
+            messages.error(request, "Action inconnue.")
+            return redirect("admin_cars")
+
+        BulkAction.objects.create(
+            user=request.user,
+            action=action,
+            params=params,
+            car_ids=ids,
+            affected=affected,
+        )
+        record_changes(changes, user=request.user)
+        # update() bypasses the Car signals: invalidate once for the batch.
+        invalidate_catalogue()
+
+    messages.success(request, f"{affected} véhicule(s) {label}.")
+    return redirect(request.META.get("HTTP_REFERER", "admin_cars"))
+
+
 @staff_member_required
 def admin_messages(request):
     """Admin inbox — grouped by sender."""
@@ -634,6 +995,13 @@ def admin_conversation(request, user_id):
             if last_car_msg:
                 msg.car = last_car_msg.car
             msg.save()
+            notifications.notify(
+                client,
+                "reply",
+                car=msg.car,
+                sender_id=request.user.pk,
+                sender=request.user.username,
+            )
             messages.success(request, "Réponse envoyée !")
             return redirect("admin_conversation", user_id=user_id)
     else:
@@ -649,12 +1017,10 @@ def admin_conversation(request, user_id):
 @staff_member_required
 def admin_users(request):
     """User management / list."""
+    # Counters are denormalised in UserStats (inventory/userstats.py)
     users = (
         User.objects.filter(is_staff=False)
-        .annotate(
-            fav_count=Count("favorite"),
-            msg_count=Count("sent_messages"),
-        )
+        .select_related("stats")
         .order_by("-date_joined")
     )
 
@@ -672,10 +1038,41 @@ def admin_users(request):
     )
 
 
-@staff_member_required
-def admin_activity(request):
-    """Site visit / activity log."""
-    visits = SiteVisit.objects.select_related("user").order_by("-created_at")
+def _parse_range(request):
+    """The ``start`` / ``end`` (YYYY-MM-DD) query parameters as dates, or None."""
+    try:
+        return (
+            parse_date(request.GET.get("start", "")),
+            parse_date(request.GET.get("end", "")),
+        )
+    except ValueError:
+        return None, None
+
+
+def _date_range(request, queryset, field="created_at"):
+    """Apply the optional ``start`` / ``end`` (YYYY-MM-DD) query parameters.
+
+    Bounds are half-open local datetimes (``start`` 00:00 <= t < ``end`` + 1
+    day 00:00) so the index on ``field`` is used; the first and last
+    representable days do not bound anything.
+    """
+    start, end = _parse_range(request)
+    if start and start > date.min:
+        queryset = queryset.filter(**{f"{field}__gte": _day_start(start)})
+    if end and end < date.max - timedelta(days=1):
+        day_after = _day_start(end + timedelta(days=1))
+        queryset = queryset.filter(**{f"{field}__lt": day_after})
+    return queryset
+
+
+def _day_start(day):
+    """Aware local midnight of ``day``."""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _activity_queryset(request):
+    """Visit log filtered by the ``q`` / ``start`` / ``end`` query parameters."""
+    visits = SiteVisit.objects.order_by("-created_at")
 
     q = request.GET.get("q", "")
     if q:
@@ -684,18 +1081,70 @@ def admin_activity(request):
             | Q(page__icontains=q)
             | Q(user__username__icontains=q)
         )
+    return _date_range(request, visits), q
+
+
+def _export_response(request, queryset, fields, basename):
+    """Stream an export, or hand it to the background worker for huge ranges."""
+    stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    if request.GET.get("background"):
+        name = f"{basename}-{stamp}.jsonl.gz"
+        defer(write_export, queryset, fields, name)
+        messages.info(
+            request,
+            format_html(
+                'Export en cours de génération : <a href="{}">{}</a>',
+                reverse("admin_export_download", args=[name]),
+                name,
+            ),
+        )
+        return redirect(_back(request, "admin_dashboard"))
+    fmt = request.GET.get("format", "csv")
+    return streaming_export(queryset, fields, f"{basename}-{stamp}", fmt)
+
+
+@staff_member_required
+def admin_activity_export(request):
+    """Export the filtered visit log (CSV / gzipped JSONL)."""
+    visits, _ = _activity_queryset(request)
+    return _export_response(request, visits, VISIT_EXPORT_FIELDS, "visites")
+
+
+@staff_member_required
+def admin_export_download(request, name):
+    """Download a background-generated export once it is complete."""
+    state, error = export_state(name)
+    if state == "ready":
+        path = export_path(name)
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
+    if state == "missing":
+        raise Http404("Export introuvable.")
+    if state == "running":
+        messages.info(request, "Export encore en cours de génération, réessayez.")
+    else:
+        messages.error(request, f"L'export {name} a échoué ({error}), relancez-le.")
+    return redirect(_back(request, "admin_dashboard"))
+
+
+@read_from_replica
+@staff_member_required
+def admin_activity(request):
+    """Site visit / activity log."""
+    visits, q = _activity_queryset(request)
+    visits = visits.select_related("user")
 
     paginator = Paginator(visits, 30)
     page_obj = paginator.get_page(request.GET.get("page"))
 
-    # Unique IPs today
-    today = timezone.now().date()
-    unique_ips_today = (
-        SiteVisit.objects.filter(created_at__date=today)
-        .values("ip_address")
-        .distinct()
-        .count()
-    )
+    # Unique IPs (HLL estimate): today, and over the selected range if any
+    today = timezone.localdate()
+    unique_ips_today = analytics.unique_visitors(today, today)
+    start, end = _parse_range(request)
+    unique_ips_range = None
+    if start or end:
+        unique_ips_range = analytics.unique_visitors(
+            start or today - timedelta(days=365), end or today
+        )
 
     return render(
         request,
@@ -704,18 +1153,17 @@ def admin_activity(request):
             "visits": page_obj,
             "page_obj": page_obj,
             "q": q,
+            "start": request.GET.get("start", ""),
+            "end": request.GET.get("end", ""),
             "unique_ips_today": unique_ips_today,
+            "unique_ips_range": unique_ips_range,
         },
     )
 
 
-@staff_member_required
-def admin_appointments(request):
-    """Admin view for all appointments with details."""
-    now = timezone.now()
-    appointments = Appointment.objects.select_related("user", "car").order_by(
-        "-created_at"
-    )
+def _appointments_queryset(request, now):
+    """Appointments filtered by ``q`` / ``status`` / ``start`` / ``end``."""
+    appointments = Appointment.objects.order_by("-created_at")
 
     q = request.GET.get("q", "")
     if q:
@@ -733,17 +1181,51 @@ def admin_appointments(request):
     elif status_filter == "past":
         appointments = appointments.filter(date_rdv__lt=now)
 
+    appointments = _date_range(request, appointments, "date_rdv")
+    return appointments, q, status_filter
+
+
+@staff_member_required
+@require_POST
+def admin_appointment_confirm(request, pk):
+    """Confirm an appointment and notify the client."""
+    appointment = get_object_or_404(
+        Appointment.objects.select_related("user", "car"), pk=pk
+    )
+    if appointment.confirmed_at is None:
+        appointment.confirmed_at = timezone.now()
+        appointment.save(update_fields=["confirmed_at"])
+        notifications.notify(
+            appointment.user,
+            "appointment",
+            car=appointment.car,
+            date=timezone.localtime(appointment.date_rdv).strftime("%d/%m/%Y %H:%M"),
+        )
+        messages.success(
+            request, f"Rendez-vous de {appointment.user.username} confirmé."
+        )
+    return redirect(_back(request, "admin_appointments"))
+
+
+@staff_member_required
+def admin_appointments_export(request):
+    """Export the filtered appointments (CSV / gzipped JSONL)."""
+    appointments, _, _ = _appointments_queryset(request, timezone.now())
+    return _export_response(
+        request, appointments, APPOINTMENT_EXPORT_FIELDS, "rendez-vous"
+    )
+
+
+@staff_member_required
+def admin_appointments(request):
+    """Admin view for all appointments with details."""
+    now = timezone.now()
+    appointments, q, status_filter = _appointments_queryset(request, now)
+    appointments = appointments.select_related("user", "car")
+
     paginator = Paginator(appointments, 15)
     page_obj = paginator.get_page(request.GET.get("page"))
 
-    # Stats
-    total_rdv = Appointment.objects.count()
-    upcoming_rdv = Appointment.objects.filter(date_rdv__gte=now).count()
-    past_rdv = Appointment.objects.filter(date_rdv__lt=now).count()
-    this_week = Appointment.objects.filter(
-        created_at__gte=now - timedelta(days=7)
-    ).count()
-
     return render(
         request,
         "inventory/admin/admin_appointments.html",
@@ -752,9 +1234,40 @@ def admin_appointments(request):
             "page_obj": page_obj,
             "q": q,
             "status_filter": status_filter,
-            "total_rdv": total_rdv,
-            "upcoming_rdv": upcoming_rdv,
-            "past_rdv": past_rdv,
-            "this_week": this_week,
+            "start": request.GET.get("start", ""),
+            "end": request.GET.get("end", ""),
+            # total_rdv, upcoming_rdv, past_rdv, this_week
+            **agenda.stats(),
+        },
+    )
+
+
+@staff_member_required
+def admin_appointments_calendar(request):
+    """Month (default) or week grid of the appointments around ``date``."""
+    view = "week" if request.GET.get("view") == "week" else "month"
+    try:
+        day = parse_date(request.GET.get("date", "")) or timezone.localdate()
+    except ValueError:
+        day = timezone.localdate()
+    day = agenda.clamp_day(day)
+    limit = None if view == "week" else agenda.MONTH_CELL_LIMIT
+    weeks, count = agenda.calendar(view, day, limit)
+    if view == "week":
+        previous, following = day - timedelta(days=7), day + timedelta(days=7)
+    else:
+        previous = (day.replace(day=1) - timedelta(days=1)).replace(day=1)
+        following = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return render(
+        request,
+        "inventory/admin/admin_appointments_calendar.html",
+        {
+            "weeks": weeks,
+            "view": view,
+            "day": day,
+            "today": timezone.localdate(),
+            "previous": previous,
+            "following": following,
+            "count": count,
         },
     )
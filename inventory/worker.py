@@ -0,0 +1,64 @@
+"""Process-wide background thread for work that must not delay a response.
+
+The thread is a daemon, so ``drain()`` is registered with ``atexit`` the
+first time it starts: a short-lived process (management command, script)
+runs its queued tasks before exiting instead of silently dropping them.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_thread = None
+_lock = threading.Lock()
+
+
+def _run():
+    while True:
+        func, args, kwargs = _queue.get()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception("Background task %s failed", func.__name__)
+        finally:
+            close_old_connections()
+            _queue.task_done()
+
+
+def _ensure_started():
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            if _thread is None:
+                atexit.register(drain)
+            _thread = threading.Thread(
+                target=_run, name="inventory-worker", daemon=True
+            )
+            _thread.start()
+
+
+def defer(func, *args, **kwargs):
+    """Run ``func`` outside the request, on the process-wide worker thread.
+
+    Tasks are lost if the process dies: only use it for work that can be
+    redone (exports, notifications, flushes). With ``BACKGROUND_TASKS_SYNC``
+    the call runs inline, which is what tests want.
+    """
+    if getattr(settings, "BACKGROUND_TASKS_SYNC", False):
+        func(*args, **kwargs)
+        return
+    _ensure_started()
+    _queue.put((func, args, kwargs))
+
+
+def drain():
+    """Block until every queued task (and those it queued) has run."""
+    if _thread is not None and _thread.is_alive():
+        _queue.join()
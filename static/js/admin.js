@@ -0,0 +1,13 @@
+function toggleSidebar() {
+    document.getElementById('sidebar').classList.toggle('open');
+    document.getElementById('mobileOverlay').classList.toggle('active');
+}
+function closeSidebar() {
+    document.getElementById('sidebar').classList.remove('open');
+    document.getElementById('mobileOverlay').classList.remove('active');
+}
+
+// Auto-close alerts
+document.querySelectorAll('.alert').forEach(a => {
+    setTimeout(() => { a.classList.remove('show'); a.remove(); }, 4000);
+});
@@ -0,0 +1,11 @@
+// Inlined at the top of <body> (base.html) so the intro shows before first paint.
+// Intro animation
+const isHomePage = document.body.classList.contains('is-home');
+if (isHomePage) {
+    const introSeen = localStorage.getItem('introSeen');
+    if (!introSeen) {
+        document.body.classList.add('show-intro');
+        document.getElementById('luxury-intro').classList.add('active');
+        setTimeout(() => { localStorage.setItem('introSeen', 'true'); }, 6000);
+    }
+}
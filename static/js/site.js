@@ -0,0 +1,101 @@
+// Replay intro animation
+function replayIntro() {
+    localStorage.removeItem('introSeen');
+    location.reload();
+}
+
+// Navbar scroll effect
+window.addEventListener('scroll', () => {
+    const navbar = document.getElementById('mainNavbar');
+    if (navbar) {
+        navbar.classList.toggle('scrolled', window.scrollY > 50);
+    }
+});
+
+// Auto-remove toasts
+document.querySelectorAll('.toast-custom').forEach(toast => {
+    setTimeout(() => toast.remove(), 4200);
+});
+
+// Animated Counters
+function animateCounters() {
+    document.querySelectorAll('[data-count]').forEach(el => {
+        const target = parseInt(el.getAttribute('data-count'));
+        const duration = 1500;
+        const step = target / (duration / 16);
+        let current = 0;
+        const timer = setInterval(() => {
+            current += step;
+            if (current >= target) {
+                el.textContent = target.toLocaleString('fr-FR');
+                clearInterval(timer);
+            } else {
+                el.textContent = Math.floor(current).toLocaleString('fr-FR');
+            }
+        }, 16);
+    });
+}
+
+// Trigger counters when visible
+const counterSection = document.querySelector('.hero-stats');
+if (counterSection) {
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                animateCounters();
+                observer.unobserve(entry.target);
+            }
+        });
+    });
+    observer.observe(counterSection);
+}
+
+// Notifications dropdown: loaded on first opening, read-all without reload
+const notifToggle = document.getElementById('notifToggle');
+if (notifToggle) {
+    const badge = document.getElementById('notifBadge');
+    const items = document.getElementById('notifItems');
+    const setUnread = (count) => {
+        badge.textContent = count;
+        badge.hidden = !count;
+    };
+    notifToggle.addEventListener('show.bs.dropdown', () => {
+        fetch(notifToggle.dataset.feed, { headers: { Accept: 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                setUnread(data.unread);
+                items.replaceChildren();
+                if (!data.results.length) {
+                    const empty = document.createElement('div');
+                    empty.className = 'p-3 text-muted small';
+                    empty.textContent = 'Aucune notification';
+                    items.append(empty);
+                }
+                data.results.forEach(item => {
+                    const link = document.createElement('a');
+                    link.href = item.url;
+                    link.className = 'list-group-item list-group-item-action small' + (item.is_read ? '' : ' fw-bold');
+                    link.textContent = item.text;
+                    const date = document.createElement('div');
+                    date.className = 'text-muted fw-normal';
+                    date.textContent = new Date(item.created_at).toLocaleString('fr-FR');
+                    link.append(date);
+                    items.append(link);
+                });
+            });
+    });
+    const readAll = document.getElementById('notifReadAll');
+    readAll.addEventListener('submit', (event) => {
+        event.preventDefault();
+        fetch(readAll.action, {
+            method: 'POST',
+            body: new FormData(readAll),
+            headers: { Accept: 'application/json' },
+        })
+            .then(response => response.json())
+            .then(data => {
+                setUnread(data.unread);
+                items.querySelectorAll('.fw-bold').forEach(el => el.classList.remove('fw-bold'));
+            });
+    });
+}